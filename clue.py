@@ -10,8 +10,14 @@ Created on Wed Jun 27 14:53:24 2018
 #import my other modules, one is a set of helper definitions and functions and
 #the other is a module with all the class definitions
 
+import argparse
+import sys
 from clue_helpers import *
 from clue_classes import *
+from clue_script import run_script
+from clue_events import EventLog
+from clue_metrics import get_metrics, dump_metrics
+from clue_variant import load_variant, standard
           
 
 """
@@ -19,24 +25,62 @@ MAIN
 
 This is the main control of the Clue Game Program. It initializes the
 game and then runs a loop for the user to take turns. To break out of 
-the loop the user can exit the game or correctly guess the answer
+the loop the user can exit the game or correctly guess the answer. With
+--script the games are played from a JSON lines file instead (see
+clue_script), without any prompts.
 """
 
+#A seed can be given on the command line to replay the same game
+parser = argparse.ArgumentParser(description="Play a game of Clue")
+parser.add_argument("--seed", type=int, default=None,
+                    help="seed for the envelope, deal and CPU play so a game can be replayed")
+parser.add_argument("--script", default=None,
+                    help="play the games in this JSON lines file, - for standard input")
+parser.add_argument("--log", default=None,
+                    help="with --script, write errors to this file instead of standard error")
+parser.add_argument("--events", default=None,
+                    help="append every deal, move, guess, refutation and win to this event log")
+parser.add_argument("--board", default=None,
+                    help="play the variant with the guests, weapons and map in this JSON file")
+parser.add_argument("--metrics", default=None,
+                    help="time and count every phase of the game and write them to this JSON file")
+args = parser.parse_args()
+metrics = get_metrics() if args.metrics is not None else None
+variant = load_variant(args.board) if args.board is not None else standard
+
+#Scripted games are played straight through and then the program exits
+if args.script is not None:
+    script = sys.stdin if args.script == "-" else open(args.script)
+    log = open(args.log, "w") if args.log is not None else None
+    errors = run_script(script, log=log, metrics=metrics, variant=variant)
+    if metrics is not None:
+        dump_metrics(args.metrics)
+    sys.exit(1 if errors else 0)
+
 #Display intro screen and messages
 
-display_intro()
+display_intro(variant.guests, variant.weapons, variant.room_names)
 
 #Ask user to pick a character
-print("\nPlease pick one of these 6 characters to represent you:")
-user = validate_input(guests)
+print("\nPlease pick one of these", len(variant.guests), "characters to represent you:")
+user = validate_input(variant.guests)
 
 #Ask user to pick a number of players to play with
-possible_num_players = [1,2,3,4,5]
-print("\nHow many CPU players would you like to play against (choose 1 - 5)?")
+possible_num_players = list(range(1, len(variant.guests)))
+print("\nHow many CPU players would you like to play against (choose 1 -", str(possible_num_players[-1]) + ")?")
 num_cpu_players = validate_input(possible_num_players)
 
+#Ask user if they would like hints shown with their scratch pad, hints are
+#only worked out for the standard game
+hints = False
+if variant is standard:
+    print("\nWould you like hints worked out from your cards to be shown with your scratch pad?")
+    hints = validate_input(["Yes", "No"]) == "Yes"
+
 #initialize the game with user picked character and total number of players
-g1=Game(user, num_cpu_players+1)
+events = EventLog(args.events) if args.events is not None else None
+g1=Game(user, num_cpu_players+1, hints, seed=args.seed, events=events, metrics=metrics,
+       variant=variant)
 g1.start_game()
 
 #track if the game should be ended or keep looping on turns
@@ -47,5 +91,10 @@ while end_game != True:
         end_game = True
 
 
+if events is not None:
+    events.close()
+if metrics is not None:
+    dump_metrics(args.metrics)
+
 print("\n\nThank you for playing Clue!\n\n")
 
@@ -0,0 +1,290 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Batch simulator. It plays a large number of games at the same time with
+NumPy, keeping every game as a row of small arrays instead of a Game object:
+
+    holders     K x 24 int8, the seat holding each card or -1 for the envelope
+    envelopes   K x 3 int8, the envelope card ids
+    positions   K x players int8, the room id of each seat (seat 0 is the user)
+    occupied    K uint16, bitmask of the occupied room ids
+    seen        K x 24 bool, the cards the user knows are not in the envelope
+
+Every step plays one user turn in all unfinished games at once. The user seat
+plays like the elimination strategy (see clue_strategies): it guesses the
+first guest and weapon not yet seen when in a room not yet seen, otherwise it
+walks one room towards the nearest room not yet seen, taking the first free
+adjoining room on a shortest path. When they are all occupied it still tries
+the first one, which loses the turn, and guesses on the next turn instead.
+Refutations follow Game.find_card (the first CPU player in seating order
+after the user holding a guessed card shows the lowest card id they hold,
+and the user never refutes their own guess) and CPU players move to their
+first free adjoining room after a wrong guess, like Game.move_cpu_players.
+
+With --check the same deals are also played one at a time by Game with
+the elimination strategy and the run fails unless every game takes the same
+number of turns, so batch results can be compared with tournament results.
+
+This module needs NumPy.
+
+Example:
+    python clue_batch.py --games 1000000 --players 6 --seed 1
+    python clue_batch.py --games 2000 --seed 1 --check
+"""
+
+import argparse
+import json
+import random
+import sys
+from collections import Counter
+
+import numpy as np
+
+from clue_helpers import *
+from clue_board import board
+from clue_deal import deal_batch, deal_policies
+from clue_classes import Game
+from clue_rollout import apply_deal
+from clue_strategies import make_strategy
+from clue_tournament import summarize
+
+num_cards = len(card_names)
+guest_start = 0
+weapon_start = len(guests)
+room_start = len(guests) + len(weapons)
+
+#board tables as arrays, and the lowest set bit of every room bitmask
+adjacency = np.array(board.adjacency, dtype=np.uint16)
+distance = np.array(board.distance, dtype=np.int16)
+first_step = np.array([[-1 if step is None else step for step in row] for row in board.first_step],
+                      dtype=np.int8)
+#the rooms next to a room that are on a shortest path to a goal room, in
+#the order the board lists them, padded with -1
+max_neighbours = max(len(neighbours) for neighbours in board.neighbours)
+shortest_steps = np.full((board.size, board.size, max_neighbours), -1, dtype=np.int8)
+for start in range(board.size):
+    for goal in range(board.size):
+        if start == goal or board.distance[start][goal] is None:
+            continue
+        on_path = [room for room in board.neighbours[start]
+                   if board.distance[room][goal] == board.distance[start][goal] - 1]
+        shortest_steps[start, goal, :len(on_path)] = on_path
+lowest_room = np.full(1 << board.size, -1, dtype=np.int8)
+for mask in range(1, 1 << board.size):
+    lowest_room[mask] = (mask & -mask).bit_length() - 1
+room_bits = (1 << np.arange(board.size)).astype(np.uint16)
+
+
+def deal_games(num_games, num_players, rng, policy="shuffle"):
+    """
+    This function deals num_games games and returns the holders and
+    envelopes arrays. The "shuffle" policy is dealt with NumPy in one go
+    from rng, a NumPy Generator. Other policies are dealt game by game with
+    clue_deal.deal_batch using a random.Random seeded from rng.
+    """
+
+    if policy != "shuffle":
+        envelopes, holders = deal_batch(num_games, num_players,
+                                        random.Random(int(rng.integers(1 << 62))), policy)
+        return (np.frombuffer(holders, dtype=np.int8).reshape(num_games, num_cards).copy(),
+                np.frombuffer(envelopes, dtype=np.int8).reshape(num_games, 3).copy())
+
+    rows = np.arange(num_games)
+    envelopes = np.stack([rng.integers(guest_start, weapon_start, num_games),
+                          rng.integers(weapon_start, room_start, num_games),
+                          rng.integers(room_start, num_cards, num_games)], axis=1).astype(np.int8)
+
+    #sort random keys to shuffle each row, with the envelope cards sorted last
+    keys = rng.random((num_games, num_cards))
+    keys[rows[:, None], envelopes] = 2.0
+    order = np.argsort(keys, axis=1)
+    dealt = num_cards - 3
+    holders = np.empty((num_games, num_cards), dtype=np.int8)
+    holders[rows[:, None], order[:, :dealt]] = np.arange(dealt) % num_players
+    holders[rows[:, None], envelopes] = -1
+    return holders, envelopes
+
+
+def starting_positions(num_games, num_players, user):
+    """
+    This function returns the positions and occupied arrays for the start of
+    a game, the user in the Garage and each CPU player in the room with the
+    same index as their guest, like Game.setup
+    """
+    cpu_guests = [idx for idx, guest in enumerate(guests) if guest != user][:num_players - 1]
+    seats = [board.ids["Garage"]] + cpu_guests
+    positions = np.tile(np.array(seats, dtype=np.int8), (num_games, 1))
+    occupied = np.full(num_games, sum(1 << room for room in seats), dtype=np.uint16)
+    return positions, occupied
+
+
+def move_cpu_players(positions, occupied, games):
+    """
+    This function moves every CPU player in the given games to their first
+    free adjoining room, in seat order, updating positions and occupied in
+    place
+    """
+    for seat in range(1, positions.shape[1]):
+        rooms_now = positions[games, seat]
+        occupied_now = occupied[games]
+        step = lowest_room[adjacency[rooms_now] & ~occupied_now]
+        moving = step >= 0
+        movers = games[moving]
+        occupied[movers] = (occupied_now[moving] & ~room_bits[rooms_now[moving]]) | room_bits[step[moving]]
+        positions[movers, seat] = step[moving]
+
+
+def simulate(num_games, num_players=6, user="Miss Scarlet", seed=None, max_turns=1000,
+             deal_policy="shuffle"):
+    """
+    This function plays num_games games in lockstep and returns a tuple of
+    an array with the number of turns each game took and a boolean array
+    that is True for the games the user won
+    """
+
+    rng = np.random.default_rng(seed)
+    holders, envelopes = deal_games(num_games, num_players, rng, deal_policy)
+    positions, occupied = starting_positions(num_games, num_players, user)
+    seen = holders == 0
+    blocked_last = np.zeros(num_games, dtype=bool)
+    turns = np.zeros(num_games, dtype=np.int32)
+    won = np.zeros(num_games, dtype=bool)
+    active = np.ones(num_games, dtype=bool)
+
+    #refutation order key for each seat: the CPU seats in order after the
+    #user, while the user and the envelope (-1, stored last in the table)
+    #never refute
+    seat_key = np.array([num_players] + list(range(1, num_players)) + [num_players], dtype=np.int8)
+
+    while active.any():
+        games = np.nonzero(active)[0]
+        room = positions[games, 0]
+
+        #find the nearest room not yet seen and the first step towards it
+        unseen_rooms = ~seen[games, room_start:]
+        here_possible = unseen_rooms[np.arange(len(games)), room]
+        goal_distance = np.where(unseen_rooms, distance[room], np.int16(32767))
+        goal = np.argmin(goal_distance, axis=1)
+        occupied_now = occupied[games]
+        step = np.full(len(games), -1, dtype=np.int8)
+        for k in range(max_neighbours):
+            option = shortest_steps[room, goal, k]
+            free = (option >= 0) & ((occupied_now & room_bits[np.maximum(option, 0)]) == 0)
+            step = np.where((step < 0) & free, option, step)
+        reachable = first_step[room, goal] >= 0
+
+        #guess in a room not yet seen, when there is nowhere to go or after
+        #a move that was blocked. With every step occupied the move is tried
+        #anyway and fails, like Game.move_player
+        guessing = here_possible | ~reachable | blocked_last[games]
+        blocking = ~guessing & (step < 0)
+        blocked_last[games] = blocking
+
+        #guesses: the first unseen guest and weapon in the current room
+        guessers = games[guessing]
+        if len(guessers):
+            cards = np.stack([np.argmin(seen[guessers, guest_start:weapon_start], axis=1) + guest_start,
+                              np.argmin(seen[guessers, weapon_start:room_start], axis=1) + weapon_start,
+                              positions[guessers, 0].astype(np.intp) + room_start], axis=1)
+            card_holders = holders[guessers[:, None], cards]
+            correct = (card_holders == -1).all(axis=1)
+            won[guessers[correct]] = True
+            active[guessers[correct]] = False
+
+            #the first refuter in seat order shows the lowest guessed card they have
+            keys = seat_key[card_holders]
+            column = np.argmin(keys, axis=1)
+            wrong = ~correct
+            refuted = keys[np.arange(len(guessers)), column] < num_players
+            shown = cards[np.arange(len(guessers)), column]
+            seen[guessers[refuted], shown[refuted]] = True
+            move_cpu_players(positions, occupied, guessers[wrong])
+
+        #moves: walk one room towards the goal
+        moving = ~guessing & ~blocking
+        movers = games[moving]
+        if len(movers):
+            step = step[moving]
+            occupied[movers] = (occupied[movers] & ~room_bits[positions[movers, 0]]) | room_bits[step]
+            positions[movers, 0] = step
+
+        turns[games] += 1
+        active[games] &= turns[games] < max_turns
+
+    return turns, won
+
+
+def engine_turns(holders, envelopes, num_players=6, user="Miss Scarlet", max_turns=1000):
+    """
+    This function plays the deals in the holders and envelopes arrays one at
+    a time with Game and the elimination strategy and returns an array with
+    the number of turns each game took
+    """
+    game = Game(user, num_players)
+    turns = np.zeros(len(holders), dtype=np.int32)
+    for row in range(len(holders)):
+        game.reset()
+        game.setup()
+        apply_deal(game, [int(card) for card in envelopes[row]],
+                   [None if seat < 0 else int(seat) for seat in holders[row]])
+        game.play(make_strategy("elimination"), max_turns)
+        turns[row] = game.turns
+    return turns
+
+
+def check_against_engine(num_games, num_players=6, user="Miss Scarlet", seed=None, max_turns=1000,
+                         deal_policy="shuffle"):
+    """
+    This function deals num_games games, plays them with simulate and with
+    engine_turns and returns the number of games where the turns differ
+    """
+    holders, envelopes = deal_games(num_games, num_players, np.random.default_rng(seed), deal_policy)
+    turns, won = simulate(num_games, num_players, user, seed, max_turns, deal_policy)
+    expected = engine_turns(holders, envelopes, num_players, user, max_turns)
+    return int((turns != expected).sum())
+
+
+def main():
+    """
+    Command line entry point for the batch simulator
+    """
+
+    parser = argparse.ArgumentParser(description="Play many games at once with NumPy")
+    parser.add_argument("--games", type=int, default=100000, help="number of games")
+    parser.add_argument("--players", type=int, default=6, choices=range(2, 7),
+                        help="total number of players including the user seat")
+    parser.add_argument("--user", default="Miss Scarlet", choices=guests,
+                        help="character for the user seat")
+    parser.add_argument("--max-turns", type=int, default=1000,
+                        help="a game not solved in this many turns counts as a loss")
+    parser.add_argument("--batch-size", type=int, default=100000,
+                        help="games held in memory at once")
+    parser.add_argument("--deal-policy", default="shuffle", choices=deal_policies,
+                        help="how the cards are dealt")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible runs")
+    parser.add_argument("--check", action="store_true",
+                        help="play the same deals with Game and fail if any game differs")
+    args = parser.parse_args()
+
+    if args.check:
+        differ = check_against_engine(args.games, args.players, args.user, args.seed,
+                                      args.max_turns, args.deal_policy)
+        print(json.dumps({"games": args.games, "differ": differ}))
+        sys.exit(1 if differ else 0)
+
+    #play the games a batch at a time, each batch with its own seed
+    seeds = np.random.SeedSequence(args.seed).spawn((args.games + args.batch_size - 1) // args.batch_size)
+    turns_to_solve = Counter()
+    unsolved = 0
+    for batch, batch_seed in enumerate(seeds):
+        count = min(args.batch_size, args.games - batch * args.batch_size)
+        turns, won = simulate(count, args.players, args.user, batch_seed, args.max_turns,
+                              args.deal_policy)
+        values, counts = np.unique(turns[won], return_counts=True)
+        turns_to_solve.update(dict(zip(values.tolist(), counts.tolist())))
+        unsolved += int((~won).sum())
+    print(json.dumps(summarize(turns_to_solve, unsolved), indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,317 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Benchmark suite. It times the main parts of the game at fixed seeds: game
+setup, showing a card, CPU turns, the user moving, drawing the map, forking
+a game and whole headless games, and it measures the memory a game takes.
+Output that the game would print goes to os.devnull and user input is read
+from a prepared stream, so no terminal is needed.
+
+Results are written as JSON. If a baseline file is given, each benchmark is
+compared with it and the run fails if any is slower by more than the
+tolerance.
+
+Timings depend on the machine and Python version they were taken with, which
+are written into the results. bench_baseline.json was taken on one
+development machine, so it is only a rough guide elsewhere. Before comparing,
+make a baseline on the same machine from the code before a change.
+
+Example:
+    python clue_bench.py --output bench.json --baseline bench_baseline.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import sys
+import time
+import tracemalloc
+
+from clue_helpers import *
+from clue_classes import *
+from clue_strategies import make_strategy
+
+
+@contextlib.contextmanager
+def quiet(user_input=""):
+    """
+    This context manager sends printed output to os.devnull and makes input()
+    read from the given string while it is active. Standard output is also
+    redirected at the file descriptor level so a command the game runs, the
+    one clear_screen uses on Windows, does not write to the terminal either.
+    The output is not a terminal, so nothing uses the terminal escape codes.
+    """
+    old_stdin = sys.stdin
+    sys.stdout.flush()
+    old_stdout_fd = os.dup(1)
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        os.dup2(devnull.fileno(), 1)
+        sys.stdin = io.StringIO(user_input)
+        try:
+            yield
+        finally:
+            sys.stdin = old_stdin
+            os.dup2(old_stdout_fd, 1)
+            os.close(old_stdout_fd)
+
+
+def new_game(seed, num_players=6):
+    """
+    Returns a game that has been set up with the given seed
+    """
+    game = Game("Miss Scarlet", num_players, seed=seed)
+    game.setup()
+    return game
+
+
+def random_guesses(rng, count):
+    """
+    Returns a list of random Guess objects
+    """
+    return [Guess(rng.choice(guests), rng.choice(weapons), rng.choice(rooms)[0]) for i in range(count)]
+
+
+def bench_setup(iterations, seed):
+    """
+    Game.__init__ followed by start_game
+    """
+    with quiet():
+        start = time.perf_counter()
+        for i in range(iterations):
+            Game("Miss Scarlet", 6, seed=seed + i).start_game()
+        return time.perf_counter() - start
+
+
+def bench_reset_setup(iterations, seed):
+    """
+    Reusing one game with reset and setup
+    """
+    game = Game("Miss Scarlet", 6)
+    start = time.perf_counter()
+    for i in range(iterations):
+        game.reset(seed + i)
+        game.setup()
+    return time.perf_counter() - start
+
+
+def bench_cpu_show_card(iterations, seed):
+    """
+    Game.cpu_show_card on random guesses
+    """
+    game = new_game(seed)
+    guesses = random_guesses(random.Random(seed), iterations)
+    with quiet():
+        start = time.perf_counter()
+        for guess in guesses:
+            game.cpu_show_card(guess)
+        return time.perf_counter() - start
+
+
+def bench_find_card(iterations, seed):
+    """
+    Game.find_card on random guesses
+    """
+    game = new_game(seed)
+    guesses = random_guesses(random.Random(seed), iterations)
+    start = time.perf_counter()
+    for guess in guesses:
+        game.find_card(guess)
+    return time.perf_counter() - start
+
+
+def bench_cpu_take_turns(iterations, seed):
+    """
+    Game.cpu_take_turns with 5 CPU players
+    """
+    game = new_game(seed)
+    with quiet():
+        start = time.perf_counter()
+        for i in range(iterations):
+            game.cpu_take_turns()
+        return time.perf_counter() - start
+
+
+def bench_move_cpu_players(iterations, seed):
+    """
+    Game.move_cpu_players with 5 CPU players
+    """
+    game = new_game(seed)
+    start = time.perf_counter()
+    for i in range(iterations):
+        game.move_cpu_players()
+    return time.perf_counter() - start
+
+
+def bench_move_rooms(iterations, seed):
+    """
+    Game.move_rooms with the room choices read from a prepared input stream
+    """
+    game = new_game(seed, num_players=2)
+    choices_made = "".join(str(random.Random(seed + i).randint(1, 3)) + "\n" for i in range(iterations))
+    with quiet(choices_made):
+        start = time.perf_counter()
+        for i in range(iterations):
+            game.move_rooms()
+        return time.perf_counter() - start
+
+
+def bench_display_map(iterations, seed):
+    """
+    display_map writing the whole map as text, which is what it does when
+    the output is not a terminal. Redrawing only the changed rooms on a
+    terminal is not timed.
+    """
+    game = new_game(seed)
+    with quiet():
+        start = time.perf_counter()
+        for i in range(iterations):
+            display_map(game.locations)
+        return time.perf_counter() - start
+
+
+def bench_full_game(iterations, seed):
+    """
+    Complete headless games with the elimination strategy
+    """
+    game = Game("Miss Scarlet", 6)
+    start = time.perf_counter()
+    for i in range(iterations):
+        game.reset(seed + i)
+        game.setup()
+        game.play(make_strategy("elimination"), 1000)
+    return time.perf_counter() - start
+
+
+def bench_fork(iterations, seed):
+    """
+    Game.fork with 6 players, with a random number generator given
+    """
+    game = new_game(seed)
+    rng = random.Random(seed)
+    start = time.perf_counter()
+    for i in range(iterations):
+        game.fork(rng)
+    return time.perf_counter() - start
+
+
+#benchmark name, function and number of iterations per round
+benchmarks = [("setup", bench_setup, 2000),
+              ("reset_setup", bench_reset_setup, 5000),
+              ("cpu_show_card", bench_cpu_show_card, 20000),
+              ("find_card", bench_find_card, 50000),
+              ("cpu_take_turns", bench_cpu_take_turns, 10000),
+              ("move_cpu_players", bench_move_cpu_players, 20000),
+              ("move_rooms", bench_move_rooms, 10000),
+              ("display_map", bench_display_map, 50),
+              ("full_game", bench_full_game, 300),
+              ("fork", bench_fork, 20000)]
+
+
+def measure_memory(num_games=1000, seed=1):
+    """
+    This function measures how much memory a game that has been set up
+    takes, by keeping num_games of them alive and tracing the allocations.
+    It returns a dictionary with the bytes per game when each game has its
+    own random number generator and when they all share one.
+    """
+    memory = {}
+    for name, shared in (("bytes_per_game", None), ("bytes_per_game_shared_rng", random.Random(seed))):
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        games = []
+        for i in range(num_games):
+            game = Game("Miss Scarlet", 6, rng=shared)
+            game.reset(seed + i)
+            game.setup()
+            games.append(game)
+        memory[name] = (tracemalloc.get_traced_memory()[0] - before) / num_games
+        tracemalloc.stop()
+    return memory
+
+
+def run_benchmarks(names=None, seed=1, repeat=3, scale=1.0):
+    """
+    This function runs the named benchmarks (all of them if names is None)
+    repeat times each and keeps the fastest round. The number of iterations
+    is multiplied by scale. It returns a dictionary of results by name.
+    """
+    results = {}
+    for name, function, iterations in benchmarks:
+        if names and name not in names:
+            continue
+        iterations = max(1, int(iterations * scale))
+        best = min(function(iterations, seed) for i in range(repeat))
+        results[name] = {"iterations": iterations,
+                         "seconds": best,
+                         "us_per_op": best / iterations * 1e6,
+                         "ops_per_sec": iterations / best if best else None}
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    This function compares results with a baseline and returns a list of
+    (name, baseline us_per_op, new us_per_op, ratio) for every benchmark in
+    both, and the list of names that are slower by more than the tolerance
+    """
+    rows = []
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        old = baseline[name]["us_per_op"]
+        ratio = result["us_per_op"] / old if old else float("inf")
+        rows.append((name, old, result["us_per_op"], ratio))
+        if ratio > 1 + tolerance:
+            regressions.append(name)
+    return rows, regressions
+
+
+def main():
+    """
+    Command line entry point for the benchmark suite
+    """
+
+    parser = argparse.ArgumentParser(description="Time the Clue game engine")
+    parser.add_argument("benchmarks", nargs="*", help="benchmarks to run, from: " +
+                        ", ".join(name for name, function, iterations in benchmarks))
+    parser.add_argument("--seed", type=int, default=1, help="seed for the games")
+    parser.add_argument("--repeat", type=int, default=3, help="rounds per benchmark, the fastest is kept")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply the iterations by this")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25,
+                        help="allowed slowdown against the baseline, 0.25 is 25%%")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.benchmarks, args.seed, args.repeat, args.scale)
+    memory = measure_memory(seed=args.seed)
+    report = {"python": platform.python_version(), "machine": platform.machine(),
+              "seed": args.seed, "benchmarks": results, "memory": memory}
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+
+    for name, result in results.items():
+        print("{:<18} {:>12.2f} us/op {:>14.0f} ops/s".format(name, result["us_per_op"], result["ops_per_sec"]))
+    for name, size in memory.items():
+        print("{:<26} {:>8.0f}".format(name, size))
+
+    if args.baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)["benchmarks"]
+        rows, regressions = compare(results, baseline, args.tolerance)
+        print("\nAgainst", args.baseline)
+        for name, old, new, ratio in rows:
+            print("{:<18} {:>12.2f} -> {:>10.2f} us/op  x{:.2f}{}".format(
+                name, old, new, ratio, "  REGRESSION" if name in regressions else ""))
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
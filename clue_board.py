@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Board index. A Board is built once from a rooms table (a list of
+[name, [adjoining names]] like rooms in clue_helpers) and turns it into
+lookup tables: room ids in table order, a name to id dictionary, the
+adjoining rooms of every room as an int bitmask and the shortest distance
+and first step between every pair of rooms. A set of occupied rooms is an
+int bitmask with the bit for each room id set, so finding a free
+neighbour is one AND NOT.
+"""
+
+from clue_helpers import *
+
+
+class Board(object):
+    """
+    The Board class holds the lookup tables for a rooms table. It does not
+    change once built, so one Board is shared by every game on that map.
+    """
+
+    def __init__(self, room_table, tables=None):
+        """
+        This method builds the lookup tables from a rooms table. tables can
+        be the (distance, first_step) tables worked out before for the same
+        rooms table, which are then checked instead of worked out again. It
+        raises ValueError if a room lists an adjoining room that is not on
+        the map or the tables given do not fit it.
+        """
+        self.names = [room[0] for room in room_table]
+        self.ids = dict((name, idx) for idx, name in enumerate(self.names))
+        self.size = len(self.names)
+        self.all_rooms = (1 << self.size) - 1
+
+        #adjoining rooms as lists of ids and as bitmasks, keeping table order
+        self.neighbours = []
+        self.adjacency = []
+        for name, adjoining in room_table:
+            for other in adjoining:
+                if other not in self.ids:
+                    raise ValueError(name + " adjoins unknown room " + repr(other))
+            ids = [self.ids[other] for other in adjoining]
+            self.neighbours.append(ids)
+            mask = 0
+            for idx in ids:
+                mask |= 1 << idx
+            self.adjacency.append(mask)
+
+        if tables is not None:
+            self.check_tables(*tables)
+            self.distance, self.first_step = tables
+            return
+
+        #breadth first search from every room for distances and first steps,
+        #None where a room cannot be reached
+        self.distance = []
+        self.first_step = []
+        for start in range(self.size):
+            distance = [None] * self.size
+            first_step = [None] * self.size
+            distance[start] = 0
+            frontier = [start]
+            for room in frontier:
+                for other in self.neighbours[room]:
+                    if distance[other] is None:
+                        distance[other] = distance[room] + 1
+                        first_step[other] = other if room == start else first_step[room]
+                        frontier.append(other)
+            self.distance.append(distance)
+            self.first_step.append(first_step)
+
+
+    def check_tables(self, distance, first_step):
+        """
+        Raises ValueError unless the distance and first step tables are
+        lists with a row for every room of whole numbers of the right size
+        or None. Every first step must adjoin the room it starts from, so
+        following them always stays on the map.
+        """
+        for table in (distance, first_step):
+            if type(table) is not list or len(table) != self.size:
+                raise ValueError("the tables must have a row for each of the " + str(self.size) + " rooms")
+            for row in table:
+                if type(row) is not list or len(row) != self.size:
+                    raise ValueError("the tables must have a column for each of the " + str(self.size) + " rooms")
+                numbers = [value for value in row if value is not None]
+                if numbers and (set(map(type, numbers)) != {int} or min(numbers) < 0 or
+                                max(numbers) >= self.size):
+                    raise ValueError("the tables can only hold room ids, distances and None")
+        for start in range(self.size):
+            for step in set(first_step[start]) - {None}:
+                if not (self.adjacency[start] >> step) & 1:
+                    raise ValueError(self.names[step] + " does not adjoin " + self.names[start])
+
+
+    def room_id(self, name):
+        """
+        Returns the id of the room with the given name
+        """
+        return self.ids[name]
+
+
+    def room_mask(self, names):
+        """
+        Returns the bitmask for a list of room names
+        """
+        mask = 0
+        for name in names:
+            mask |= 1 << self.ids[name]
+        return mask
+
+
+    def free_neighbours(self, room, occupied):
+        """
+        Returns the bitmask of the rooms next to a room that are not in the
+        occupied bitmask
+        """
+        return self.adjacency[room] & ~occupied
+
+
+    def first_free_neighbour(self, room, occupied):
+        """
+        Returns the id of the first room in table order next to a room that
+        is not occupied, or None if they are all occupied
+        """
+        free = self.adjacency[room] & ~occupied
+        if free == 0:
+            return None
+        return (free & -free).bit_length() - 1
+
+
+    def turns_to_reach(self, start, goal):
+        """
+        Returns the number of moves needed to walk from one room to another,
+        or None if there is no way there
+        """
+        return self.distance[start][goal]
+
+
+    def nearest(self, start, goals):
+        """
+        Returns the id of the room in the goals bitmask closest to the start
+        room (the first in table order if several are as close), or None if
+        none of them can be reached
+        """
+        best = None
+        distance = self.distance[start]
+        for goal in mask_card_ids(goals):
+            if distance[goal] is not None and (best is None or distance[goal] < distance[best]):
+                best = goal
+        return best
+
+
+    def step_towards(self, start, goals, occupied=0):
+        """
+        Returns the id of the room to move to from the start room to get
+        closer to the nearest room in the goals bitmask. Of the neighbours on
+        a shortest path it prefers one that is not occupied. It returns None
+        if the start room is a goal or no goal can be reached.
+        """
+        if (goals >> start) & 1:
+            return None
+        goal = self.nearest(start, goals)
+        if goal is None:
+            return None
+        wanted = self.distance[start][goal] - 1
+        for room in self.neighbours[start]:
+            if self.distance[room][goal] == wanted and not (occupied >> room) & 1:
+                return room
+        return self.first_step[start][goal]
+
+
+#the board index for the standard map
+board = Board(rooms)
@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CPU bots. A bot decides for one seat through three hooks, each given a
+GameView, a read only tuple of what the seat can see:
+
+    choose_move(view)           the board id of an adjoining free room to
+                                move to, or None to stay where it is
+    choose_guess(view)          the (guest, weapon) card ids to guess in the
+                                room the seat is in
+    choose_reveal(view, cards)  which card id of cards, the guessed cards
+                                the seat holds, to show the guesser
+
+CPU players only move and refute in this game, so a Game given cpu_bots
+asks them for moves after every wrong guess and for the card to show when
+they have to disprove one. choose_guess is used when a bot plays the user
+seat: every registered bot is also a strategy (see clue_strategies) called
+"bot:" and its name, which moves with choose_move and guesses with
+choose_guess when it stays.
+
+Bots are registered by name in the bots dictionary with register_bot, and
+load_bots imports a module at runtime so the bots it registers can be
+picked by name:
+
+    from clue_bots import Bot, register_bot
+
+    @register_bot("lazy")
+    class LazyBot(Bot):
+        def choose_move(self, view):
+            return None
+
+Every call to a hook goes through a BotRunner, which gives it a time
+budget. Where the interval timer is available (Unix, main thread) a hook
+that runs over its budget is interrupted with BudgetExceeded, which is not
+an Exception so the bot cannot catch it by accident. Elsewhere, or if the
+bot is stuck in C code that does not check for signals, the answer of a
+hook that ran over is thrown away. Either way, and when a hook raises an
+exception or gives an answer that is not allowed, the fallback of the
+base Bot is used instead, which plays like the built in CPU players. The
+time every call took is recorded per bot and hook in a LatencyStats
+histogram, so the percentiles can be reported and merged across processes.
+
+Example:
+    runners = make_cpu_bots(["random"], 5, budget=0.01)
+    game = Game("Miss Scarlet", 6, cpu_bots=runners)
+"""
+
+import importlib
+import math
+import operator
+import signal
+import threading
+from array import array
+from collections import namedtuple
+from functools import partial
+from time import perf_counter
+
+from clue_classes import *
+from clue_strategies import strategies
+
+#what a seat can see. positions has the room of every seat, occupied is the
+#bitmask of rooms with someone in them, hand the bitmask of the seats cards
+#and seen the bitmask of the cards it knows are not in the envelope. guess
+#is the bitmask of the cards guessed and guesser the seat that guessed, or
+#0 and -1 outside of a refutation. board is the board index and kinds the
+#card ids of the guests, weapons and rooms of the variant played, both are
+#shared and must not be changed.
+GameView = namedtuple("GameView", ["seat", "turn", "num_players", "room", "positions", "occupied",
+                                   "hand", "seen", "guess", "guesser", "board", "kinds"])
+
+hooks = ["choose_move", "choose_guess", "choose_reveal"]
+
+#every latency bucket is a quarter of a power of two wide, from 1
+#microsecond up to about 18 hours
+BUCKETS_PER_DOUBLING = 4
+NUM_BUCKETS = 144
+
+
+class BudgetExceeded(BaseException):
+    """
+    Raised inside a bot hook that runs over its time budget
+    """
+
+
+class Bot(object):
+    """
+    The Bot class is the base for all bots and plays like the built in CPU
+    players: it moves to the first free adjoining room and shows the lowest
+    card it can. In the user seat it walks to the rooms it has not seen and
+    guesses the first guest and weapon it has not seen in them, or where it
+    is when the way is blocked.
+    """
+
+    def new_game(self, seat, rng):
+        """
+        This method is called at the start of every game with the seat the
+        bot plays and the random number generator of the game
+        """
+        self.seat = seat
+        self.rng = rng
+
+
+    def choose_move(self, view):
+        """
+        Returns the room to move to, the first free adjoining one, or in the
+        user seat one on the way to the nearest room it has not seen, or
+        None if it is in one or the way there is blocked
+        """
+        if view.seat == 0:
+            unseen = 0
+            for room, card in enumerate(view.kinds[2]):
+                if not (view.seen >> card) & 1:
+                    unseen |= 1 << room
+            if (unseen >> view.room) & 1:
+                return None
+            #when the way is blocked it guesses while it waits for the CPU
+            #players to move on
+            step = view.board.step_towards(view.room, unseen, view.occupied)
+            if step is None or (view.occupied >> step) & 1:
+                return None
+            return step
+        return view.board.first_free_neighbour(view.room, view.occupied)
+
+
+    def choose_guess(self, view):
+        """
+        Returns the guest and weapon card ids to guess, the first ones not
+        seen yet
+        """
+        guest_ids, weapon_ids = view.kinds[0], view.kinds[1]
+        guest = next((card for card in guest_ids if not (view.seen >> card) & 1), guest_ids[0])
+        weapon = next((card for card in weapon_ids if not (view.seen >> card) & 1), weapon_ids[0])
+        return guest, weapon
+
+
+    def choose_reveal(self, view, cards):
+        """
+        Returns the card to show, the lowest card id
+        """
+        return min(cards)
+
+
+class RandomBot(Bot):
+    """
+    The RandomBot moves to a random free adjoining room, or stays if it
+    draws its own room, guesses at random and shows a random card
+    """
+
+    def choose_move(self, view):
+        """
+        Returns a random free adjoining room or None
+        """
+        free = mask_card_ids(view.board.free_neighbours(view.room, view.occupied))
+        choice = self.rng.randrange(len(free) + 1)
+        return free[choice] if choice < len(free) else None
+
+
+    def choose_guess(self, view):
+        """
+        Returns a random guest and weapon
+        """
+        return self.rng.choice(view.kinds[0]), self.rng.choice(view.kinds[1])
+
+
+    def choose_reveal(self, view, cards):
+        """
+        Returns a random card
+        """
+        return self.rng.choice(cards)
+
+
+class WandererBot(Bot):
+    """
+    The WandererBot picks a random room and walks to it along the shortest
+    path, then picks another one, in the user seat after guessing in the
+    room it got to. It shows the card it has shown the
+    guesser before if it can, so they learn as little as possible.
+    """
+
+    def new_game(self, seat, rng):
+        """
+        This method forgets the goal and the cards shown last game
+        """
+        Bot.new_game(self, seat, rng)
+        self.goal = None
+        self.shown = {}
+
+
+    def choose_move(self, view):
+        """
+        Returns the next room on the way to the goal
+        """
+        if self.goal == view.room:
+            self.goal = None
+            if view.seat == 0:
+                return None
+        if self.goal is None:
+            self.goal = self.rng.randrange(view.board.size)
+        step = view.board.step_towards(view.room, 1 << self.goal, view.occupied)
+        if step is None or (view.occupied >> step) & 1:
+            self.goal = None
+            return Bot.choose_move(self, view)
+        return step
+
+
+    def choose_reveal(self, view, cards):
+        """
+        Returns a card already shown to the guesser, or the lowest card
+        """
+        before = self.shown.setdefault(view.guesser, set())
+        for card in cards:
+            if card in before:
+                return card
+        before.add(min(cards))
+        return min(cards)
+
+
+#the bots that can be picked by name, each entry makes a new bot
+bots = {}
+
+
+def register_bot(name):
+    """
+    This function returns a class decorator that registers a bot under a
+    name, both in bots and as the strategy "bot:" + name
+    """
+    def register(bot_class):
+        bots[name] = bot_class
+        strategies["bot:" + name] = partial(BotStrategy, name)
+        return bot_class
+    return register
+
+
+def load_bots(module_name):
+    """
+    This function imports a module so the bots it registers can be used,
+    and returns the names of the bots that were added. It raises ValueError
+    if the module cannot be imported.
+    """
+    before = set(bots)
+    try:
+        importlib.import_module(module_name)
+    except ImportError as error:
+        raise ValueError("cannot load bots from " + repr(module_name) + ": " + str(error))
+    return sorted(set(bots) - before)
+
+
+class LatencyStats(object):
+    """
+    The LatencyStats class keeps a histogram of how long calls took, with
+    the number of calls that ran over their budget or failed
+    """
+
+    def __init__(self):
+        """
+        This method initializes empty statistics
+        """
+        self.buckets = array("L", bytes(NUM_BUCKETS * array("L").itemsize))
+        self.count = 0
+        self.total = 0.0
+        self.longest = 0.0
+        self.timeouts = 0
+        self.errors = 0
+        self.invalid = 0
+
+
+    def add(self, seconds):
+        """
+        Records one call
+        """
+        micros = seconds * 1e6
+        bucket = int(math.log2(micros) * BUCKETS_PER_DOUBLING) + 1 if micros > 1 else 0
+        self.buckets[min(bucket, NUM_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.longest:
+            self.longest = seconds
+
+
+    def merge(self, other):
+        """
+        Adds the calls recorded in another LatencyStats to these
+        """
+        for bucket, calls in enumerate(other.buckets):
+            self.buckets[bucket] += calls
+        self.count += other.count
+        self.total += other.total
+        self.longest = max(self.longest, other.longest)
+        self.timeouts += other.timeouts
+        self.errors += other.errors
+        self.invalid += other.invalid
+
+
+    def percentile(self, fraction):
+        """
+        Returns the time in seconds that the given fraction of calls took no
+        longer than, as the top of its histogram bucket, or None if there
+        have been no calls
+        """
+        if not self.count:
+            return None
+        wanted = fraction * self.count
+        calls = 0
+        for bucket, bucket_calls in enumerate(self.buckets):
+            calls += bucket_calls
+            if calls >= wanted and bucket_calls:
+                return min(2 ** (bucket / BUCKETS_PER_DOUBLING) / 1e6, self.longest)
+        return self.longest
+
+
+    def as_dict(self):
+        """
+        Returns the statistics as a dictionary that can be written as JSON,
+        with the times in microseconds
+        """
+        summary = {"calls": self.count, "timeouts": self.timeouts, "errors": self.errors,
+                   "invalid": self.invalid,
+                   "mean_us": self.total / self.count * 1e6 if self.count else None}
+        for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+            value = self.percentile(fraction)
+            summary[name + "_us"] = value * 1e6 if value is not None else None
+        summary["max_us"] = self.longest * 1e6
+        return summary
+
+
+#the latency of every hook of every bot used in this process, by bot name
+bot_stats = {}
+
+
+def stats_for(name):
+    """
+    Returns the LatencyStats of each hook of a bot, making them if needed
+    """
+    if name not in bot_stats:
+        bot_stats[name] = dict((hook, LatencyStats()) for hook in hooks)
+    return bot_stats[name]
+
+
+def merge_stats(into, other):
+    """
+    This function adds the statistics in other, a dictionary like bot_stats,
+    to the ones in into
+    """
+    for name, hook_stats in other.items():
+        for hook, stats in hook_stats.items():
+            into.setdefault(name, dict((hook, LatencyStats()) for hook in hooks))[hook].merge(stats)
+    return into
+
+
+def make_view(game, seat, guess=0, guesser=-1):
+    """
+    This function returns the GameView of a Game for a seat
+    """
+    player = game.seat_player(seat)
+    seen = player.hand | (game.shown if seat == 0 else 0)
+    positions = (game.user_player.get_location().id,) + \
+                tuple(cpu_player.get_location().id for cpu_player in game.cpu_players)
+    return GameView(seat, game.turns, game.num_players, positions[seat], positions, game.occupied,
+                    player.hand, seen, guess, guesser, game.board, game.variant.kind_ids)
+
+
+def whole_number(answer):
+    """
+    This function returns a bot answer as an int if it is a whole number,
+    such as an int or a NumPy integer, and None otherwise. True and False
+    are not taken as 1 and 0, and floats are not taken even when whole.
+    """
+    if isinstance(answer, bool):
+        return None
+    try:
+        return operator.index(answer)
+    except TypeError:
+        return None
+
+
+class BotRunner(object):
+    """
+    The BotRunner class calls the hooks of one bot within its time budget,
+    records how long they took and falls back to the base Bot when they
+    fail
+    """
+
+    fallback = Bot()
+
+    def __init__(self, name, budget=0.05):
+        """
+        This method makes a bot by its registered name. budget is the most
+        seconds a hook may take, or None for no limit.
+        """
+        if name not in bots:
+            raise ValueError("Unknown bot " + repr(name) + ", choose from " + ", ".join(sorted(bots)))
+        self.name = name
+        self.bot = bots[name]()
+        self.budget = budget
+        self.stats = stats_for(name)
+        self.running = False
+
+
+    def new_game(self, seat, rng):
+        """
+        Tells the bot a new game is starting
+        """
+        self.bot.new_game(seat, rng)
+
+
+    def interrupt(self, signum, frame):
+        """
+        The interval timer signal handler, which stops a hook that is still
+        running
+        """
+        if self.running:
+            self.running = False
+            raise BudgetExceeded()
+
+
+    def call(self, hook, view, *args):
+        """
+        This method calls a hook of the bot and returns a tuple of True and
+        its answer, or of False and None if it ran over its budget or raised
+        an exception
+        """
+        stats = self.stats[hook]
+        timed = (self.budget is not None and hasattr(signal, "setitimer") and
+                 threading.current_thread() is threading.main_thread())
+        if timed:
+            previous = signal.signal(signal.SIGALRM, self.interrupt)
+            signal.setitimer(signal.ITIMER_REAL, self.budget)
+        answered = False
+        answer = None
+        start = perf_counter()
+        try:
+            #the timer is stopped before anything else is done with the
+            #outcome, and if it goes off first the BudgetExceeded it raises
+            #is still inside this try
+            try:
+                self.running = True
+                answer = getattr(self.bot, hook)(view, *args)
+            finally:
+                self.running = False
+                if timed:
+                    signal.setitimer(signal.ITIMER_REAL, 0)
+            answered = True
+        except BudgetExceeded:
+            stats.timeouts += 1
+        except Exception:
+            stats.errors += 1
+        finally:
+            elapsed = perf_counter() - start
+            if timed:
+                signal.signal(signal.SIGALRM, previous)
+        stats.add(elapsed)
+        if answered and self.budget is not None and elapsed > self.budget:
+            stats.timeouts += 1
+            return False, None
+        return answered, answer
+
+
+    def move(self, game, seat):
+        """
+        Returns the room the bot in seat moves to, or None to stay
+        """
+        view = make_view(game, seat)
+        answered, answer = self.call("choose_move", view)
+        room = whole_number(answer)
+        if answered and (answer is None or (room is not None and room >= 0 and
+                                            (game.board.free_neighbours(view.room, view.occupied) >> room) & 1)):
+            return room
+        if answered:
+            self.stats["choose_move"].invalid += 1
+        return self.fallback.choose_move(view)
+
+
+    def guess(self, game, seat):
+        """
+        Returns the guest and weapon card ids the bot in seat guesses
+        """
+        view = make_view(game, seat)
+        answered, answer = self.call("choose_guess", view)
+        if answered:
+            try:
+                guest, weapon = answer
+                guest, weapon = whole_number(guest), whole_number(weapon)
+                if guest in view.kinds[0] and weapon in view.kinds[1]:
+                    return guest, weapon
+            except (TypeError, ValueError):
+                pass
+            self.stats["choose_guess"].invalid += 1
+        return self.fallback.choose_guess(view)
+
+
+    def reveal(self, game, seat, guesser, guess, cards):
+        """
+        Returns which of cards, the card ids of the guess the bot in seat
+        holds, it shows to the guesser
+        """
+        view = make_view(game, seat, guess, guesser)
+        answered, answer = self.call("choose_reveal", view, cards)
+        card = whole_number(answer)
+        if answered and card in cards:
+            return card
+        if answered:
+            self.stats["choose_reveal"].invalid += 1
+        return self.fallback.choose_reveal(view, cards)
+
+
+def make_cpu_bots(names, num_cpu_players, budget=0.05):
+    """
+    This function returns a BotRunner for each CPU seat. names is a list of
+    bot names, one for each seat or a single name for all of them.
+    """
+    if len(names) == 1:
+        names = names * num_cpu_players
+    if len(names) != num_cpu_players:
+        raise ValueError("give one bot or one for each of the " + str(num_cpu_players) + " CPU players")
+    return [BotRunner(name, budget) for name in names]
+
+
+class BotStrategy(object):
+    """
+    The BotStrategy plays the user seat with a bot (see clue_strategies): it
+    moves where choose_move says and guesses with choose_guess when the bot
+    stays
+    """
+
+    def __init__(self, name, budget=0.05):
+        """
+        This method makes the bot and its runner
+        """
+        self.runner = BotRunner(name, budget)
+        self.game = None
+
+
+    def __call__(self, game):
+        """
+        Decide the next Action for the game
+        """
+        if game is not self.game or game.turns == 0:
+            self.game = game
+            self.runner.new_game(0, game.rng)
+        room = self.runner.move(game, 0)
+        if room is not None:
+            return Action("Move to a different room", room=game.board.names[room])
+        guest, weapon = self.runner.guess(game, 0)
+        names = game.variant.card_names
+        return Action("Make a guess", names[guest], names[weapon])
+
+
+register_bot("first_free")(Bot)
+register_bot("random")(RandomBot)
+register_bot("wanderer")(WandererBot)
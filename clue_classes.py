@@ -6,11 +6,20 @@ Created on Wed Jun 28 18:20:19 2018
 @author: Pritesh Patel
 """
 
-#import random module for randint function, also import the clue helpers
-#definitions and functions
+#import random module for the Random number generator, also import the clue
+#helpers definitions and functions
 
 import random
+from array import array
+from time import perf_counter
 from clue_helpers import *
+from clue_deduction import user_deduction
+from clue_board import board
+from clue_deal import deal, ENVELOPE
+from clue_journal import Journal
+from clue_variant import standard
+from clue_planner import movement_policies, pick_goal, plan_moves
+from clue_events import DEAL, MOVE, GUESS, REFUTE, WIN, ENVELOPE_SEAT
 
 class Player(object):
     """
@@ -20,8 +29,13 @@ class Player(object):
     during game setup. Cards are dealt during setup using the deal_cards
     method. Location is updated using the set_location method. There is
     also a __repr__ method to display the player object as simply the players
-    name.
+    name. Alongside the list of cards the player keeps a hand bitmask with the
+    bit for each card id set (see card_ids in clue_helpers).
     """
+
+    #the attributes are kept in slots instead of a dictionary so the many
+    #small objects a game is made of take as little memory as possible
+    __slots__ = ("name", "location", "cards", "hand")
      
     def __init__(self,name, location):
         """
@@ -31,6 +45,7 @@ class Player(object):
         self.name = name
         self.location = location
         self.cards = []
+        self.hand = 0
         
         
     def get_name(self):
@@ -46,6 +61,15 @@ class Player(object):
         the players card list attribute
         """
         self.cards.append(card)
+        self.hand |= card.bit
+
+
+    def clear_cards(self):
+        """
+        Clear cards method to take away all of the players cards
+        """
+        self.cards = []
+        self.hand = 0
         
          
     def get_cards(self):
@@ -83,10 +107,14 @@ class Location(object):
      The Location object contains attributes and methods for a location/room
      A location has a name an occupant and a list of adjoining rooms that can
      be reached from this location. The name and adjoining locations cannot be
-     changed once initialized but the occupant can change as players move around
+     changed once initialized but the occupant can change as players move around.
+     A location on the game board also has the id of its room in the board
+     index (see clue_board).
      """
+
+     __slots__ = ("name", "adjoining_locations", "occupant", "id")
      
-     def __init__(self,name, adj_locs):
+     def __init__(self,name, adj_locs, id=None):
          """
          Init an instance of the Location object. Each location will have a name
          and list of adjoining rooms that cannot be changed once initialized.
@@ -95,6 +123,7 @@ class Location(object):
          self.name = name
          self.adjoining_locations = adj_locs
          self.occupant = None
+         self.id = id
      
          
      def get_name(self):
@@ -161,17 +190,23 @@ class Location(object):
 class Guess(object):
     """
     The Guess class represents the elements of a guess. It includes attributes
-    for a guest, weapon and room for the guess. 
+    for a guest, weapon and room for the guess. It also keeps a bitmask with
+    the bits for the three cards in the guess set, which is used to compare
+    guesses and to check them against a players hand.
     """
+
+    __slots__ = ("guest", "room", "weapon", "mask")
     
-    def __init__(self,guest, weapon, room):
+    def __init__(self,guest, weapon, room, ids=card_ids):
         """
         This method initializes the guess object which consists of a guest, room
-        and weapon
+        and weapon. ids maps card names to card ids, the standard deck
+        unless a variant is being played.
         """
         self.guest = guest
         self.room = room
         self.weapon = weapon
+        self.mask = (1 << ids[guest]) | (1 << ids[weapon]) | (1 << ids[room])
      
          
     def __repr__(self):
@@ -186,29 +221,34 @@ class Guess(object):
         """
         This method allows the use of == for comparison of guesses. It compares
         all three attributes of the guess and makes suer all 3 match to consider
-        the guesses as equal.
+        the guesses as equal. The three cards are compared at once through
+        the guess bitmasks.
         """
-        if self.guest == other.guest and self.weapon == other.weapon and self.room == other.room:
-            return True
-        else:
-            return False
+        return self.mask == other.mask
      
       
 class Card(object):
     """
     This class represents a card. A card has a type called kind (guest, weapon or room)
     It also has a name that fits for that type/kind. There will be a total of 6
-    guest cards, 9 weapon cards and 9 room cards 
+    guest cards, 9 weapon cards and 9 room cards. Each card also has its
+    integer id from card_ids and the bit for that id, and the whole deck is
+    made once in the deck list below so games share the same Card objects.
+    Cards are never changed once made.
     """
+
+    __slots__ = ("kind", "name", "id", "bit")
     
-    def __init__(self, kind, name):
+    def __init__(self, kind, name, id=None):
         """
         This method initializes the Card object. The card object has a kind
         (guess, weapon or room) and a name for the specific item within that
-        kind
+        kind. The id is looked up in card_ids if it is not given.
         """
         self.kind = kind
         self.name = name
+        self.id = card_ids[name] if id is None else id
+        self.bit = 1 << self.id
      
 
     def get_card_kind(self):
@@ -231,144 +271,640 @@ class Card(object):
         and name 
         """
         return self.kind + ":" + self.name
-         
+
+
+#the full deck of cards in card id order, shared by every game
+deck = [Card(kind, name) for kind, name in zip(card_kinds, card_names)]
+
+#the deck of every variant played so far, by variant, made once and shared
+#by every game of that variant like the standard deck
+decks = {standard: deck}
+
+
+def variant_deck(variant):
+    """
+    Returns the deck of Card objects for a variant (see clue_variant)
+    """
+    if variant not in decks:
+        decks[variant] = [Card(kind, name, idx) for idx, (kind, name)
+                              in enumerate(zip(variant.card_kinds, variant.card_names))]
+    return decks[variant]
+
         
+class Action(object):
+    """
+    The Action class represents one choice the user can make on their turn.
+    The kind is one of the turn choices in the choices list (for example
+    "Make a guess" or "Move to a different room"). A guess action also has a
+    guest and a weapon, a move action has the name of the room to move to
+    and a scratch pad action can carry a note.
+    """
+
+    __slots__ = ("kind", "guest", "weapon", "room", "note")
+
+    def __init__(self, kind, guest=None, weapon=None, room=None, note=None):
+        """
+        This method initializes the Action object with its kind and the
+        optional details that go with that kind of action
+        """
+        self.kind = kind
+        self.guest = guest
+        self.weapon = weapon
+        self.room = room
+        self.note = note
+
+
+    def __repr__(self):
+        """
+        Representation method for an action. Returns the kind of action and
+        any details that were provided with it
+        """
+        details = [str(item) for item in (self.guest, self.weapon, self.room, self.note)
+                   if item is not None]
+        if details:
+            return self.kind + ": " + ", ".join(details)
+        return self.kind
+
+
+class GuessResult(object):
+    """
+    The GuessResult class holds the outcome of a guess. It records the guess
+    that was made, whether it was correct, the player who showed a card to
+    prove it wrong and the card that was shown. When the guess is wrong and
+    nobody but the user holds any of the cards, shown_by and card are None.
+    """
+
+    __slots__ = ("guess", "correct", "shown_by", "card")
+
+    def __init__(self, guess, correct, shown_by=None, card=None):
+        """
+        This method initializes the GuessResult object
+        """
+        self.guess = guess
+        self.correct = correct
+        self.shown_by = shown_by
+        self.card = card
+
+
+    def __repr__(self):
+        """
+        Representation method for a guess result. Returns a readable string
+        with the guess and the card that disproved it
+        """
+        if self.correct:
+            return "Correct guess: " + str(self.guess)
+        if self.shown_by is None:
+            return str(self.guess) + " not disproved by anyone else"
+        return str(self.guess) + " disproved by " + str(self.shown_by) + " with " + str(self.card)
+
+
+class MoveResult(object):
+    """
+    The MoveResult class holds the outcome of a player trying to move. It
+    records the player, the room they started in, the room they ended up in
+    and whether they actually moved. If the move was blocked, blocked_by is
+    the player already in the room they wanted. It is None when the room
+    does not adjoin the one they were in.
+    """
+
+    __slots__ = ("player", "from_location", "to_location", "moved", "blocked_by")
+
+    def __init__(self, player, from_location, to_location, moved, blocked_by=None):
+        """
+        This method initializes the MoveResult object
+        """
+        self.player = player
+        self.from_location = from_location
+        self.to_location = to_location
+        self.moved = moved
+        self.blocked_by = blocked_by
+
+
+    def __repr__(self):
+        """
+        Representation method for a move result. Returns a readable string
+        describing the move
+        """
+        if self.moved:
+            return str(self.player) + ": " + str(self.from_location) + " -> " + str(self.to_location)
+        return str(self.player) + " staying in " + str(self.from_location)
+
+
+class TurnResult(object):
+    """
+    The TurnResult class holds everything that happened on one user turn.
+    It records the action that was taken, the result of a guess or a move
+    if there was one, the moves the CPU players made afterwards and whether
+    the game is over (won is True when the user guessed correctly and ended
+    is True when the game finished for any reason).
+    """
+
+    __slots__ = ("action", "guess_result", "move_result", "cpu_moves", "won", "ended")
+
+    def __init__(self, action, guess_result=None, move_result=None, cpu_moves=None,
+                 won=False, ended=False):
+        """
+        This method initializes the TurnResult object
+        """
+        self.action = action
+        self.guess_result = guess_result
+        self.move_result = move_result
+        self.cpu_moves = cpu_moves if cpu_moves is not None else []
+        self.won = won
+        self.ended = ended
+
+
+    def __repr__(self):
+        """
+        Representation method for a turn result. Returns the action taken
+        and what came of it
+        """
+        if self.guess_result is not None:
+            return str(self.action) + " -> " + str(self.guess_result)
+        if self.move_result is not None:
+            return str(self.action) + " -> " + str(self.move_result)
+        return str(self.action)
+
+
 class Game(object):
     """
     The Game class manages the different aspects of a Clue game. It tracks
     the players, locations, guesses and cards used in a game.
+
+    The rules are implemented by headless methods (setup, find_card,
+    evaluate_guess, move_player, move_cpu_players, play_turn and play) that
+    never print or ask for input and return result objects instead. The
+    interactive methods (start_game, make_a_guess, move_rooms, cpu_take_turns
+    and take_turn) ask the user for their choices, call the headless methods
+    and print what happened.
     """
 
-    #init some basic tracking vars
-    locations = []
-    correct_guess = None
-    scratch_pad = ""
-        
-    def __init__(self, user_player, num_players):
+    def __init__(self, user_player, num_players, hints=False, seed=None, rng=None,
+                 deal_policy="mixed", journal=None, events=None, metrics=None, variant=None,
+                 movement="first_free", cpu_bots=None):
         """       
         The init method for the game class, sets up a new game. As input it
         takes the guest name that the player chooses to play with and the number
-        of players the player will play against
+        of players the player will play against. All of the game state belongs
+        to this instance so several games can be played in the same program.
+        If hints is True the game keeps a Deduction of what the user knows and
+        shows it with the scratch pad. All of the randomness in the game comes
+        from rng, a random.Random object, so the same seed always gives the
+        same envelope, deal and CPU play. A new Random is made if none is
+        given, seeded with seed. The deal_policy picks how cards are dealt
+        (see clue_deal). The scratch pad is kept in journal, a Journal object
+        (see clue_journal), which can be given to limit or spill its size.
+        If events is an EventLog (see clue_events) every deal, move, guess,
+        refutation and win is written to it. If metrics is a Metrics object
+        (see clue_metrics) the phases of every turn are timed and counted in
+        it. variant is the Variant to play (see clue_variant), the standard
+        game if None. Hints are only worked out for the standard game.
+        movement picks how the CPU players move (see clue_planner). If
+        cpu_bots is a list of BotRunner objects (see clue_bots), one for
+        each CPU player, the bots pick where the CPU players move and which
+        card they show instead.
         """       
      
-        #create the location list
-        for i in range (0, len(rooms)):
-            current_location = Location(rooms[i][0], rooms[i][1])
-            Game.locations.append(current_location)
+        self.variant = variant if variant is not None else standard
+        if self.variant is not standard:
+            if hints:
+                raise ValueError("hints are only available for the standard game")
+            if events is not None and self.variant.num_cards > 127:
+                raise ValueError("the event log only has room for card ids up to 127")
+        if user_player not in self.variant.guests:
+            raise ValueError(repr(user_player) + " is not one of the guests")
+        if not 2 <= num_players <= len(self.variant.guests):
+            raise ValueError("there must be 2 to " + str(len(self.variant.guests)) + " players")
+        self.deck = variant_deck(self.variant)
+        if movement not in movement_policies:
+            raise ValueError("Unknown movement policy " + repr(movement) + ", choose from " +
+                             ", ".join(movement_policies))
+        self.movement = movement
+        if cpu_bots is not None:
+            if movement != "first_free":
+                raise ValueError("CPU bots pick their own moves, the movement policy cannot be used with them")
+            if len(cpu_bots) != num_players - 1:
+                raise ValueError("there must be a bot for each of the " + str(num_players - 1) + " CPU players")
+        self.cpu_bots = cpu_bots
+
+        #create the location list, in the same order as the board index
+        self.board = self.variant.board
+        self.locations = []
+        for i, room in enumerate(self.variant.rooms):
+            current_location = Location(room[0], room[1], i)
+            self.locations.append(current_location)
         self.num_players = num_players
+        self.hints = hints
+        self.deal_policy = deal_policy
+        self.rng = rng if rng is not None else random.Random()
+        self.journal = journal if journal is not None else Journal()
+        self.journal.variant = self.variant
+        self.events = events
+        self.metrics = metrics
+        self.game_id = None
+        self.user_player = Player(user_player, self.locations[self.variant.start])
+        self.reset(seed)
+
+
+    def reset(self, seed=None):
+        """
+        The reset method returns the game to the state it was in right after
+        it was created, ready for setup or start_game to deal a new game. The
+        locations and the user player are kept and reused, only the occupants,
+        cards, envelope, scratch pad and turn tracking are cleared. If a seed
+        is given the random number generator is reseeded with it, otherwise
+        it carries on from where it was.
+        """
+
+        #remember the seed so the game can be replayed
+        if seed is not None:
+            self.rng.seed(seed)
+        self.seed = seed
+
+        #empty every room, the occupied bitmask has the bit set for the id of
+        #every room with someone in it
+        for loc in self.locations:
+            loc.occupant = None
+        self.occupied = 0
+
+        #User always starts in the start room, the Garage on the standard map
+        self.user_player.clear_cards()
+        self.place_player(self.user_player, self.locations[self.variant.start])
      
-        #User always starts in the Garage, the last location in the list
-        starting_location = Location(rooms[8][0],rooms[8][1])
-        self.user_player = Player(user_player, starting_location)
-        Game.locations[8].player_enters(self.user_player)
-     
-        #Then initialize a list of CPU players
+        #Then initialize a list of CPU players, and the rooms they are
+        #heading for when the planner moves them
         self.cpu_players = []
+        self.cpu_goals = []
+
+        #the envelope, the scratch pad journal and the hints are filled in by
+        #setup. holders has the seat holding each card id, or ENVELOPE, and
+        #shown is a bitmask of the cards CPU players have shown the user
+        self.correct_guess = None
+        self.holders = array("b", [ENVELOPE]) * self.variant.num_cards
+        self.shown = 0
+        self.journal.clear()
+        self.deduction = None
+
+        #track how many turns have been played, the last turn result and if
+        #the user has won
+        self.turns = 0
+        self.last_result = None
+        self.won = False
          
          
-    def start_game(self):
-        """       
-        The start game method sets up the game by creating the CPU players
-        and creating the envelope that holds the correct guess and finally
-        dealing out the remaining cards to all of the players
-        """       
+    def fork(self, rng=None, deduction=True):
+        """
+        The fork method returns an independent copy of the game that can be
+        played on, for instance to try out moves, without changing this one.
+        The parts of a game that never change once it is set up are shared:
+        the variant with its board and card tables, the Card objects and
+        the correct guess. Only the small state that changes while playing
+        is copied: the Location and Player objects with their hands, the
+        occupied bitmask, the holders array, the cards shown, the hint
+        deduction and the turn tracking. The scratch pad records are shared
+        until either game adds one. The copy has no event log, metrics or
+        CPU bots, so its CPU players move by the movement policy. The last
+        turn result is copied with the players and rooms of the copy. rng is
+        the random number generator for the copy, if None a new one seeded
+        from this game's generator. If deduction is False the copy gets no
+        hint deduction, which saves copying it when the copy does not need
+        one.
+        """
 
-        #initialize the CPU players
+        child = Game.__new__(Game)
+        child.variant = self.variant
+        child.deck = self.deck
+        child.movement = self.movement
+        child.cpu_bots = None
+        child.board = self.board
+        child.num_players = self.num_players
+        child.hints = self.hints
+        child.deal_policy = self.deal_policy
+        child.rng = rng if rng is not None else random.Random(self.rng.getrandbits(64))
+        child.journal = self.journal.fork()
+        child.events = None
+        child.metrics = None
+        child.game_id = None
+        child.seed = self.seed
+
+        #copy the players and put them in copies of their rooms
+        child.locations = []
+        for loc in self.locations:
+            current_location = Location.__new__(Location)
+            current_location.name = loc.name
+            current_location.adjoining_locations = loc.adjoining_locations
+            current_location.occupant = None
+            current_location.id = loc.id
+            child.locations.append(current_location)
+        players = []
+        for player in [self.user_player] + self.cpu_players:
+            copy = Player.__new__(Player)
+            copy.name = player.name
+            copy.location = child.locations[player.location.id]
+            copy.cards = list(player.cards)
+            copy.hand = player.hand
+            copy.location.occupant = copy
+            players.append(copy)
+        child.user_player = players[0]
+        child.cpu_players = players[1:]
+        child.occupied = self.occupied
+        child.cpu_goals = list(self.cpu_goals)
+
+        child.correct_guess = self.correct_guess
+        child.holders = array("b", self.holders)
+        child.shown = self.shown
+        child.deduction = self.deduction.copy() if deduction and self.deduction is not None else None
+        child.turns = self.turns
+        child.last_result = None
+        if self.last_result is not None:
+            parents = [self.user_player] + self.cpu_players
+            child.last_result = child.copy_result(self.last_result, parents)
+        child.won = self.won
+        return child
+
+
+    def copy_result(self, result, players):
+        """
+        The copy result method returns a copy of a TurnResult of another game,
+        such as the one this game was forked from, with its players and rooms
+        swapped for the ones in this game. players lists the players of the
+        other game in seat order, user first.
+        """
+
+        seats = dict((id(player), seat) for seat, player in enumerate(players))
+        mine = [self.user_player] + self.cpu_players
+
+        def player_for(player):
+            return mine[seats[id(player)]] if player is not None else None
+
+        def location_for(location):
+            return self.locations[location.id] if location is not None else None
+
+        def move_for(move):
+            if move is None:
+                return None
+            return MoveResult(player_for(move.player), location_for(move.from_location),
+                              location_for(move.to_location), move.moved, player_for(move.blocked_by))
+
+        guess = result.guess_result
+        if guess is not None:
+            guess = GuessResult(guess.guess, guess.correct, player_for(guess.shown_by), guess.card)
+        return TurnResult(result.action, guess, move_for(result.move_result),
+                          [move_for(move) for move in result.cpu_moves], result.won, result.ended)
+
+
+    @property
+    def scratch_pad(self):
+        """
+        The scratch pad as text, made from the journal when it is asked for
+        """
+        return str(self.journal)
+
+
+    def setup(self):
+        """
+        The setup method creates the CPU players, picks the correct guess for
+        the envelope and deals out the remaining cards to all of the players.
+        It does not print anything, start_game calls it and then displays
+        the result for the user.
+        """
+
+        metrics = self.metrics
+        if metrics is not None:
+            start = perf_counter()
+            metrics.count("games")
+        self.add_cpu_players()
+
+        #Randomly pick a correct guess and the order the rest of the cards
+        #are dealt in
+        if metrics is not None:
+            deal_start = perf_counter()
+        envelope, order = deal(self.rng, self.deal_policy, self.variant.kind_ids)
+
+        #Create a Guess object called Correct Guess that holds the answer 
+        names = self.variant.card_names
+        self.correct_guess = Guess(names[envelope[0]], \
+                              names[envelope[1]], \
+                              names[envelope[2]], self.variant.card_ids)
+
+        #Now deal out the remaining cards, evenly across all players starting
+        #with the user
+        players = [self.user_player] + self.cpu_players
+        for position, card in enumerate(order):
+            players[position % self.num_players].deal_card(self.deck[card])
+            self.holders[card] = position % self.num_players
+        if metrics is not None:
+            metrics.time("deal", deal_start)
+        if self.events is not None:
+            self.game_id = self.events.new_game()
+            for card in envelope:
+                self.log_event(DEAL, ENVELOPE_SEAT, card)
+            for position, card in enumerate(order):
+                self.log_event(DEAL, position % self.num_players, card)
+
+        #tell the bots which seat they play
+        if self.cpu_bots is not None:
+            for seat, runner in enumerate(self.cpu_bots, 1):
+                runner.new_game(seat, self.rng)
+
+        #Add the users cards automatically to the scratch pad
+        self.journal.add_cards(self.user_player.get_cards())
+
+        #start the users deduction with their own hand
+        if self.hints:
+            self.deduction = user_deduction(self)
+        if metrics is not None:
+            metrics.time("setup", start)
+
+
+    def add_cpu_players(self):
+        """
+        This method creates the CPU players, one for each of the guests the
+        user is not playing up to the number of players, and puts each one in
+        the room with the same index as their guest
+        """
         count=1
-        for idx, guest in enumerate(guests):
+        for idx, guest in enumerate(self.variant.guests):
             if guest == self.user_player.get_name():
                 continue
             else:
-                current_player = Player(guest, Game.locations[idx])
+                current_player = Player(guest, self.locations[idx])
                 self.cpu_players.append(current_player)
-                Game.locations[idx].player_enters(current_player)
+                self.place_player(current_player, self.locations[idx])
                 count += 1
                 if count >= self.num_players:
                     break
 
+
+    def seat(self, player):
+        """
+        Returns the seat of a player, 0 for the user and 1 onwards for the
+        CPU players in order
+        """
+        if player is self.user_player:
+            return 0
+        return self.cpu_players.index(player) + 1
+
+
+    def seat_player(self, seat):
+        """
+        Returns the player in a seat
+        """
+        if seat == 0:
+            return self.user_player
+        return self.cpu_players[seat - 1]
+
+
+    def log_event(self, kind, seat, a=-1, b=-1, c=-1, d=-1):
+        """
+        This method writes an event for this game to the event log, if the
+        game has one (see clue_events for what a, b, c and d hold)
+        """
+        if self.events is not None:
+            self.events.write(kind, self.game_id, self.turns, seat, a, b, c, d)
+
+
+    def log_move(self, seat, result):
+        """
+        This method writes a MoveResult to the event log
+        """
+        if self.events is not None:
+            to_room = result.to_location.id if result.to_location is not None else -1
+            blocked = self.seat(result.blocked_by) if result.blocked_by is not None else -1
+            self.log_event(MOVE, seat, result.from_location.id, to_room, int(result.moved), blocked)
+
+
+    def start_game(self):
+        """       
+        The start game method sets up the game by creating the CPU players
+        and creating the envelope that holds the correct guess and finally
+        dealing out the remaining cards to all of the players
+        """       
+
+        self.setup()
+
         #Display who is who
         print("\nUser is", self.user_player)
         for count in range(0, len(self.cpu_players)):
             print("CPU Player", count+1,"is", self.cpu_players[count])
-  
-        #Randomly pick a correct guess                      
-        envelope_guest = random.randint(0, len(guests) - 1)
-        envelope_weapon = random.randint(0, len(weapons) - 1)
-        envelope_room = random.randint(0, len(rooms) -1)
-            
-        #Create a Guess object called Correct Guess that holds the answer 
-        Game.correct_guess = Guess(guests[envelope_guest], \
-                              weapons[envelope_weapon], \
-                              rooms[envelope_room][0])
         print("\nRandomly selected Correct Guess Cards are in the Envelope")
-        
-        #Create lists to hold the rest of the cards out the remaining cards
-        all_cards=[[],[],[]]
-        all_cards[0] = [Card("Guest", guest) for guest in guests \
-                      if guest != guests[envelope_guest]] 
+        print("\nRemaining cards have been dealt out")
 
-        all_cards[1] = [Card("Weapon", weapon) for weapon in weapons \
-                      if weapon != weapons[envelope_weapon]] 
 
-        all_cards[2] = [Card("Room", room[0]) for room in rooms \
-                      if room != rooms[envelope_room]] 
+    def refuters(self, guesser=None):
+        """
+        This method returns the list of players in the order they are asked
+        to disprove a guess by guesser (the user if None): everyone else in
+        seating order, starting with the player after the guesser
+        """
+        players = [self.user_player] + self.cpu_players
+        seat = self.seat(guesser) if guesser is not None else 0
+        return players[seat + 1:] + players[:seat]
 
-        count = 0
 
-        #Now deal out the remaining cards
-        while all_cards[0] != [] or all_cards[1] != [] or all_cards[2] != []:
+    def find_card(self, guess, guesser=None):
+        """
+        This method finds a card that proves a guess by guesser (the user if
+        None) wrong. It looks up the holder of each guessed card in the
+        holders index and returns a tuple of the first of them in seating
+        order after the guesser and the lowest card id they hold out of the
+        guess, or the card their bot picks if the game has CPU bots. It
+        returns (None, None) if nobody else holds any of the guessed cards.
+        """
 
-            #Randomly pick which kind of card to pull from. This way player gets random
-            #distribution of kinds (guesses, rooms, weapons)
-            which_deck = random.randint(0,2)
+        metrics = self.metrics
+        if metrics is not None:
+            start = perf_counter()
 
-            #If that deck is empty then skip
-            if all_cards[which_deck] == []:
+        #the guest, weapon and room card ids are in increasing order, so the
+        #first card found for the closest holder is their lowest one
+        seat = self.seat(guesser) if guesser is not None else 0
+        best = None
+        best_distance = self.num_players
+        ids = self.variant.card_ids
+        for card in (ids[guess.guest], ids[guess.weapon], ids[guess.room]):
+            holder = self.holders[card]
+            if holder == ENVELOPE or holder == seat:
                 continue
-
-            #Randomly pick which actual of card to pick. 
-            which_card = random.randint(0, len(all_cards[which_deck]) - 1)
-
-            #Distribute the cards evenly across all players
-            count = count % self.num_players
-            if count % self.num_players:
-                self.cpu_players[count-1].deal_card(all_cards[which_deck][which_card])
-            else:
-                self.user_player.deal_card(all_cards[which_deck][which_card])
-            count+=1
-            all_cards[which_deck].pop(which_card)
-
-        #Add the users cards automatically to the scratch pad
-        Game.scratch_pad += "YOUR CARDS -" + str(self.user_player.get_cards()) + "\n"
-        print("\nRemaining cards have been dealt out")
-            
+            distance = (holder - seat) % self.num_players
+            if distance < best_distance:
+                best = card
+                best_distance = distance
+        if metrics is not None:
+            metrics.count("refuters_asked", best_distance if best is not None else self.num_players - 1)
+            metrics.time("refute", start)
+        if best is None:
+            return None, None
+        holder = self.holders[best]
+        if self.cpu_bots is not None and holder != 0:
+            guessed = (ids[guess.guest], ids[guess.weapon], ids[guess.room])
+            cards = tuple(card for card in guessed if self.holders[card] == holder)
+            mask = (1 << guessed[0]) | (1 << guessed[1]) | (1 << guessed[2])
+            best = self.cpu_bots[holder - 1].reveal(self, holder, seat, mask, cards)
+        return self.seat_player(holder), self.deck[best]
              
+
     def cpu_show_card(self, guess):
         """ 
         This method manages showing a card to the user when the user has guessed
-        incorrectly. It will cycle through CPU player cards until if finds a
-        card that matches the Users guess thereby proving the Guess incorrect
-        It returns True when a matching card is found. It can return False if
-        the card is not found which can happen when the user Guesses a card that
-        they already have.
+        incorrectly. The first CPU player after the user who holds one of the
+        guessed cards shows it. It returns True when a matching card is found.
+        It can return False if the card is not found which can happen when the
+        user Guesses a card that they already have.
         """
              
-        #go through all CPU players
-        for cpu_player in self.cpu_players:
-            found_card = False
-            cards = cpu_player.get_cards()
-             
-            #go through this CPU players cards, if any of them match any part of the guess
-            #show that card
-            for card in cards:
-                if card.name == guess.guest or card.name == guess.room or card.name == guess.weapon:
-                    print("CPU Player", cpu_player," has the card: ", card)
-                    Game.scratch_pad += "\nCPU Player " + str(cpu_player) +" has the card: " + str(card)
-                    found_card = True
-                    return True            
+        #look up who holds the guessed cards and show the first one
+        cpu_player, card = self.find_card(guess)
+        if cpu_player is not None:
+            print("CPU Player", cpu_player," has the card: ", card)
+            self.journal.add_shown(cpu_player, card)
+            self.shown |= card.bit
+            self.log_event(REFUTE, self.seat(cpu_player), card.id)
+            return True            
+        print("No CPU players have the card")
+        self.log_event(REFUTE, ENVELOPE_SEAT)
+        return False
+
+
+    def evaluate_guess(self, guest, weapon):
+        """
+        This method evaluates a guess by the user without asking for input or
+        printing. The room is always the users current location. It returns a
+        GuessResult with the card that proves the guess wrong, if any.
+        """
+
+        metrics = self.metrics
+        if metrics is not None:
+            start = perf_counter()
+            metrics.count("guesses")
+
+        #room is locked to current location for the player
+        room_guess = self.user_player.get_location().get_name()
+        ids = self.variant.card_ids
+        my_guess = Guess(guest, weapon, room_guess, ids)
+        self.journal.add_guess(my_guess)
+        self.log_event(GUESS, 0, ids[guest], ids[weapon], ids[room_guess])
+
+        if my_guess == self.correct_guess:
+            self.won = True
+            self.log_event(WIN, 0, ids[guest], ids[weapon], ids[room_guess])
+            result = GuessResult(my_guess, True)
         else:
-            print("No CPU players have the card")
-            return False
+            shown_by, card = self.find_card(my_guess)
+            if shown_by is not None:
+                self.journal.add_shown(shown_by, card)
+                self.shown |= card.bit
+            if self.events is not None:
+                self.log_event(REFUTE, self.seat(shown_by) if shown_by is not None else ENVELOPE_SEAT,
+                               card.id if card is not None else -1)
+            result = GuessResult(my_guess, False, shown_by, card)
+
+        if self.deduction is not None:
+            self.deduction.observe_guess(self, result)
+        if metrics is not None:
+            metrics.time("guess", start)
+        return result
+
       
     def make_a_guess(self):
         """ 
@@ -382,39 +918,58 @@ class Game(object):
         #ask the user for their guess
         print("Guess the murderer")
         murderer_guess = None
-        while murderer_guess not in guests:
-            murderer_guess=validate_input(guests)
+        while murderer_guess not in self.variant.guests:
+            murderer_guess=validate_input(self.variant.guests)
         print("Guess the weapon")           
         weapon_guess = None
-        while weapon_guess not in weapons:
-            weapon_guess=validate_input(weapons)
+        while weapon_guess not in self.variant.weapons:
+            weapon_guess=validate_input(self.variant.weapons)
 
-        #room is locked to current location for the player
-        room_guess = self.user_player.get_location().get_name()
+        result = self.play_turn(Action("Make a guess", murderer_guess, weapon_guess))
+        self.show_turn_result(result)
+        return result.won
 
-        my_guess = Guess(murderer_guess, weapon_guess,room_guess )
 
-        #if guess is right, then print out message and return True 
-        Game.scratch_pad += "\nYou guessed:" + str(my_guess)
-        print("Your Guess:",my_guess)
-        if my_guess == Game.correct_guess:
-            print("\n***YOU GUESSED IT!***\n")
-            print(Game.correct_guess)
-            return True
-        else:
-            #else call show_card method to show who has the card that proves the guess is wrong
-            print("Sorry that is not correct")
-            if (self.cpu_show_card(my_guess) == False):
-                for card in self.user_player.get_cards():
-                    if card.name == my_guess.guest or card.name == my_guess.room or card.name == my_guess.weapon:
-                        print("You have the card:", card)
-                        break
-                else:
-                    print("ERROR - MISSING CARD") 
-                
-            #finally make the CPU players take a turn (move around the map/board
-            self.cpu_take_turns()
-        return False
+    def place_player(self, player, location):
+        """
+        This method puts a player into a location, taking them out of the
+        location they were in if they were already on the board, and keeps
+        the occupied bitmask up to date
+        """
+        current_location = player.get_location()
+        if current_location is not None and current_location.occupant is player:
+            current_location.player_leaves(player)
+            self.occupied &= ~(1 << current_location.id)
+        location.player_enters(player)
+        player.set_location(location)
+        self.occupied |= 1 << location.id
+
+
+    def move_player(self, player, room_name):
+        """
+        This method moves a player to the room with the given name without
+        printing anything. The player only moves if the room adjoins the one
+        they are in and is free. It returns a MoveResult describing what
+        happened.
+        """
+
+        current_location = player.get_location()
+
+        #find the room and check it can be reached from here and its free
+        room = self.board.ids.get(room_name)
+        if room is None:
+            return MoveResult(player, current_location, None, False)
+        loc = self.locations[room]
+        if not (self.board.adjacency[current_location.id] >> room) & 1:
+            return MoveResult(player, current_location, loc, False)
+        if (self.occupied >> room) & 1:
+            if self.metrics is not None:
+                self.metrics.count("moves_blocked")
+            return MoveResult(player, current_location, loc, False, loc.occupant)
+
+        #if its free, move the player from current location to the new room
+        self.place_player(player, loc)
+        return MoveResult(player, current_location, loc, True)
 
 
     def move_rooms(self):
@@ -435,31 +990,90 @@ class Game(object):
             
         #get the users choice 
         new_location = validate_input(location_options)
-            
-        #find the room and check if its free
-        for loc in Game.locations:
-            if loc.get_name() != new_location:
-                continue
+
+        result = self.play_turn(Action("Move to a different room", room=new_location))
+        self.show_turn_result(result)
+
+
+    def move_cpu_players(self):
+        """
+        This method moves every CPU player to the first free adjoining room
+        (in the order of the locations list) without printing anything, or
+        towards their goal rooms with the "planner" movement policy, or where
+        their bots pick if the game has CPU bots. If all adjoining rooms are
+        occupied the CPU player stays in place. It returns a list with a
+        MoveResult for each CPU player.
+        """
+
+        if self.movement == "planner":
+            return self.plan_cpu_moves()
+        metrics = self.metrics
+        if metrics is not None:
+            start = perf_counter()
+        cpu_bots = self.cpu_bots
+        moves = []
+        for seat, cpu_player in enumerate(self.cpu_players, 1):
+            current_location = cpu_player.get_location()
+            if cpu_bots is not None:
+                room = cpu_bots[seat - 1].move(self, seat)
             else:
-                if loc.is_occupied():
-                    print("Sorry,",loc.occupant,"is already in that room")
-                    print("If all adjoining rooms are occupied please make a")
-                    print("guess which will make the CPU players will move")
-                else:
-            
-                    #if its free, move the user from current location to their new room choice 
-                    for idx, location in enumerate(Game.locations):
-                        if location.get_name() == current_location.get_name():
-                            Game.locations[idx].player_leaves(self.user_player)
-                        else:
-                            continue
-                    loc.player_enters(self.user_player)
-                    self.user_player.set_location(loc)
-                    print("You are now in the", loc)
-                break
-        else:
-            print("Sorry, all adjoining rooms are occupied. Please make a")
-            print("guess which will make the CPU players will move")
+                room = self.board.first_free_neighbour(current_location.id, self.occupied)
+            if room is None:
+                if metrics is not None:
+                    metrics.count("stalls")
+                moves.append(MoveResult(cpu_player, current_location, current_location, False))
+            else:
+                self.place_player(cpu_player, self.locations[room])
+                moves.append(MoveResult(cpu_player, current_location, self.locations[room], True))
+        if metrics is not None:
+            metrics.time("cpu_moves", start)
+        if self.events is not None:
+            for seat, move in enumerate(moves, 1):
+                self.log_move(seat, move)
+        return moves
+
+
+    def plan_cpu_moves(self):
+        """
+        This method moves the CPU players with the planner (see
+        clue_planner), all together, each one step towards their goal room,
+        picking a new goal for those who got there. It returns a list with a
+        MoveResult for each CPU player.
+        """
+
+        metrics = self.metrics
+        if metrics is not None:
+            start = perf_counter()
+        positions = tuple(cpu_player.get_location().id for cpu_player in self.cpu_players)
+        user_room = self.user_player.get_location().id
+        if len(self.cpu_goals) != len(positions):
+            self.cpu_goals = [pick_goal(self.board, self.rng, room, user_room) for room in positions]
+        targets, order = plan_moves(self.board, user_room, positions, tuple(self.cpu_goals))
+
+        #make the moves in the planned order, so each room is free when
+        #someone steps into it
+        for seat in order:
+            self.place_player(self.cpu_players[seat], self.locations[targets[seat]])
+        moves = []
+        for seat, cpu_player in enumerate(self.cpu_players):
+            from_location = self.locations[positions[seat]]
+            moved = targets[seat] != positions[seat]
+            moves.append(MoveResult(cpu_player, from_location, self.locations[targets[seat]], moved))
+
+            #a player who got there, or could not get any closer, heads
+            #somewhere else so nobody waits on a room for ever
+            to_goal = self.board.distance[self.cpu_goals[seat]]
+            if to_goal[targets[seat]] == 0 or to_goal[targets[seat]] >= to_goal[positions[seat]]:
+                self.cpu_goals[seat] = pick_goal(self.board, self.rng, targets[seat], user_room)
+            if not moved and metrics is not None:
+                metrics.count("stalls")
+        if metrics is not None:
+            metrics.time("cpu_moves", start)
+        if self.events is not None:
+            for seat, move in enumerate(moves, 1):
+                self.log_move(seat, move)
+        return moves
+
             
     def cpu_take_turns(self):
         """
@@ -470,28 +1084,128 @@ class Game(object):
         """
         
         print("\nCPU Players are taking turns. They will move to a new room if they can\n")
-        
-        for cpu_player in self.cpu_players:
-            
-            current_location = cpu_player.get_location()
-                        
-            location_options = current_location.get_adjoining_locations()
-           
-            for idx, loc in enumerate(Game.locations):
-                if loc.get_name() not in location_options:
-                    continue
-                else:
-                    if loc.is_occupied():
-                        continue
-                    else:
-                        print(cpu_player, "is leaving", current_location,"and entering", loc)
-                        current_location.player_leaves(cpu_player)
-                        loc.player_enters(cpu_player)
-                        cpu_player.set_location(loc)
-                        break
-                        
+        moves = self.move_cpu_players()
+        if self.metrics is not None:
+            start = perf_counter()
+            self.show_cpu_moves(moves)
+            self.metrics.time("render", start)
+        else:
+            self.show_cpu_moves(moves)
+
+
+    def play_turn(self, action):
+        """
+        This method plays one user turn from an Action object without asking
+        for input or printing. A wrong guess is followed by the CPU players
+        moving. It returns a TurnResult describing what happened, which is
+        also kept in the last_result attribute.
+        """
+
+        metrics = self.metrics
+        if metrics is not None:
+            start = perf_counter()
+            metrics.count("turns")
+        self.turns += 1
+        if action.kind == "Exit Game":
+            result = TurnResult(action, ended=True)
+        elif action.kind == "Make a guess":
+            guess_result = self.evaluate_guess(action.guest, action.weapon)
+            if guess_result.correct:
+                result = TurnResult(action, guess_result, won=True, ended=True)
+            else:
+                result = TurnResult(action, guess_result, cpu_moves=self.move_cpu_players())
+        elif action.kind == "Move to a different room":
+            result = TurnResult(action, move_result=self.move_player(self.user_player, action.room))
+            self.log_move(0, result.move_result)
+        else:
+            if action.kind == "Scratch Pad" and action.note is not None:
+                self.journal.add_note(action.note)
+            result = TurnResult(action)
+
+        #keep the result so decision callbacks can see what happened last turn
+        self.last_result = result
+        if metrics is not None:
+            metrics.time("action", start)
+        return result
+
+
+    def play(self, decide, max_turns=None):
+        """
+        This method plays a whole game without a terminal. The decide argument
+        is a callback that is given the game and returns the Action for the
+        next user turn. The game runs until it ends or max_turns turns have
+        been played and the method returns the list of TurnResult objects.
+        """
+
+        results = []
+        while max_turns is None or self.turns < max_turns:
+            result = self.play_turn(decide(self))
+            results.append(result)
+            if result.ended:
+                break
+        return results
+
+
+    def show_cpu_moves(self, moves):
+        """
+        This method prints out the moves made by the CPU players
+        """
+
+        for move in moves:
+            if move.moved:
+                print(move.player, "is leaving", move.from_location,"and entering", move.to_location)
+            else:
+                print("All adjoining rooms occupied,", move.player,"staying in", move.from_location)
+
+
+    def show_turn_result(self, result):
+        """
+        This method prints out what happened on a guess or move turn
+        """
+
+        if self.metrics is not None:
+            start = perf_counter()
+            self.render_turn_result(result)
+            self.metrics.time("render", start)
+        else:
+            self.render_turn_result(result)
+
+
+    def render_turn_result(self, result):
+        """
+        This method does the printing for show_turn_result
+        """
+
+        if result.guess_result is not None:
+            guess_result = result.guess_result
+            print("Your Guess:", guess_result.guess)
+            if guess_result.correct:
+                print("\n***YOU GUESSED IT!***\n")
+                print(self.correct_guess)
+                return
+            print("Sorry that is not correct")
+            if guess_result.shown_by is None:
+                print("No CPU players have the card")
+                matching = self.user_player.hand & guess_result.guess.mask
+                if matching:
+                    print("You have the card:", self.deck[(matching & -matching).bit_length() - 1])
             else:
-                print("All adjoining rooms occupied,", cpu_player,"staying in", current_location)
+                print("CPU Player", guess_result.shown_by," has the card: ", guess_result.card)
+            print("\nCPU Players are taking turns. They will move to a new room if they can\n")
+            self.show_cpu_moves(result.cpu_moves)
+        elif result.move_result is not None:
+            move = result.move_result
+            if move.moved:
+                print("You are now in the", move.to_location)
+            elif move.to_location is not None and move.blocked_by is None:
+                print("Sorry, the", move.to_location, "is not next to the", move.from_location)
+            elif move.to_location is not None:
+                print("Sorry,",move.blocked_by,"is already in that room")
+                print("If all adjoining rooms are occupied please make a")
+                print("guess which will make the CPU players will move")
+            else:
+                print("Sorry, all adjoining rooms are occupied. Please make a")
+                print("guess which will make the CPU players will move")
                        
           
     def take_turn(self,user):
@@ -506,26 +1220,34 @@ class Game(object):
         clear_screen()
 
         #display the map and then ask the user for their choice
-        display_map(Game.locations)
+        variant = self.variant
+        if self.metrics is not None:
+            start = perf_counter()
+            display_map(self.locations, variant.renderer, variant.short_names)
+            self.metrics.time("render", start)
+        else:
+            display_map(self.locations, variant.renderer, variant.short_names)
         print("\n\nNew Turn:")
         user_turn=validate_input(choices)
 
         #process the user choice
         if (user_turn == "Exit Game"):
-            return True
+            return self.play_turn(Action(user_turn)).ended
         elif (user_turn == "Scratch Pad"):
             clear_screen()
-            print(Game.scratch_pad)
+            print(self.journal.tail(scratch_pad_lines))
+            if self.deduction is not None:
+                print("\nHINTS:\n" + self.deduction.summary() + "\n")
             more_scratch = input("Add more notes:")
-            Game.scratch_pad += "\n" + more_scratch + "\n"
-            print(Game.scratch_pad)
+            self.play_turn(Action(user_turn, note=more_scratch))
+            print(self.journal.tail(scratch_pad_lines))
         elif (user_turn == "See my cards"):
             print("Your cards", self.user_player.get_cards())
         elif (user_turn == "Make a guess"):
             if self.make_a_guess() == True:
                 return True
         elif (user_turn == "Display Rules"):
-            display_rules()
+            display_rules(self.variant.guests, self.variant.weapons, self.variant.room_names)
         elif (user_turn == "Move to a different room"):
             self.move_rooms()
         return False  
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Dealing. These functions pick the envelope and deal the rest of the cards
+using card ids (see card_ids in clue_helpers) in a single pass with no
+retries. There are two dealing policies:
+
+    "mixed"    the original way of dealing: each card is drawn by picking a
+               kind at random from the kinds that still have cards left and
+               then a random card of that kind, which mixes the kinds each
+               player gets
+    "shuffle"  shuffle the remaining cards and deal them round robin
+
+Cards are always dealt round robin starting with seat 0, the user.
+"""
+
+from array import array
+from clue_helpers import *
+
+deal_policies = ["mixed", "shuffle"]
+
+#the holder id used for cards in the envelope
+ENVELOPE = -1
+
+#the card ids of each kind
+kind_ids = [[card_ids[guest] for guest in guests],
+            [card_ids[weapon] for weapon in weapons],
+            [card_ids[room[0]] for room in rooms]]
+
+
+def pick_envelope(rng, kinds=kind_ids):
+    """
+    This function picks a random guest, weapon and room card id for the
+    envelope. kinds is the list of the card ids of each kind, the standard
+    deck unless a variant is being played (see clue_variant).
+    """
+    return tuple(ids[rng.randint(0, len(ids) - 1)] for ids in kinds)
+
+
+def deal_order(envelope, rng, policy="mixed", kinds=kind_ids):
+    """
+    This function returns the list of card ids that are not in the envelope
+    in the order they are dealt out under the given policy
+    """
+
+    if policy == "shuffle":
+        order = [card for card in range(sum(len(ids) for ids in kinds)) if card not in envelope]
+        rng.shuffle(order)
+        return order
+    if policy != "mixed":
+        raise ValueError("Unknown deal policy " + repr(policy) + ", choose from " + ", ".join(deal_policies))
+
+    #only kinds with cards left are picked from, so there are no wasted draws,
+    #and a drawn card is swapped to the end of its deck so popping it is cheap
+    decks = [[card for card in ids if card not in envelope] for ids in kinds]
+    order = []
+    while decks:
+        which_deck = rng.randrange(len(decks))
+        cards = decks[which_deck]
+        which_card = rng.randrange(len(cards))
+        cards[which_card], cards[-1] = cards[-1], cards[which_card]
+        order.append(cards.pop())
+        if not cards:
+            decks[which_deck] = decks[-1]
+            decks.pop()
+    return order
+
+
+def deal(rng, policy="mixed", kinds=kind_ids):
+    """
+    This function picks the envelope and deals one game. It returns a tuple
+    of the envelope (guest, weapon, room) card ids and the list of card ids
+    in dealing order, where the card at position i goes to seat i modulo the
+    number of players.
+    """
+    envelope = pick_envelope(rng, kinds)
+    return envelope, deal_order(envelope, rng, policy, kinds)
+
+
+def deal_batch(num_games, num_players, rng, policy="mixed"):
+    """
+    This function deals num_games games at once into flat arrays. It returns
+    a tuple of an array with 3 envelope card ids per game and an array with
+    one holder per card per game, so the holder of card c in game k is
+    holders[k * number of cards + c] and is either a seat number or
+    ENVELOPE.
+    """
+    num_cards = len(card_names)
+    envelopes = array("b", bytes(3 * num_games))
+    holders = array("b", bytes(num_cards * num_games))
+    for game in range(num_games):
+        envelope, order = deal(rng, policy)
+        base = game * num_cards
+        for position, card in enumerate(order):
+            holders[base + card] = position % num_players
+        for kind, card in enumerate(envelope):
+            envelopes[3 * game + kind] = card
+            holders[base + card] = ENVELOPE
+    return envelopes, holders
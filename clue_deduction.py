@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Deduction engine. A Deduction object holds what one player knows about a
+game: who owns which cards, which cards each player cannot have, which
+refutations are still unexplained and the set of envelopes that are still
+possible. It is updated one event at a time and keeps everything as int
+bitmasks, so asking for the remaining candidates or card probabilities
+does not replay any history.
+
+There are 6 x 9 x 9 = 486 possible envelopes. Envelope (g, w, r) is bit
+(g * 9 + w) * 9 + r of the candidates bitmask, and card_slices[card] has the
+bits set for every envelope that contains that card, so ruling a card out
+of the envelope is one AND NOT.
+"""
+
+from clue_helpers import *
+
+num_guests = len(guests)
+num_weapons = len(weapons)
+num_rooms = len(rooms)
+num_cards = len(card_names)
+all_cards_mask = (1 << num_cards) - 1
+
+#the first card id of each kind and the bitmask of all cards of each kind
+kind_starts = [0, num_guests, num_guests + num_weapons]
+kind_masks = [((1 << num_guests) - 1),
+              ((1 << num_weapons) - 1) << num_guests,
+              ((1 << num_rooms) - 1) << (num_guests + num_weapons)]
+
+#build the envelope bitmask for every card
+card_slices = [0] * num_cards
+for g in range(num_guests):
+    for w in range(num_weapons):
+        for r in range(num_rooms):
+            bit = 1 << ((g * num_weapons + w) * num_rooms + r)
+            card_slices[g] |= bit
+            card_slices[num_guests + w] |= bit
+            card_slices[num_guests + num_weapons + r] |= bit
+all_envelopes = (1 << (num_guests * num_weapons * num_rooms)) - 1
+
+
+def envelope_cards(index):
+    """
+    Returns the (guest, weapon, room) card ids for an envelope index
+    """
+    rest, r = divmod(index, num_rooms)
+    g, w = divmod(rest, num_weapons)
+    return g, num_guests + w, num_guests + num_weapons + r
+
+
+class Deduction(object):
+    """
+    The Deduction class tracks the knowledge of one player. Players are
+    referred to by their position in the players list given when it is made.
+    Every event method adds what was learnt and then works out everything
+    that follows from it, raising ValueError if the events contradict each
+    other.
+    """
+
+    def __init__(self, players, hand_sizes=None):
+        """
+        This method initializes the deduction state for a game with the given
+        list of player names. If the number of cards each player holds is
+        known it can be given in hand_sizes, in the same order as players.
+        """
+        self.players = list(players)
+        self.hand_sizes = list(hand_sizes) if hand_sizes is not None else None
+        self.owner = [None] * num_cards
+        self.owned = [0] * len(self.players)
+        self.not_owned = [0] * len(self.players)
+        self.constraints = []
+        self.candidates = all_envelopes
+        self.in_envelope = 0
+
+
+    def copy(self):
+        """
+        Returns an independent copy of the deduction state
+        """
+        other = Deduction.__new__(Deduction)
+        other.players = self.players
+        other.hand_sizes = self.hand_sizes
+        other.owner = list(self.owner)
+        other.owned = list(self.owned)
+        other.not_owned = list(self.not_owned)
+        other.constraints = list(self.constraints)
+        other.candidates = self.candidates
+        other.in_envelope = self.in_envelope
+        return other
+
+
+    def player_index(self, player):
+        """
+        Returns the position of a player given as an index, a name or any
+        object whose str is the players name
+        """
+        if isinstance(player, int):
+            return player
+        return self.players.index(str(player))
+
+
+    #event methods
+
+    def deal(self, player, cards):
+        """
+        Records the hand dealt to a player, as a list of card ids. The player
+        holds exactly these cards and none of the others.
+        """
+        p = self.player_index(player)
+        mask = 0
+        for card in cards:
+            mask |= 1 << card
+        self._set_not_owned(p, all_cards_mask & ~mask)
+        for card in cards:
+            self._set_owner(p, card)
+        self._propagate()
+
+
+    def card_shown(self, player, card):
+        """
+        Records that a player showed a card, so they own it
+        """
+        self._set_owner(self.player_index(player), card)
+        self._propagate()
+
+
+    def refuted(self, player, guess_mask):
+        """
+        Records that a player refuted a guess with a card that was not seen,
+        so they own at least one of the cards in guess_mask
+        """
+        self.constraints.append((self.player_index(player), guess_mask))
+        self._propagate()
+
+
+    def not_held(self, player, guess_mask):
+        """
+        Records that a player could not refute a guess, so they own none of
+        the cards in guess_mask
+        """
+        self._set_not_owned(self.player_index(player), guess_mask)
+        self._propagate()
+
+
+    def no_refutation(self, guess_mask, guesser=None):
+        """
+        Records that nobody other than the guesser could refute a guess
+        """
+        for p in range(len(self.players)):
+            if guesser is None or p != self.player_index(guesser):
+                self._set_not_owned(p, guess_mask)
+        self._propagate()
+
+
+    def observe_guess(self, game, guess_result, guesser=None):
+        """
+        Records what the players in a Game showed when a guess was checked.
+        The players asked before the one who showed a card (in the order of
+        game.refuters) could not refute. If the card was shown to us it is
+        recorded, otherwise we only learn that the player holds one of the
+        guessed cards.
+        """
+        guesser = game.user_player if guesser is None else guesser
+        mask = guess_result.guess.mask
+        if guess_result.correct:
+            self._set_envelope(mask)
+            self._propagate()
+            return
+        for player in game.refuters(guesser):
+            if player is guess_result.shown_by:
+                break
+            self._set_not_owned(self.player_index(player), mask)
+        if guess_result.shown_by is None:
+            self._propagate()
+        elif guess_result.card is not None:
+            self.card_shown(guess_result.shown_by, guess_result.card.id)
+        else:
+            self.refuted(guess_result.shown_by, mask)
+
+
+    #questions
+
+    def remaining(self):
+        """
+        Returns the number of envelopes that are still possible
+        """
+        return self.candidates.bit_count()
+
+
+    def remaining_envelopes(self):
+        """
+        Returns a list of the (guest, weapon, room) names of every envelope
+        that is still possible
+        """
+        result = []
+        for index in mask_card_ids(self.candidates):
+            g, w, r = envelope_cards(index)
+            result.append((card_names[g], card_names[w], card_names[r]))
+        return result
+
+
+    def probabilities(self):
+        """
+        Returns a list with the chance that each card is in the envelope,
+        counting every remaining envelope as equally likely
+        """
+        total = self.candidates.bit_count()
+        if total == 0:
+            return [0.0] * num_cards
+        return [(self.candidates & card_slices[card]).bit_count() / total
+                for card in range(num_cards)]
+
+
+    def possible_cards(self):
+        """
+        Returns a bitmask of the cards that are in at least one remaining
+        envelope
+        """
+        mask = 0
+        for card in range(num_cards):
+            if self.candidates & card_slices[card]:
+                mask |= 1 << card
+        return mask
+
+
+    def solution(self):
+        """
+        Returns the (guest, weapon, room) names of the envelope if only one is
+        still possible, otherwise None
+        """
+        if self.candidates.bit_count() != 1:
+            return None
+        return self.remaining_envelopes()[0]
+
+
+    def summary(self):
+        """
+        Returns a few lines of text describing what is known, for the user
+        hint display
+        """
+        solved = self.solution()
+        if solved is not None:
+            return "The answer must be " + solved[0] + " in the " + solved[2] + " with the " + solved[1]
+        chances = self.probabilities()
+        possible = self.possible_cards()
+        lines = [str(self.remaining()) + " possible answers remain"]
+        for kind, kind_mask in zip(("Guests", "Weapons", "Rooms"), kind_masks):
+            names = ["{} {:.0%}".format(card_names[card], chances[card])
+                     for card in mask_card_ids(possible & kind_mask)]
+            lines.append(kind + ": " + ", ".join(names))
+        return "\n".join(lines)
+
+
+    #internal bookkeeping
+
+    def _set_owner(self, p, card):
+        """
+        Records that player p owns a card
+        """
+        if self.owner[card] == p:
+            return
+        if self.owner[card] is not None or (self.not_owned[p] >> card) & 1 or (self.in_envelope >> card) & 1:
+            raise ValueError("Contradiction: " + self.players[p] + " cannot own " + card_names[card])
+        bit = 1 << card
+        self.owner[card] = p
+        self.owned[p] |= bit
+        for q in range(len(self.players)):
+            if q != p:
+                self.not_owned[q] |= bit
+        self.candidates &= ~card_slices[card]
+
+
+    def _set_not_owned(self, p, mask):
+        """
+        Records that player p owns none of the cards in mask
+        """
+        if self.owned[p] & mask:
+            raise ValueError("Contradiction: " + self.players[p] + " owns one of the cards")
+        self.not_owned[p] |= mask
+
+
+    def _set_envelope(self, mask):
+        """
+        Records that every card in mask is in the envelope
+        """
+        for card in mask_card_ids(mask & ~self.in_envelope):
+            if self.owner[card] is not None:
+                raise ValueError("Contradiction: " + card_names[card] + " is owned")
+            self.in_envelope |= 1 << card
+            self.candidates &= card_slices[card]
+            for q in range(len(self.players)):
+                self.not_owned[q] |= 1 << card
+
+
+    def _propagate(self):
+        """
+        Works out everything that follows from what is known, repeating until
+        nothing new is learnt
+        """
+        changed = True
+        while changed:
+            changed = False
+
+            #unexplained refutations: drop the cards the player cannot have and
+            #if only one is left they must own it
+            remaining_constraints = []
+            for p, mask in self.constraints:
+                if mask & self.owned[p]:
+                    continue
+                mask &= ~self.not_owned[p]
+                if mask == 0:
+                    raise ValueError("Contradiction: " + self.players[p] + " cannot refute")
+                if mask & (mask - 1) == 0:
+                    self._set_owner(p, mask.bit_length() - 1)
+                    changed = True
+                else:
+                    remaining_constraints.append((p, mask))
+            self.constraints = remaining_constraints
+
+            #a player holding as many known cards as their hand size owns no others
+            if self.hand_sizes is not None:
+                for p, size in enumerate(self.hand_sizes):
+                    if self.owned[p].bit_count() == size and (self.not_owned[p] | self.owned[p]) != all_cards_mask:
+                        self.not_owned[p] = all_cards_mask & ~self.owned[p]
+                        changed = True
+
+            #cards that nobody can own are in the envelope, and cards that are in
+            #every remaining envelope are not owned by anyone
+            if self.candidates == 0:
+                raise ValueError("Contradiction: no envelope is possible")
+            unowned = all_cards_mask
+            for mask in self.not_owned:
+                unowned &= mask
+            certain = 0
+            for card in range(num_cards):
+                if self.candidates & ~card_slices[card] == 0:
+                    certain |= 1 << card
+            new_envelope = (unowned | certain) & ~self.in_envelope
+            if new_envelope:
+                self._set_envelope(new_envelope)
+                changed = True
+
+            #a card that cannot be in the envelope and that only one player
+            #could own belongs to that player
+            for card in range(num_cards):
+                if self.owner[card] is not None or self.candidates & card_slices[card]:
+                    continue
+                possible = [p for p in range(len(self.players)) if not (self.not_owned[p] >> card) & 1]
+                if len(possible) == 1:
+                    self._set_owner(possible[0], card)
+                    changed = True
+
+
+def user_deduction(game):
+    """
+    Returns a new Deduction for the user of a Game that has been set up,
+    with the users own hand already recorded. The user is player 0 and the
+    CPU players follow in order.
+    """
+    players = [game.user_player] + game.cpu_players
+    deduction = Deduction([player.get_name() for player in players],
+                          [len(player.get_cards()) for player in players])
+    deduction.deal(0, [card.id for card in game.user_player.get_cards()])
+    return deduction
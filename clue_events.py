@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Game event log. A Game given an EventLog appends a 20 byte record to the log
+file for every deal, move, guess, refutation and win, so games can be
+analysed without reading what was printed. Every record has the same layout:
+
+    offset  size  field
+         0     4  source, set by the writer (the tournament job number)
+         4     1  kind, an index into event_kinds
+         5     1  seat, 0 is the user and the CPU players follow in order
+         6     1  version of this layout, LAYOUT_VERSION
+         7     1  unused, 0
+         8     4  game number within the source
+        12     4  turn the event happened on
+        16     1  a \
+        17     1  b  |  depend on the kind, -1 if not used
+        18     1  c  |
+        19     1  d /
+
+    kind    seat                     a          b          c       d
+    deal    holder, -1 for envelope  card id
+    move    player moving            from room  to room    moved   seat in the way
+    guess   guesser                  guest id   weapon id  room id
+    refute  player showing, -1 none  card id
+    win     winner                   guest id   weapon id  room id
+
+Cards are card ids from clue_helpers and rooms are board ids. The file is
+opened in append mode and records are only ever written in whole records,
+so several processes can append to the same log.
+
+The readers map the file into memory. read_events and stream_events return
+NumPy structured arrays (NumPy is only needed for those two) and iter_events
+unpacks plain tuples. They raise ValueError for a log written with another
+layout, such as the 16 byte records of version 1, which only had room for
+65536 sources.
+
+Example:
+    events = read_events("games.log")
+    guesses = events[events["kind"] == GUESS]
+"""
+
+import mmap
+import os
+import struct
+
+event_kinds = ["", "deal", "move", "guess", "refute", "win"]
+DEAL, MOVE, GUESS, REFUTE, WIN = range(1, 6)
+
+#the seat written for the envelope when dealing and for nobody refuting
+ENVELOPE_SEAT = -1
+
+#changed whenever the record layout changes
+LAYOUT_VERSION = 2
+
+record = struct.Struct("<IBbBxII4b")
+RECORD_SIZE = record.size
+
+#the same layout as a NumPy dtype description
+event_fields = [("source", "<u4"), ("kind", "u1"), ("seat", "i1"), ("version", "u1"), ("unused", "u1"),
+                ("game", "<u4"), ("turn", "<u4"), ("a", "i1"), ("b", "i1"), ("c", "i1"), ("d", "i1")]
+
+
+class EventLog(object):
+    """
+    The EventLog class appends event records to a log file. Records are
+    collected in a buffer and written when it is full, on flush and on
+    close.
+    """
+
+    def __init__(self, path, source=0, buffer_records=4096):
+        """
+        This method opens the log file for appending, creating it if needed.
+        source is written into every record to tell writers apart and must
+        fit in 4 bytes, otherwise ValueError is raised.
+        """
+        if not 0 <= source < 1 << 32:
+            raise ValueError("an event log source must be from 0 to " + str((1 << 32) - 1) +
+                             ", not " + str(source))
+        self.path = path
+        self.source = source
+        self.fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        self.buffer = bytearray(RECORD_SIZE * buffer_records)
+        self.used = 0
+        self.games = 0
+
+
+    def new_game(self):
+        """
+        Returns the number for the next game written to this log
+        """
+        self.games += 1
+        return self.games - 1
+
+
+    def write(self, kind, game, turn, seat, a=-1, b=-1, c=-1, d=-1):
+        """
+        Adds one record to the log
+        """
+        record.pack_into(self.buffer, self.used, self.source, kind, seat, LAYOUT_VERSION, game, turn,
+                         a, b, c, d)
+        self.used += RECORD_SIZE
+        if self.used == len(self.buffer):
+            self.flush()
+
+
+    def flush(self):
+        """
+        Writes the buffered records to the file, in one write unless the
+        system writes less than asked, when the rest is written after it
+        """
+        written = 0
+        with memoryview(self.buffer) as view:
+            while written < self.used:
+                written += os.write(self.fd, view[written:self.used])
+        self.used = 0
+
+
+    def close(self):
+        """
+        Writes any buffered records and closes the file
+        """
+        if self.fd is not None:
+            self.flush()
+            os.close(self.fd)
+            self.fd = None
+
+
+    def __enter__(self):
+        """
+        Lets the log be used in a with statement
+        """
+        return self
+
+
+    def __exit__(self, *exc_info):
+        """
+        Closes the log at the end of a with statement
+        """
+        self.close()
+
+
+def check_layout(log_file):
+    """
+    This function raises ValueError if the first record of an open log file
+    was not written with this layout. An empty log is fine.
+    """
+    first = os.pread(log_file.fileno(), RECORD_SIZE, 0)
+    if len(first) == RECORD_SIZE and first[6] != LAYOUT_VERSION:
+        raise ValueError(log_file.name + " is not an event log of layout version " + str(LAYOUT_VERSION))
+
+
+def iter_events(path):
+    """
+    This function yields every record in a log file as a tuple (source,
+    kind, seat, game, turn, a, b, c, d) without needing NumPy
+    """
+    with open(path, "rb") as log_file:
+        check_layout(log_file)
+        size = os.fstat(log_file.fileno()).st_size // RECORD_SIZE * RECORD_SIZE
+        if not size:
+            return
+        with mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as log_map:
+            view = memoryview(log_map)[:size]
+            try:
+                for fields in record.iter_unpack(view):
+                    yield fields[:3] + fields[4:]
+            finally:
+                view.release()
+
+
+def read_events(path, start=0, stop=None):
+    """
+    This function maps a log file into memory and returns records start to
+    stop as a read only NumPy structured array with the fields in
+    event_fields. Nothing is read until the array is used.
+    """
+    import numpy as np
+
+    dtype = np.dtype(event_fields)
+    with open(path, "rb") as log_file:
+        check_layout(log_file)
+        count = os.fstat(log_file.fileno()).st_size // RECORD_SIZE
+    stop = count if stop is None else min(stop, count)
+    start = min(max(0, start), stop)
+    if start == stop:
+        return np.zeros(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=start * RECORD_SIZE, shape=(stop - start,))
+
+
+def stream_events(path, chunk_records=1 << 16, start=0):
+    """
+    This function yields a log file as NumPy structured arrays of up to
+    chunk_records records each, starting at record start. Records appended
+    while the log is being streamed are picked up as well.
+    """
+    while True:
+        chunk = read_events(path, start, start + chunk_records)
+        if not len(chunk):
+            return
+        yield chunk
+        start += len(chunk)
@@ -7,12 +7,15 @@ Created on Wed Jun  27 17:36:33 2018
 """
 from platform import system as system_name # Returns the system/OS name
 from os import system as system_call       # Execute a shell command
+import sys
+from clue_render import MapRenderer
 
 
 guests = ["Professor Plum", "Miss Scarlet", "Reverend Green", "Mrs White", 
           "Colonel Mustard", "Madame Peacock"]
 
 guest_short = [" Plum  ","Scarlet"," Green "," White ","Mustard","Peacock"]
+short_names = dict(zip(guests, guest_short))
 
 weapons = ["Candlestick", "Knife", "Lead Pipe", "Revolver", "Rope",
            "Wrench", "Axe", "Poison", "Bat"]
@@ -27,17 +30,81 @@ rooms = [["Library",["Hall", "Dining Room", "Garage"]],
          ["Conservatory", ["Kitchen", "Basement", "Garage"]],
          ["Garage", ["Conservatory", "Theater", "Library"]] ]
 
+#Every card has a small integer id, guests first, then weapons, then rooms.
+#A set of cards (a hand or a guess) is stored as an int bitmask with the bit
+#for each card id set, so checking a hand against a guess is a single AND
+card_names = guests + weapons + [room[0] for room in rooms]
+card_kinds = ["Guest"] * len(guests) + ["Weapon"] * len(weapons) + ["Room"] * len(rooms)
+card_ids = dict((name, idx) for idx, name in enumerate(card_names))
+
+#How many of the latest scratch pad entries are shown at once
+scratch_pad_lines = 40
+
+#The map drawing, one string per line. The room map is hardcoded so the
+#{0} to {8} fields need to match the order of the rooms in the locations list
+map_template = [
+    "        +-------------------------------------------+",
+    "        |               |                |          |",
+    "Garage <->   Library   <->     Hall     <-> Study  <-> Kitchen",
+    "        |               |                |          |",
+    "        |    {0}    |     {1}    |  {2} |",
+    "        |               |                |          |",
+    "        |      ^        |       ^        |    ^     |",
+    "        +------|----------------|-------------|-----+",
+    "        |      v        |       v        |    v     |",
+    "        | Dining Room  <->   Basement   <-> Theater |",
+    "        |               |                |          |",
+    "        |    {3}    |     {4}    |  {5} |",
+    "        |      ^        |       ^        |    ^     |",
+    "        +------|----------------|-------------|-----+",
+    "        |      v        |       v        |    v     |",
+    " Study <->   Kitchen   <-> Conservatory <-> Garage <-> Library",
+    "        |               |                |          |",
+    "        |    {6}    |     {7}    |  {8} |",
+    "        |               |                |          |",
+    "        +-------------------------------------------+"]
+
+map_renderer = MapRenderer(map_template)
+
+#the renderer of the map drawn last, which clear_screen has to keep on screen
+active_renderer = map_renderer
+
 choices = ["Make a guess","See my cards","Move to a different room","Scratch Pad","Display Rules","Exit Game"]
 
+def card_mask(names):
+    """
+    Returns the bitmask for a list of card names
+    """
+    mask = 0
+    for name in names:
+        mask |= 1 << card_ids[name]
+    return mask
+
+
+def mask_card_ids(mask):
+    """
+    Returns a list of the card ids that are set in a bitmask, lowest first
+    """
+    ids = []
+    while mask:
+        low_bit = mask & -mask
+        ids.append(low_bit.bit_length() - 1)
+        mask ^= low_bit
+    return ids
+
+
 def clear_screen():
     """
     Clears the terminal screen. I found this code snippet on Stack Overflow to
-    use the right OS command for Windows and Mac.
+    use the right OS command for Windows and Mac. Other systems clear the
+    screen with escape codes instead of running a command, and nothing is
+    done when the output is not going to a terminal.
     """
 
-    command = "-cls" if system_name().lower()=="windows" else "clear"
-
-    system_call(command)
+    if system_name().lower()=="windows":
+        system_call("-cls")
+    elif sys.stdout.isatty():
+        active_renderer.clear()
 
 
 def validate_input(possible_choices):
@@ -75,16 +142,22 @@ def validate_input(possible_choices):
            return possible_choices[user_input-1]
             
     
-def display_map(locations):
+def display_map(locations, renderer=None, short=None):
     """
     This function prints out the map/board for the game. It will draw out an
     ascii text map. It takes as input a list of Location objects that show
     where each player is. The room map is hardcoded so needs to match
-    the order of the rooms in the locations list that is passed in.
+    the order of the rooms in the locations list that is passed in. On a
+    terminal the map stays at the top of the screen and only the rooms whose
+    occupant changed are redrawn (see clue_render). A variant (see
+    clue_variant) gives its own renderer and short guest names.
     """
+    global active_renderer
+    renderer = map_renderer if renderer is None else renderer
+    short = short_names if short is None else short
+
+#init the list that tracks which room is occupied and by whom
 
-#clear screen and init the list that tracks which room is occupied and by whom
-    clear_screen()
     print_loc = []
 
 #for each room, either create a blank space or fill in with a 7 character space
@@ -95,39 +168,19 @@ def display_map(locations):
         if loc.occupant == None:
             print_loc.append("       ")
         else:
-            for idx, guest in enumerate(guests):
-                if guest == loc.occupant.get_name():
-                    print_loc.append(guest_short[idx])
-                    
-#now print the map with each room populated. The room map is hardcoded so needs
-#to match the order of the rooms in the locations list that is passed in.
-    print("        +-------------------------------------------+")
-    print("        |               |                |          |" )
-    print("Garage <->   Library   <->     Hall     <-> Study  <-> Kitchen" )
-    print("        |               |                |          |" )     
-    print("        |   ",print_loc[0],"   |    ",print_loc[1],"   | ", print_loc[2],"|")    
-    print("        |               |                |          |" )    
-    print("        |      ^        |       ^        |    ^     |" )
-    print("        +------|----------------|-------------|-----+")
-    print("        |      v        |       v        |    v     |" )
-    print("        | Dining Room  <->   Basement   <-> Theater |" )
-    print("        |               |                |          |" )    
-    print("        |   ",print_loc[3],"   |    ",print_loc[4],"   | ", print_loc[5],"|")
-    print("        |      ^        |       ^        |    ^     |" )
-    print("        +------|----------------|-------------|-----+")
-    print("        |      v        |       v        |    v     |" )
-    print(" Study <->   Kitchen   <-> Conservatory <-> Garage <-> Library" )  
-    print("        |               |                |          |" )    
-    print("        |   ",print_loc[6],"   |    ",print_loc[7],"   | ", print_loc[8],"|")
-    print("        |               |                |          |" )    
-    print("        +-------------------------------------------+")     
+            print_loc.append(short[loc.occupant.get_name()])
+
+    if renderer is not active_renderer:
+        active_renderer.reset()
+        active_renderer = renderer
+    renderer.draw(print_loc)
          
    
-def display_intro():
+def display_intro(guest_names=guests, weapon_names=weapons, room_names=None):
     """
     This function creates a simple ASCII graphic title and then some
     intro information. It calls the display_rules function to print
-    out the rules
+    out the rules, with the cards of a variant if they are given
     """
 
     clear_screen()
@@ -144,30 +197,32 @@ def display_intro():
     print("Your job is to correctly guess where the murder was committed,") 
     print("using what weapon and by which guest.\n ")
     temp=input("Press Enter to Continue")
-    display_rules()
+    display_rules(guest_names, weapon_names, room_names)
 
     
-def display_rules():   
+def display_rules(guest_names=guests, weapon_names=weapons, room_names=None):
     """
-    This function prints out the rules and guidelines for the game
+    This function prints out the rules and guidelines for the game, with the
+    cards of a variant if they are given
     """
 
+    room_names = [room[0] for room in rooms] if room_names is None else room_names
     clear_screen()
     print("GAME RULES")
     print("------------------------------------------------------------------")
-    print("\nThe murderer could be one of the 6 guests:")
+    print("\nThe murderer could be one of the", len(guest_names), "guests:")
     print("     ", end=" ")
-    for guest in guests:
+    for guest in guest_names:
         print(guest, end=", ")
     print("\nYou will pick one of these guests to represent you, but bear in mind, that you could be the murderer\n ")
-    print("The weapon could be one of these 9 weapons:")
+    print("The weapon could be one of these", len(weapon_names), "weapons:")
     print("     ", end=" ")
-    for weapon in weapons:
+    for weapon in weapon_names:
         print(weapon, end=", ")
-    print("\n\nThe location of the murder could be one of these 9 rooms:")
+    print("\n\nThe location of the murder could be one of these", len(room_names), "rooms:")
     print("     ", end=" ")
-    for room in rooms:
-        print(room[0], end=", ")
+    for room in room_names:
+        print(room, end=", ")
     print("\nTo pick one of these rooms as part of your guess, you must be in that room at the time of your guess\n ")    
     print("To move around you can only go to certain rooms from certain rooms")
     print("The map is printed above your turn options so you can see where you can go")
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Scratch pad journal. Instead of one string that grows every time something
+is added, the journal keeps a list of small event records and only turns
+them into text when the scratch pad is looked at. Each record is a tuple
+starting with its kind:
+
+    ("cards", (card id, ...))       the users cards, in the order dealt
+    ("guess", guest, weapon, room)  a guess the user made, as card ids
+    ("shown", player name, card id) a card a CPU player showed the user
+    ("note", text)                  a note the user typed in
+
+A journal can be given a limit on the number of records it keeps. When it
+goes over the limit the oldest records are dropped, or if a spill file was
+given they are appended to that file as JSON lines, where they can still be
+read back.
+"""
+
+import json
+from clue_helpers import *
+from clue_variant import standard
+
+
+class Journal(object):
+    """
+    The Journal class keeps the scratch pad records for one game
+    """
+
+    def __init__(self, limit=None, spill_path=None, variant=None):
+        """
+        This method initializes an empty journal. limit is the most records
+        kept in memory (no limit if None) and spill_path is a file that
+        records over the limit are moved to. variant is the Variant whose
+        card ids the records use (see clue_variant), the standard game if
+        None.
+        """
+        self.limit = limit
+        self.spill_path = spill_path
+        self.variant = variant if variant is not None else standard
+        self.entries = []
+        self.shared = False
+        self.spilled = 0
+        self.dropped = 0
+
+
+    def clear(self):
+        """
+        Empties the journal, including its spill file
+        """
+        self.entries = []
+        self.shared = False
+        if self.spilled and self.spill_path is not None:
+            open(self.spill_path, "w").close()
+        self.spilled = 0
+        self.dropped = 0
+
+
+    def fork(self):
+        """
+        Returns a journal for a copy of the game (see Game.fork) that starts
+        with the records of this one. The record list is shared until either
+        journal adds a record. Records spilled to a file stay with this
+        journal, the copy counts them as dropped and drops its own.
+        """
+        other = Journal.__new__(Journal)
+        other.limit = self.limit
+        other.spill_path = None
+        other.variant = self.variant
+        other.entries = self.entries
+        other.spilled = 0
+        other.dropped = self.dropped + self.spilled
+        self.shared = other.shared = True
+        return other
+
+
+    def __len__(self):
+        """
+        Returns the number of records, including spilled and dropped ones
+        """
+        return self.dropped + self.spilled + len(self.entries)
+
+
+    #adding records
+
+    def add(self, entry):
+        """
+        Adds a record, spilling or dropping the oldest records if the journal
+        is over its limit
+        """
+        if self.shared:
+            self.entries = list(self.entries)
+            self.shared = False
+        self.entries.append(entry)
+        if self.limit is not None and len(self.entries) > self.limit:
+            extra = len(self.entries) - self.limit
+            old = self.entries[:extra]
+            del self.entries[:extra]
+            if self.spill_path is None:
+                self.dropped += extra
+            else:
+                with open(self.spill_path, "a") as spill:
+                    for record in old:
+                        spill.write(json.dumps(record) + "\n")
+                self.spilled += extra
+
+
+    def add_cards(self, cards):
+        """
+        Records the users cards, given as Card objects
+        """
+        self.add(("cards", tuple(card.id for card in cards)))
+
+
+    def add_guess(self, guess):
+        """
+        Records a guess the user made, given as a Guess object
+        """
+        ids = self.variant.card_ids
+        self.add(("guess", ids[guess.guest], ids[guess.weapon], ids[guess.room]))
+
+
+    def add_shown(self, player, card):
+        """
+        Records that a player showed the user a Card
+        """
+        self.add(("shown", str(player), card.id))
+
+
+    def add_note(self, text):
+        """
+        Records a note typed in by the user
+        """
+        self.add(("note", text))
+
+
+    #reading records
+
+    def records(self, start=0, stop=None):
+        """
+        Returns the list of records from position start up to stop, counting
+        from the oldest record still available. Spilled records are read back
+        from the spill file only when they are asked for.
+        """
+        total = self.spilled + len(self.entries)
+        stop = total if stop is None else min(stop, total)
+        start = max(0, start)
+        result = []
+        if start < self.spilled:
+            with open(self.spill_path) as spill:
+                for position, line in enumerate(spill):
+                    if position >= min(stop, self.spilled):
+                        break
+                    if position >= start:
+                        #JSON has no tuples, the card ids of a cards record
+                        #come back as a list
+                        result.append(tuple(tuple(field) if isinstance(field, list) else field
+                                            for field in json.loads(line)))
+        first = max(0, start - self.spilled)
+        result.extend(self.entries[first:max(first, stop - self.spilled)])
+        return result
+
+
+    def find(self, kind):
+        """
+        Returns the records of one kind that are still in memory
+        """
+        return [entry for entry in self.entries if entry[0] == kind]
+
+
+    def cards_seen(self):
+        """
+        Returns a list of (player name, card id) for every card the user has
+        been shown that is still in memory
+        """
+        return [(entry[1], entry[2]) for entry in self.entries if entry[0] == "shown"]
+
+
+    #rendering
+
+    def render_entry(self, entry):
+        """
+        Returns the scratch pad text for one record
+        """
+        kind = entry[0]
+        card_names = self.variant.card_names
+        card_kinds = self.variant.card_kinds
+        if kind == "cards":
+            return "YOUR CARDS -[" + ", ".join(card_kinds[card] + ":" + card_names[card] for card in entry[1]) + "]\n"
+        if kind == "guess":
+            return "\nYou guessed:" + card_names[entry[1]] + " in the " + card_names[entry[3]] + \
+                   " with the " + card_names[entry[2]]
+        if kind == "shown":
+            return "\nCPU Player " + entry[1] + " has the card: " + card_kinds[entry[2]] + ":" + card_names[entry[2]]
+        if kind == "note":
+            return "\n" + entry[1] + "\n"
+        return "\n" + str(entry)
+
+
+    def render(self, start=0, stop=None):
+        """
+        Returns the scratch pad text for the records from start to stop
+        """
+        return "".join(self.render_entry(entry) for entry in self.records(start, stop))
+
+
+    def tail(self, count):
+        """
+        Returns the scratch pad text for the last count records, with a line
+        saying how many earlier records there are
+        """
+        total = self.spilled + len(self.entries)
+        start = max(0, total - count)
+        text = self.render(start)
+        earlier = start + self.dropped
+        if earlier:
+            text = "(" + str(earlier) + " earlier entries)\n" + text
+        return text
+
+
+    def page(self, number, size=20):
+        """
+        Returns the scratch pad text for page number (starting at 0) when the
+        records are split into pages of size records
+        """
+        return self.render(number * size, (number + 1) * size)
+
+
+    def __str__(self):
+        """
+        Returns the whole scratch pad as text
+        """
+        return self.render()
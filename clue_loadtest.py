@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Load test client for the game server (see clue_server). It connects any
+number of simulated players to a server at the same time. Each one plays
+its games by moving to a random adjoining room or making a random guess,
+and exits a game that is not won within max turns. The time from sending
+each line to getting its answer is recorded, and a summary with the
+number of turns per second and the latency percentiles is printed as JSON.
+
+Example:
+    python clue_server.py --port 8791 &
+    python clue_loadtest.py --port 8791 --players 2000 --games 2
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import time
+
+from clue_helpers import *
+from clue_server import raise_file_limit
+
+#the rooms next to each room, by name
+adjoining = dict((room[0], room[1]) for room in rooms)
+
+
+async def request(reader, writer, record, latencies):
+    """
+    Sends one record and returns the first record of the answer, timing
+    how long the answer took
+    """
+    start = time.perf_counter()
+    writer.write((json.dumps(record) + "\n").encode("utf-8"))
+    await writer.drain()
+    line = await reader.readline()
+    latencies.append(time.perf_counter() - start)
+    if not line:
+        raise ConnectionError("the server closed the connection")
+    return json.loads(line)
+
+
+async def play_player(connect, rng, num_games, max_turns, stats):
+    """
+    Connects one simulated player and plays num_games games
+    """
+    reader, writer = await connect()
+    try:
+        for game in range(num_games):
+            start = await request(reader, writer, {"character": rng.choice(guests),
+                                                   "cpu_players": rng.randint(1, 5),
+                                                   "seed": rng.getrandbits(32)}, stats["latencies"])
+            if "error" in start:
+                stats["errors"] += 1
+                return
+            room = "Garage"
+            for turn in range(max_turns):
+                if rng.random() < 0.5:
+                    action = {"action": "Move to a different room", "room": rng.choice(adjoining[room])}
+                else:
+                    action = {"action": "Make a guess", "guest": rng.choice(guests),
+                              "weapon": rng.choice(weapons)}
+                result = await request(reader, writer, action, stats["latencies"])
+                if "error" in result:
+                    stats["errors"] += 1
+                    continue
+                stats["turns"] += 1
+                room = result["room"]
+                if result.get("won"):
+                    stats["won"] += 1
+                    break
+            else:
+                await request(reader, writer, {"action": "Exit Game"}, stats["latencies"])
+
+            #the answer to the last turn is followed by the end of the game
+            end = json.loads(await reader.readline())
+            if end.get("event") != "end":
+                stats["errors"] += 1
+            stats["games"] += 1
+    except (ConnectionError, ValueError):
+        stats["errors"] += 1
+    finally:
+        writer.close()
+
+
+def percentile(ordered, fraction):
+    """
+    Returns a percentile of an ordered list, or None if it is empty
+    """
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def run_load(num_players, num_games, max_turns, host="127.0.0.1", port=8791, path=None,
+                   seed=None):
+    """
+    This function plays num_players simulated players at once against a
+    server and returns a dictionary of statistics
+    """
+    if path is not None:
+        connect = lambda: asyncio.open_unix_connection(path)
+    else:
+        connect = lambda: asyncio.open_connection(host, port)
+    rng = random.Random(seed)
+    stats = {"games": 0, "turns": 0, "won": 0, "errors": 0, "latencies": []}
+
+    start = time.perf_counter()
+    await asyncio.gather(*[play_player(connect, random.Random(rng.getrandbits(64)), num_games,
+                                       max_turns, stats) for i in range(num_players)])
+    elapsed = time.perf_counter() - start
+
+    latencies = sorted(stats.pop("latencies"))
+    stats.update({"players": num_players, "seconds": elapsed,
+                  "requests": len(latencies),
+                  "requests_per_sec": len(latencies) / elapsed if elapsed else None,
+                  "turns_per_sec": stats["turns"] / elapsed if elapsed else None})
+    for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0)):
+        value = percentile(latencies, fraction)
+        stats["latency_" + name + "_ms"] = value * 1000 if value is not None else None
+    return stats
+
+
+def main():
+    """
+    Command line entry point for the load test client
+    """
+
+    parser = argparse.ArgumentParser(description="Simulate many players connected to a Clue server")
+    parser.add_argument("--host", default="127.0.0.1", help="server address")
+    parser.add_argument("--port", type=int, default=8791, help="server TCP port")
+    parser.add_argument("--unix", default=None, help="connect to this Unix socket instead of TCP")
+    parser.add_argument("--players", type=int, default=1000, help="players connected at once")
+    parser.add_argument("--games", type=int, default=1, help="games each player plays")
+    parser.add_argument("--max-turns", type=int, default=50,
+                        help="turns before a player exits a game they have not won")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible players")
+    args = parser.parse_args()
+
+    raise_file_limit()
+    stats = asyncio.run(run_load(args.players, args.games, args.max_turns, args.host, args.port,
+                                 args.unix, args.seed))
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
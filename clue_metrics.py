@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Instrumentation. A Game given a Metrics object times each phase of a turn
+and counts the work it does, so it is possible to see where turn time goes
+and how often players get stuck. A game without one only pays for an "is
+None" check at each point that would be measured.
+
+The phases are timed with time.perf_counter and for each one the number of
+times it ran, the total seconds and the longest run are kept:
+
+    setup      setup, dealing included
+    deal       picking the envelope and dealing the cards
+    action     playing one user turn (play_turn), everything below included
+    guess      evaluating a guess (make_a_guess)
+    refute     finding the card that disproves a guess (cpu_show_card)
+    cpu_moves  moving the CPU players (cpu_take_turns)
+    render     printing the map and what happened on a turn
+
+The counters are:
+
+    games              games set up
+    turns              user turns played
+    guesses            guesses made
+    refuters_asked     players asked in turn if they could disprove a guess,
+                       up to the one who could or everyone else if nobody
+    moves_blocked      user moves into a room someone else was in
+    stalls             CPU turns where all adjoining rooms were occupied
+
+Metrics objects are kept in the registry by name, so any number of games
+(every table on a server, say) can add to the same one and it can be dumped
+as JSON at the end or written out every few seconds to be scraped.
+
+Example:
+    metrics = get_metrics("games")
+    game = Game("Miss Scarlet", 6, metrics=metrics)
+    dump_metrics("metrics.json")
+"""
+
+import json
+import os
+import time
+
+phases = ["setup", "deal", "action", "guess", "refute", "cpu_moves", "render"]
+counters = ["games", "turns", "guesses", "refuters_asked", "moves_blocked", "stalls"]
+
+#every Metrics object made with get_metrics, by name
+registry = {}
+
+
+class Metrics(object):
+    """
+    The Metrics class holds the phase timings and counters for any number
+    of games
+    """
+
+    def __init__(self, name="game"):
+        """
+        This method initializes the metrics with every counter and timing at
+        zero
+        """
+        self.name = name
+        self.reset()
+
+
+    def reset(self):
+        """
+        Sets every counter and timing back to zero
+        """
+        self.started = time.time()
+        self.counts = dict((counter, 0) for counter in counters)
+        #count, total seconds and longest run of each phase
+        self.timings = dict((phase, [0, 0.0, 0.0]) for phase in phases)
+
+
+    def count(self, counter, amount=1):
+        """
+        Adds to a counter
+        """
+        self.counts[counter] += amount
+
+
+    def time(self, phase, start):
+        """
+        Records one run of a phase that started at start, a time.perf_counter
+        value
+        """
+        elapsed = time.perf_counter() - start
+        timing = self.timings[phase]
+        timing[0] += 1
+        timing[1] += elapsed
+        if elapsed > timing[2]:
+            timing[2] = elapsed
+
+
+    def as_dict(self):
+        """
+        Returns the counters and timings as a dictionary that can be written
+        as JSON, with the times in microseconds
+        """
+        timings = {}
+        for phase, (calls, total, longest) in self.timings.items():
+            timings[phase] = {"calls": calls, "total_ms": total * 1e3,
+                              "mean_us": total / calls * 1e6 if calls else None,
+                              "max_us": longest * 1e6}
+        return {"name": self.name, "seconds": time.time() - self.started,
+                "counters": dict(self.counts), "phases": timings}
+
+
+    def __repr__(self):
+        """
+        Representation method for metrics. Returns them as JSON
+        """
+        return json.dumps(self.as_dict())
+
+
+def get_metrics(name="game"):
+    """
+    This function returns the Metrics object in the registry with the given
+    name, making it if there is none yet
+    """
+    if name not in registry:
+        registry[name] = Metrics(name)
+    return registry[name]
+
+
+def metrics_dict():
+    """
+    Returns every Metrics object in the registry as a dictionary by name
+    """
+    return dict((name, metrics.as_dict()) for name, metrics in registry.items())
+
+
+def dump_metrics(path, extra=None):
+    """
+    This function writes every Metrics object in the registry to a JSON
+    file, with the entries of the extra dictionary if given. The file is
+    replaced in one step so a reader scraping it never sees half of it.
+    """
+    everything = metrics_dict()
+    if extra is not None:
+        everything.update(extra)
+    temp_path = path + ".tmp"
+    with open(temp_path, "w") as metrics_file:
+        json.dump(everything, metrics_file, indent=2)
+    os.replace(temp_path, path)
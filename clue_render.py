@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Terminal renderer for the map. The map is a list of template lines where
+"{0}", "{1}", ... mark the cells that show who is in each room. When output
+goes to a terminal the renderer uses ANSI escape codes instead of running
+the clear command: the first time it clears the screen, draws the whole map
+at the top and keeps the map there by setting the scrolling region to the
+lines below it. After that only the cells that changed are redrawn and the
+area below the map is cleared. When output does not go to a terminal the
+whole map is printed as plain text every time.
+"""
+
+import atexit
+import re
+import shutil
+import sys
+
+CLEAR_SCREEN = "\x1b[H\x1b[2J\x1b[3J"
+RESET_SCROLL_REGION = "\x1b[r"
+
+
+def move_to(row, column):
+    """
+    Returns the escape code that moves the cursor to a row and column,
+    counting from 0
+    """
+    return "\x1b[{};{}H".format(row + 1, column + 1)
+
+
+class MapRenderer(object):
+    """
+    The MapRenderer class draws a map template and remembers what it drew so
+    the next draw only has to update the cells that changed
+    """
+
+    def __init__(self, template, cell_width=7):
+        """
+        This method initializes the renderer with the template lines and
+        works out the row and column of every cell once
+        """
+        self.template = template
+        self.height = len(template)
+        self.cells = {}
+        for row, line in enumerate(template):
+            shift = 0
+            for match in re.finditer(r"\{(\d+)\}", line):
+                self.cells[int(match.group(1))] = (row, match.start() + shift)
+                shift += cell_width - len(match.group(0))
+        self.shown = None
+        self.reset_registered = False
+
+
+    def text(self, cells):
+        """
+        Returns the whole map as plain text with the cells filled in
+        """
+        return "\n".join(line.format(*cells) for line in self.template) + "\n"
+
+
+    def active(self, stream):
+        """
+        Returns True if the map is being kept at the top of the terminal
+        """
+        return self.shown is not None and stream.isatty()
+
+
+    def draw(self, cells, stream=None):
+        """
+        Draws the map with the given cell texts to the stream (standard
+        output if None)
+        """
+        stream = sys.stdout if stream is None else stream
+        if not stream.isatty():
+            stream.write(self.text(cells))
+            return
+
+        #draw everything if nothing is on the screen yet or the terminal is
+        #too small to keep the map at the top, otherwise just the changes
+        rows = shutil.get_terminal_size().lines
+        if rows <= self.height + 2:
+            stream.write(CLEAR_SCREEN + self.text(cells))
+            self.shown = None
+        elif self.shown is None or len(self.shown) != len(cells):
+            stream.write(CLEAR_SCREEN + self.text(cells).rstrip("\n") +
+                         "\x1b[{};{}r".format(self.height + 1, rows) + move_to(self.height, 0))
+            self.shown = list(cells)
+            if not self.reset_registered:
+                atexit.register(self.reset)
+                self.reset_registered = True
+        else:
+            updates = []
+            for idx, cell in enumerate(cells):
+                if cell != self.shown[idx]:
+                    row, column = self.cells[idx]
+                    updates.append(move_to(row, column) + cell)
+                    self.shown[idx] = cell
+            stream.write("".join(updates) + move_to(self.height, 0) + "\x1b[J")
+        stream.flush()
+
+
+    def clear(self, stream=None):
+        """
+        Clears the screen, or only the area below the map if the map is being
+        kept at the top
+        """
+        stream = sys.stdout if stream is None else stream
+        if self.active(stream):
+            stream.write(move_to(self.height, 0) + "\x1b[J")
+        else:
+            stream.write(CLEAR_SCREEN)
+        stream.flush()
+
+
+    def reset(self, stream=None):
+        """
+        Gives the whole terminal back for scrolling and forgets what was drawn
+        """
+        stream = sys.stdout if stream is None else stream
+        if self.active(stream):
+            stream.write(RESET_SCROLL_REGION + move_to(shutil.get_terminal_size().lines - 1, 0))
+            stream.flush()
+        self.shown = None
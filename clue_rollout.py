@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Monte Carlo rollouts. To judge an action for the user seat without knowing
+the envelope, a rollout samples a deal that fits everything the user knows,
+forks the game (see Game.fork), gives the fork the sampled envelope and
+hands, plays the action and then plays the fork out with a fast policy. The
+turns it took to win, averaged over many samples, is the value of the
+action. All the actions being compared are played against the same sampled
+deals, so the differences between them are not drowned out by the luck of
+the deal.
+
+Deals are sampled from a Deduction (see clue_deduction): an envelope is
+picked from the ones still possible, the cards known to be held stay with
+their holders and the rest are dealt at random to players who may hold
+them and still have room in their hands. Deals that do not explain every
+refutation are thrown away and sampled again.
+
+The RolloutStrategy uses this every turn to pick between guessing where it
+is and moving to each free adjoining room, playing a fixed number of sampled
+deals so a seeded game plays out the same way on any machine. A time budget
+can be given as well to cap each decision, at the cost of that. It is
+registered as the "rollout" strategy. Rollouts need
+the deduction tables, so they only work for the standard game.
+
+Example:
+    values, rounds = evaluate_actions(game, [Action("Make a guess", "Mrs White", "Knife"),
+                                             Action("Move to a different room", room="Hall")])
+"""
+
+import random
+from time import perf_counter
+
+from clue_classes import *
+from clue_deal import ENVELOPE
+from clue_deduction import user_deduction, envelope_cards, num_cards
+from clue_strategies import strategies, budget_strategies
+from clue_variant import standard
+
+#a rollout that has not won in this many turns counts as this many turns
+ROLLOUT_TURNS = 100
+
+
+def knowledge(game, copy=True):
+    """
+    This function returns a Deduction of what the user of a Game knows: the
+    hint deduction if the game keeps one, otherwise the users hand and the
+    cards the CPU players have shown them. The hint deduction is copied
+    unless copy is False, for callers that only read it. It raises
+    ValueError for games that are not the standard game.
+    """
+    if game.variant is not standard:
+        raise ValueError("rollouts can only be played in the standard game, not " + game.variant.name)
+    if game.deduction is not None:
+        return game.deduction.copy() if copy else game.deduction
+    deduction = user_deduction(game)
+    for card in mask_card_ids(game.shown):
+        deduction.card_shown(game.holders[card], card)
+    return deduction
+
+
+def sample_deal(deduction, rng, tries=100):
+    """
+    This function samples a deal that fits a Deduction. It returns a tuple of
+    the (guest, weapon, room) card ids of the envelope and a list with the
+    seat holding each card id, None for the envelope cards. It raises
+    ValueError if no deal is found in the given number of tries.
+    """
+    envelopes = mask_card_ids(deduction.candidates)
+    if not envelopes:
+        raise ValueError("no envelope fits what is known")
+    seats = range(len(deduction.players))
+    for attempt in range(tries):
+        envelope = envelope_cards(rng.choice(envelopes))
+        in_envelope = (1 << envelope[0]) | (1 << envelope[1]) | (1 << envelope[2])
+        holders = list(deduction.owner)
+        room_left = [deduction.hand_sizes[seat] - deduction.owned[seat].bit_count() for seat in seats]
+        unknown = [card for card in range(num_cards)
+                   if holders[card] is None and not (in_envelope >> card) & 1]
+        rng.shuffle(unknown)
+        for card in unknown:
+            options = [seat for seat in seats
+                       if room_left[seat] and not (deduction.not_owned[seat] >> card) & 1]
+            if not options:
+                break
+            seat = rng.choice(options)
+            holders[card] = seat
+            room_left[seat] -= 1
+        else:
+            #every refutation must be explained by a card the player holds
+            if all(any(holders[card] == seat for card in mask_card_ids(mask))
+                   for seat, mask in deduction.constraints):
+                return envelope, holders
+    raise ValueError("no deal fits what is known after " + str(tries) + " tries")
+
+
+def apply_deal(game, envelope, holders):
+    """
+    This function gives a game, normally a fork, the envelope and hands of a
+    sampled deal (see sample_deal)
+    """
+    names = game.variant.card_names
+    game.correct_guess = Guess(names[envelope[0]], names[envelope[1]], names[envelope[2]],
+                               game.variant.card_ids)
+    players = [game.user_player] + game.cpu_players
+    hands = [[] for player in players]
+    for card, seat in enumerate(holders):
+        if seat is None:
+            game.holders[card] = ENVELOPE
+        else:
+            game.holders[card] = seat
+            hands[seat].append(game.deck[card])
+    for player, cards in zip(players, hands):
+        player.cards = cards
+        player.hand = 0
+        for card in cards:
+            player.hand |= card.bit
+
+
+def playout(game):
+    """
+    The default rollout policy, a decision callback that walks to the
+    nearest room it has not seen and guesses the first guest and weapon it
+    has not seen there, or where it is when the way is blocked. It keeps no
+    state, everything it needs is in the game.
+    """
+    seen = game.user_player.hand | game.shown
+    kinds = game.variant.kind_ids
+    names = game.variant.card_names
+    guest = next((card for card in kinds[0] if not (seen >> card) & 1), kinds[0][0])
+    weapon = next((card for card in kinds[1] if not (seen >> card) & 1), kinds[1][0])
+    unseen = 0
+    for room, card in enumerate(kinds[2]):
+        if not (seen >> card) & 1:
+            unseen |= 1 << room
+    here = game.user_player.get_location().id
+    step = game.board.step_towards(here, unseen, game.occupied)
+    if step is None or (game.occupied >> step) & 1:
+        return Action("Make a guess", names[guest], names[weapon])
+    return Action("Move to a different room", room=game.board.names[step])
+
+
+def rollout(game, action, deal, rng, policy=playout, max_turns=ROLLOUT_TURNS):
+    """
+    This function plays one rollout: it forks the game, gives the fork a
+    sampled deal, plays the action and then plays on with the policy. It
+    returns the turns taken to win counting the action, or max_turns if the
+    fork was not won in that many turns.
+    """
+    child = game.fork(rng, deduction=False)
+    apply_deal(child, *deal)
+    child.last_result = None
+    start = child.turns
+    child.play_turn(action)
+    if not child.won:
+        child.play(policy, start + max_turns)
+    return child.turns - start if child.won else max_turns
+
+
+def evaluate_actions(game, actions, deduction=None, budget=None, samples=100, rng=None,
+                     policy=playout, max_turns=ROLLOUT_TURNS):
+    """
+    This function plays rollouts of every action against the same sampled
+    deals until samples deals have been played or, if a budget is given,
+    budget seconds have gone by, at least one deal either way. Only the
+    number of samples gives the same answer on every machine. deduction is
+    what the user knows, see knowledge if None. It returns a tuple of a list
+    with the mean turns to win for each action and the number of deals
+    played.
+    """
+    if budget is None and samples is None:
+        raise ValueError("rollouts need a time budget or a number of samples")
+    if deduction is None:
+        deduction = knowledge(game, copy=False)
+    if rng is None:
+        rng = random.Random(game.rng.getrandbits(64))
+    deadline = perf_counter() + budget if budget is not None else None
+    totals = [0] * len(actions)
+    rounds = 0
+    while samples is None or rounds < samples:
+        if rounds and deadline is not None and perf_counter() > deadline:
+            break
+        deal = sample_deal(deduction, rng)
+        for position, action in enumerate(actions):
+            totals[position] += rollout(game, action, deal, rng, policy, max_turns)
+        rounds += 1
+    return [total / rounds for total in totals], rounds
+
+
+class RolloutStrategy(object):
+    """
+    The RolloutStrategy keeps a Deduction of everything it has learnt. Once
+    the answer is known it goes and guesses it. Until then it compares
+    guessing the most likely guest and weapon where it is with moving to
+    each free adjoining room by Monte Carlo rollouts over a number of
+    sampled deals and takes the action that wins in the fewest turns.
+    """
+
+    def __init__(self, samples=100, budget=None):
+        """
+        This method initializes the strategy with the number of deals to
+        sample for each decision and optionally a time budget in seconds
+        that stops sampling early. The deduction is made on the first turn.
+        """
+        self.samples = samples
+        self.budget = budget
+        self.deduction = None
+        self.rng = None
+
+
+    def __call__(self, game):
+        """
+        Decide the next Action for the game
+        """
+        if self.deduction is None:
+            self.deduction = knowledge(game)
+            self.rng = random.Random(game.rng.getrandbits(64))
+        result = game.last_result
+        if result is not None and result.guess_result is not None:
+            self.deduction.observe_guess(game, result.guess_result)
+
+        here = game.user_player.get_location().id
+        solved = self.deduction.solution()
+        if solved is not None:
+            step = game.board.step_towards(here, game.board.room_mask([solved[2]]), game.occupied)
+            if step is None or (game.occupied >> step) & 1:
+                return Action("Make a guess", solved[0], solved[1])
+            return Action("Move to a different room", room=game.board.names[step])
+
+        chances = self.deduction.probabilities()
+        guest = max(guests, key=lambda name: chances[card_ids[name]])
+        weapon = max(weapons, key=lambda name: chances[card_ids[name]])
+        actions = [Action("Make a guess", guest, weapon)]
+        for room in mask_card_ids(game.board.free_neighbours(here, game.occupied)):
+            actions.append(Action("Move to a different room", room=game.board.names[room]))
+        if len(actions) == 1:
+            return actions[0]
+        values, rounds = evaluate_actions(game, actions, self.deduction, self.budget, self.samples,
+                                          rng=self.rng)
+        return actions[values.index(min(values))]
+
+
+strategies["rollout"] = RolloutStrategy
+budget_strategies.append("rollout")
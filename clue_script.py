@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Scripted games. A script is a stream of JSON objects, one per line, that
+plays games without asking for any input. A game starts with a setup record
+and is followed by one record per turn:
+
+    {"character": "Miss Scarlet", "cpu_players": 3, "seed": 7, "hints": false}
+    {"action": "Move to a different room", "room": "Library"}
+    {"action": "Make a guess", "guest": "Mrs White", "weapon": "Rope"}
+    {"action": "Scratch Pad", "note": "White was in the Hall"}
+    {"action": "See my cards"}
+    {"action": "Exit Game"}
+
+seed and hints are optional. A new setup record starts a new game, so one
+stream can hold any number of sessions. Each turn writes a JSON result line
+to the output and every game ends with an "end" line, written as soon as
+the game is won or exited, when the next game starts or when the stream
+ends. Records that cannot be played (bad JSON, unknown names, a room that
+is not next to the user) are skipped and described as JSON lines in the
+error log.
+"""
+
+import json
+import sys
+
+from clue_helpers import *
+from clue_classes import *
+from clue_variant import standard
+
+
+def result_record(game, result):
+    """
+    This function turns a TurnResult into a dictionary that can be written
+    as JSON
+    """
+    record = {"turn": game.turns, "action": result.action.kind,
+              "room": game.user_player.get_location().get_name()}
+    if result.guess_result is not None:
+        guess_result = result.guess_result
+        record["guess"] = str(guess_result.guess)
+        record["correct"] = guess_result.correct
+        if guess_result.shown_by is not None:
+            record["shown_by"] = str(guess_result.shown_by)
+            record["card"] = str(guess_result.card)
+    if result.move_result is not None:
+        record["moved"] = result.move_result.moved
+        if result.move_result.blocked_by is not None:
+            record["blocked_by"] = str(result.move_result.blocked_by)
+    if result.cpu_moves:
+        record["cpu_moves"] = [[str(move.player), str(move.from_location), str(move.to_location)]
+                               for move in result.cpu_moves if move.moved]
+    if result.won:
+        record["won"] = True
+    return record
+
+
+def check_action(game, record):
+    """
+    This function checks that a turn record can be played and returns the
+    Action for it. It raises ValueError with the reason if it cannot.
+    """
+    kind = record.get("action")
+    if kind not in choices:
+        raise ValueError("unknown action " + repr(kind))
+    if kind == "Make a guess":
+        if record.get("guest") not in game.variant.guests:
+            raise ValueError("unknown guest " + repr(record.get("guest")))
+        if record.get("weapon") not in game.variant.weapons:
+            raise ValueError("unknown weapon " + repr(record.get("weapon")))
+        return Action(kind, record["guest"], record["weapon"])
+    if kind == "Move to a different room":
+        if record.get("room") not in game.user_player.get_location().get_adjoining_locations():
+            raise ValueError(repr(record.get("room")) + " is not next to the " +
+                             game.user_player.get_location().get_name())
+        return Action(kind, room=record["room"])
+    if kind == "Scratch Pad":
+        if type(record.get("note")) is not str:
+            raise ValueError("note must be text, not " + repr(record.get("note")))
+        return Action(kind, note=record["note"])
+    return Action(kind)
+
+
+def new_game(record, metrics=None, variant=None):
+    """
+    This function makes and sets up a Game from a setup record, timed and
+    counted in metrics if given and played with variant if given (see
+    clue_variant). It raises ValueError if the record is not valid.
+    """
+    variant = standard if variant is None else variant
+    if record.get("character") not in variant.guests:
+        raise ValueError("unknown character " + repr(record.get("character")))
+    cpu_players = record.get("cpu_players")
+    #bool and float are not accepted even though True == 1 and 2.0 == 2
+    if type(cpu_players) is not int or cpu_players not in range(1, len(variant.guests)):
+        raise ValueError("cpu_players must be a whole number from 1 to " + str(len(variant.guests) - 1) +
+                         ", not " + repr(cpu_players))
+    seed = record.get("seed")
+    if seed is not None and type(seed) not in (int, str):
+        raise ValueError("seed must be a whole number or text, not " + repr(seed))
+    game = Game(record["character"], cpu_players + 1, bool(record.get("hints", False)),
+                seed=seed, metrics=metrics, variant=variant)
+    game.setup()
+    return game
+
+
+class Session(object):
+    """
+    The Session class plays the games in a stream of script lines one line
+    at a time, so the same rules apply to a script file and to a player
+    connected to the game server (see clue_server)
+    """
+
+    def __init__(self, metrics=None, variant=None):
+        """
+        This method initializes a session with no game. The games played are
+        timed and counted in metrics if given (see clue_metrics) and use
+        variant if given (see clue_variant).
+        """
+        self.metrics = metrics
+        self.variant = variant
+        self.game = None
+        self.ended = False
+        self.errors = 0
+        self.line_number = 0
+
+
+    def end_record(self):
+        """
+        Returns the "end" record for the current game
+        """
+        return {"event": "end", "won": self.game.won, "turns": self.game.turns,
+                "envelope": str(self.game.correct_guess)}
+
+
+    def handle(self, line):
+        """
+        This method plays one script line and returns the list of records it
+        produced. Records for lines that could not be played have an "error"
+        key. A game that is won or exited is followed by its "end" record.
+        """
+        self.line_number += 1
+        if not line.strip():
+            return []
+        records = []
+        game = self.game
+        try:
+            record = json.loads(line)
+            if not isinstance(record, dict):
+                raise ValueError("each line must be a JSON object")
+            if "character" in record:
+                new = new_game(record, self.metrics, self.variant)
+                if game is not None and not self.ended:
+                    records.append(self.end_record())
+                self.game = game = new
+                self.ended = False
+                records.append({"event": "start", "user": game.user_player.get_name(),
+                                "cpu_players": [str(player) for player in game.cpu_players],
+                                "cards": [str(card) for card in game.user_player.get_cards()]})
+                return records
+            if game is None:
+                raise ValueError("a setup record with a character must come first")
+            if self.ended:
+                raise ValueError("the game is already over")
+            action = check_action(game, record)
+        except ValueError as error:
+            self.errors += 1
+            return [{"line": self.line_number, "error": str(error), "text": line.rstrip("\n")}]
+
+        #see my cards and the rules do not change the game
+        if action.kind == "See my cards":
+            return [{"turn": game.turns, "action": action.kind,
+                     "cards": [str(card) for card in game.user_player.get_cards()]}]
+        if action.kind == "Display Rules":
+            return [{"turn": game.turns, "action": action.kind}]
+        result = game.play_turn(action)
+        records.append(result_record(game, result))
+        if result.ended:
+            records.append(self.end_record())
+            self.ended = True
+        return records
+
+
+    def close(self):
+        """
+        Ends the session and returns the "end" record of a game that has not
+        ended yet, if there is one
+        """
+        if self.game is None or self.ended:
+            return []
+        self.ended = True
+        return [self.end_record()]
+
+
+def run_script(lines, output=None, log=None, metrics=None, variant=None):
+    """
+    This function plays the games in a stream of JSON lines, writing turn
+    results to output and errors to log (standard output and standard error
+    if None). It returns the number of errors.
+    """
+    output = sys.stdout if output is None else output
+    log = sys.stderr if log is None else log
+    session = Session(metrics, variant)
+    for line in lines:
+        for record in session.handle(line):
+            (log if "error" in record else output).write(json.dumps(record) + "\n")
+    for record in session.close():
+        output.write(json.dumps(record) + "\n")
+    return session.errors
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Game server. Many games are hosted by one process with asyncio, each on
+its own connection over TCP or a Unix socket. The protocol is the same JSON
+lines as a script (see clue_script): the client sends a setup record to
+start a game and then one record per turn, and the server answers every
+line that is not blank with the records it produced, one JSON object per
+line. Lines that cannot be played are answered with a record that has an
+"error" key. Every connection is a Session with its own Game, so tables
+never share any state.
+
+A player who sends nothing for turn_timeout seconds gets a "timeout" record,
+the "end" record of their game and is disconnected. A line is played in one
+go without waiting on anything, and a turn with all the CPU moves takes
+microseconds, so one busy table does not hold up the others.
+
+With --metrics every game on the server is timed and counted in one Metrics
+object (see clue_metrics) and the registry is written to a JSON file every
+--metrics-every seconds.
+
+Example:
+    python clue_server.py --port 8791
+    python clue_server.py --unix /tmp/clue.sock --turn-timeout 60
+    python clue_server.py --port 8791 --metrics metrics.json --metrics-every 5
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+
+from clue_script import Session
+from clue_metrics import get_metrics, dump_metrics
+from clue_variant import load_variant
+
+
+def raise_file_limit():
+    """
+    This function raises the limit on open files to the most allowed, so
+    thousands of connections can be open at once. It does nothing where the
+    resource module is not available.
+    """
+    try:
+        import resource
+    except ImportError:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    wanted = hard if hard != resource.RLIM_INFINITY else max(soft, 65536)
+    if soft != resource.RLIM_INFINITY and soft < wanted:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (wanted, hard))
+        except (ValueError, OSError):
+            pass
+
+
+class GameServer(object):
+    """
+    The GameServer class handles the connections, one Session for each
+    """
+
+    def __init__(self, turn_timeout=300.0, max_sessions=None, metrics=None, variant=None):
+        """
+        This method initializes the server. turn_timeout is the number of
+        seconds a player has to send each line and max_sessions is the most
+        connections served at once (no limit if None). Every game is timed
+        and counted in metrics if given (see clue_metrics) and played with
+        variant if given (see clue_variant).
+        """
+        self.variant = variant
+        self.turn_timeout = turn_timeout
+        self.max_sessions = max_sessions
+        self.metrics = metrics
+        self.metrics_task = None
+        self.active = 0
+        self.served = 0
+        self.games = 0
+
+
+    async def send(self, writer, records):
+        """
+        Sends a list of records to a client
+        """
+        if records:
+            writer.write("".join(json.dumps(record) + "\n" for record in records).encode("utf-8"))
+            await writer.drain()
+
+
+    async def handle(self, reader, writer):
+        """
+        Plays the lines sent on one connection until the client disconnects
+        or runs out of time
+        """
+        if self.max_sessions is not None and self.active >= self.max_sessions:
+            await self.send(writer, [{"error": "the server is full"}])
+            writer.close()
+            return
+
+        self.active += 1
+        self.served += 1
+        session = Session(self.metrics, self.variant)
+        try:
+            while True:
+                try:
+                    line = await asyncio.wait_for(reader.readline(), self.turn_timeout)
+                except asyncio.TimeoutError:
+                    await self.send(writer, [{"event": "timeout"}] + session.close())
+                    break
+                if not line:
+                    break
+                text = line.decode("utf-8", "replace")
+                try:
+                    records = session.handle(text)
+                except Exception as error:
+                    #a line the session did not expect must not end the
+                    #connection, the player gets an error and can go on
+                    session.errors += 1
+                    records = [{"line": session.line_number, "error": "could not play the line: " +
+                                repr(error), "text": text.rstrip("\n")}]
+                self.games += sum(1 for record in records if record.get("event") == "start")
+                await self.send(writer, records)
+        except (ConnectionError, ValueError):
+            #the client went away or sent a line that is far too long
+            pass
+        finally:
+            self.active -= 1
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except ConnectionError:
+                pass
+
+
+    async def write_metrics(self, path, every):
+        """
+        Writes the metrics registry to a JSON file every few seconds, along
+        with the number of players connected, so it can be scraped
+        """
+        while True:
+            await asyncio.sleep(every)
+            dump_metrics(path, {"server": self.status()})
+
+
+    def status(self):
+        """
+        Returns the number of players connected, players served and games
+        started as a dictionary
+        """
+        return {"active": self.active, "served": self.served, "games": self.games}
+
+
+    async def serve(self, host="127.0.0.1", port=8791, path=None, metrics_path=None,
+                    metrics_every=10.0):
+        """
+        Serves games on a TCP port, or on a Unix socket if path is given,
+        until cancelled. If metrics_path is given the metrics are written
+        there every metrics_every seconds.
+        """
+        if metrics_path is not None:
+            self.metrics_task = asyncio.create_task(self.write_metrics(metrics_path, metrics_every))
+        if path is not None:
+            server = await asyncio.start_unix_server(self.handle, path, backlog=4096)
+        else:
+            server = await asyncio.start_server(self.handle, host, port, backlog=4096)
+        where = path if path is not None else host + ":" + str(port)
+        print("Serving Clue on", where, file=sys.stderr)
+        async with server:
+            await server.serve_forever()
+
+
+def main():
+    """
+    Command line entry point for the game server
+    """
+
+    parser = argparse.ArgumentParser(description="Host many games of Clue in one process")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8791, help="TCP port to listen on")
+    parser.add_argument("--unix", default=None, help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--turn-timeout", type=float, default=300.0,
+                        help="seconds a player has for each turn before they are disconnected")
+    parser.add_argument("--max-sessions", type=int, default=None,
+                        help="most players connected at once")
+    parser.add_argument("--board", default=None,
+                        help="play the variant defined in this JSON file (see clue_variant)")
+    parser.add_argument("--metrics", default=None,
+                        help="time and count every phase of the games and write them to this JSON file")
+    parser.add_argument("--metrics-every", type=float, default=10.0,
+                        help="seconds between writes of the metrics file")
+    args = parser.parse_args()
+
+    raise_file_limit()
+    metrics = get_metrics() if args.metrics is not None else None
+    variant = load_variant(args.board) if args.board is not None else None
+    server = GameServer(args.turn_timeout, args.max_sessions, metrics, variant)
+    try:
+        asyncio.run(server.serve(args.host, args.port, args.unix, args.metrics, args.metrics_every))
+    except KeyboardInterrupt:
+        print("Served", server.served, "players and", server.games, "games", file=sys.stderr)
+        if args.metrics is not None:
+            dump_metrics(args.metrics, {"server": server.status()})
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Game snapshots. A snapshot is the state of a Game packed with struct into a
+fixed layout of 46 bytes, so snapshots can be written one after another into
+a file and the n-th one found at n * SNAPSHOT_SIZE without an index:
+
+    offset  size  field
+         0     3  magic, b"CLU"
+         3     1  layout version
+         4     1  flags, bit 0 the user has won, bit 1 hints are on, bit 2
+                  the CPU players move with the planner (see clue_planner)
+         5     1  deal policy, index into clue_deal.deal_policies
+         6     1  number of players including the user
+         7     1  user guest, index into guests
+         8     4  turns played
+        12     4  bitmask of the cards CPU players have shown the user
+        16    24  holder of each card id, the seat (0 is the user, then the
+                  CPU players in order) or -1 for the envelope
+        40     6  room id of each seat, -1 for seats not in the game
+
+The CPU players, their hands and the envelope all follow from these fields.
+Hands are restored in card id order rather than the order they were dealt.
+The random number generator, the seed, the goals of CPU players moved by
+the planner and the scratch pad notes and guesses are not saved: a restored
+game has a fresh generator (or the one of the game it is restored into) and
+its scratch pad holds the users cards and the cards they have been shown.
+With hints on the deduction is rebuilt from the same cards, so it knows less
+than one that saw every guess.
+
+Loading reads the fields straight out of any buffer (bytes, bytearray,
+memoryview or mmap) with struct.unpack_from, without copying the snapshot
+first. SnapshotFile maps a whole file of snapshots into memory.
+
+Example:
+    data = save(game)
+    copy = load(data)
+    write_snapshots("games.snap", games)
+    with SnapshotFile("games.snap") as snapshots:
+        game = snapshots[1000000]
+"""
+
+import mmap
+import struct
+from array import array
+
+from clue_helpers import *
+from clue_classes import *
+from clue_deal import deal_policies, ENVELOPE
+from clue_deduction import user_deduction
+from clue_variant import standard
+
+MAGIC = b"CLU"
+VERSION = 1
+WON = 1
+HINTS = 2
+PLANNER = 4
+MAX_SEATS = 6
+
+layout = struct.Struct("<3sBBBBBII24b6b")
+SNAPSHOT_SIZE = layout.size
+
+
+def save(game, buffer=None, offset=0):
+    """
+    This function packs the state of a Game that has been set up. It
+    returns the snapshot as bytes, or if a writable buffer is given packs it
+    into the buffer at offset and returns None. Only the standard game fits
+    the layout, it raises ValueError for other variants.
+    """
+    if game.variant is not standard:
+        raise ValueError("snapshots can only be taken of the standard game, not " + game.variant.name)
+    players = [game.user_player] + game.cpu_players
+    holders = [ENVELOPE] * len(card_names)
+    for seat, player in enumerate(players):
+        for card in player.get_cards():
+            holders[card.id] = seat
+    positions = [player.get_location().id for player in players]
+    positions += [-1] * (MAX_SEATS - len(positions))
+    flags = (WON if game.won else 0) | (HINTS if game.hints else 0) | \
+            (PLANNER if game.movement == "planner" else 0)
+    fields = (MAGIC, VERSION, flags, deal_policies.index(game.deal_policy), game.num_players,
+              guests.index(game.user_player.get_name()), game.turns, game.shown) + \
+             tuple(holders) + tuple(positions)
+    if buffer is None:
+        return layout.pack(*fields)
+    layout.pack_into(buffer, offset, *fields)
+
+
+def unpack(buffer, offset=0):
+    """
+    This function reads the snapshot at offset in a buffer and returns its
+    fields as a tuple (flags, deal policy, number of players, user guest,
+    turns, shown, holders, positions). It raises ValueError if the bytes are
+    not a snapshot this version can read or hold seats or rooms that do not
+    exist.
+    """
+    if len(buffer) - offset < SNAPSHOT_SIZE:
+        raise ValueError("snapshot at offset " + str(offset) + " is cut short")
+    fields = layout.unpack_from(buffer, offset)
+    if fields[0] != MAGIC:
+        raise ValueError("no snapshot at offset " + str(offset))
+    if fields[1] != VERSION:
+        raise ValueError("snapshot version " + str(fields[1]) + " is not supported")
+    flags, policy, num_players, user, turns, shown, holders, positions = \
+        fields[2:8] + (fields[8:32], fields[32:38])
+
+    #a corrupt snapshot must not index outside the tables it is read with
+    if policy >= len(deal_policies) or not 2 <= num_players <= MAX_SEATS or user >= len(guests):
+        raise ValueError("snapshot at offset " + str(offset) + " has a bad deal policy, player count or user")
+    if any(not ENVELOPE <= seat < num_players for seat in holders):
+        raise ValueError("snapshot at offset " + str(offset) + " has a card held by a seat not in the game")
+    seated = positions[:num_players]
+    if any(not 0 <= room < standard.board.size for room in seated) or len(set(seated)) != num_players or \
+            any(room != -1 for room in positions[num_players:]):
+        raise ValueError("snapshot at offset " + str(offset) + " has players in rooms that are not on the map")
+    return flags, policy, num_players, user, turns, shown, holders, positions
+
+
+def load(buffer, offset=0, game=None):
+    """
+    This function restores the snapshot at offset in a buffer. If a game is
+    given and has the same user and number of players it is reset and
+    reused, which is much quicker than making a new one, otherwise a new
+    Game is made. It returns the restored game.
+    """
+    flags, policy, num_players, user, turns, shown, holders, positions = unpack(buffer, offset)
+    if game is None or game.num_players != num_players or game.user_player.get_name() != guests[user]:
+        game = Game(guests[user], num_players)
+    game.reset()
+    game.hints = bool(flags & HINTS)
+    game.deal_policy = deal_policies[policy]
+    game.movement = "planner" if flags & PLANNER else "first_free"
+    game.add_cpu_players()
+
+    #put everyone back where they were
+    players = [game.user_player] + game.cpu_players
+    for location in game.locations:
+        location.occupant = None
+    game.occupied = 0
+    for player, room in zip(players, positions):
+        location = game.locations[room]
+        location.player_enters(player)
+        player.set_location(location)
+        game.occupied |= 1 << room
+
+    #deal the hands back and refill the envelope
+    game.holders[:] = array("b", holders)
+    envelope = []
+    for card in deck:
+        if holders[card.id] == ENVELOPE:
+            envelope.append(card.name)
+        else:
+            players[holders[card.id]].deal_card(card)
+    if len(envelope) != 3:
+        raise ValueError("snapshot envelope has " + str(len(envelope)) + " cards")
+    game.correct_guess = Guess(*envelope)
+
+    #the scratch pad and hints only know the cards that were seen
+    game.journal.add_cards(game.user_player.get_cards())
+    if game.hints:
+        game.deduction = user_deduction(game)
+    for card in mask_card_ids(shown):
+        game.journal.add_shown(players[holders[card]], deck[card])
+        if game.deduction is not None:
+            game.deduction.card_shown(holders[card], card)
+    game.shown = shown
+    game.turns = turns
+    game.won = bool(flags & WON)
+    return game
+
+
+def write_snapshots(path, games, append=False):
+    """
+    This function writes the snapshots of a sequence of games to a file,
+    after the snapshots already in it if append is True. It returns the
+    number of snapshots written.
+    """
+    count = 0
+    chunk = bytearray(SNAPSHOT_SIZE * 4096)
+    used = 0
+    with open(path, "ab" if append else "wb") as snapshot_file:
+        for game in games:
+            save(game, chunk, used)
+            used += SNAPSHOT_SIZE
+            count += 1
+            if used == len(chunk):
+                snapshot_file.write(chunk)
+                used = 0
+        snapshot_file.write(memoryview(chunk)[:used])
+    return count
+
+
+class SnapshotFile(object):
+    """
+    The SnapshotFile class maps a file of snapshots into memory so any one
+    of them can be read or restored without reading the rest
+    """
+
+    def __init__(self, path):
+        """
+        This method opens and maps the file. The file must hold a whole
+        number of snapshots.
+        """
+        self.path = path
+        self.file = open(path, "rb")
+        size = self.file.seek(0, 2)
+        if size % SNAPSHOT_SIZE:
+            self.file.close()
+            raise ValueError(path + " is not a whole number of snapshots")
+        self.count = size // SNAPSHOT_SIZE
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.view = memoryview(self.map) if size else memoryview(b"")
+
+
+    def __len__(self):
+        """
+        Returns the number of snapshots in the file
+        """
+        return self.count
+
+
+    def offset(self, index):
+        """
+        Returns the byte offset of a snapshot, counting negative indexes from
+        the end
+        """
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError("snapshot index out of range")
+        return index * SNAPSHOT_SIZE
+
+
+    def fields(self, index):
+        """
+        Returns the fields of a snapshot without restoring a game (see unpack)
+        """
+        return unpack(self.view, self.offset(index))
+
+
+    def load(self, index, game=None):
+        """
+        Restores a snapshot, reusing game if it fits (see load)
+        """
+        return load(self.view, self.offset(index), game)
+
+
+    def __getitem__(self, index):
+        """
+        Restores a snapshot into a new game
+        """
+        return self.load(index)
+
+
+    def __iter__(self):
+        """
+        Restores every snapshot in turn into the same game, so each one is
+        only good until the next is read
+        """
+        game = None
+        for index in range(self.count):
+            game = self.load(index, game)
+            yield game
+
+
+    def close(self):
+        """
+        Unmaps and closes the file
+        """
+        self.view.release()
+        if self.map is not None:
+            self.map.close()
+        self.file.close()
+
+
+    def __enter__(self):
+        """
+        Lets the file be used in a with statement
+        """
+        return self
+
+
+    def __exit__(self, *exc_info):
+        """
+        Closes the file at the end of a with statement
+        """
+        self.close()
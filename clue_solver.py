@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Approximate solver. It works out the least expected number of turns the
+user needs to solve the case from what they know, and the action that gets
+it, by searching every guess, move and refutation of a simplified model of
+the game. The model leaves out the number of players, their seating order,
+their hands and CPU players getting in the way (see below), so its values
+are turns in the model, not turns in a real game, and they are no bound on
+what a strategy can do at a real table. An exact solver for a six player
+table would have to search every way the unseen cards could be dealt
+between the CPU players as well, which is far too many states.
+
+What the user knows is the cards they hold and the cards they have been
+shown, so the envelopes still possible are every possible guest with every
+possible weapon in every possible room, each as likely as the others. The
+search follows the same model of a guess as the information strategy: any
+guessed card that is not in the envelope and not the users own is as likely
+to be shown as any other, a guess that nobody else can refute shows that the
+possible cards in it are in the envelope, and a guess with a card that was
+shown before teaches nothing so it is never worth making. Moves always
+succeed and a guess or a move is one turn.
+
+What the model leaves out: in the game the first CPU player in seating
+order holding a guessed card shows their lowest card, so which card is shown
+is not a fair draw and a player with only one of the cards has no choice;
+CPU players get in the way of moves, losing the turn; and a strategy may
+guess a card it was shown before, which the model never does.
+
+So grade does not set the turns a strategy takes against the model. It
+reports the turns the strategy really took and, separately, how often its
+decisions were one of the best in the model, which says how closely the
+strategy follows the model and nothing about how many turns it loses.
+
+Which guest or weapon is which does not matter, only how many are still
+possible and whether the user holds one they can guess without it being
+shown. Rooms do matter because of the map. So what the user knows is the key
+
+    (possible guests, possible weapons, bitmask of possible rooms)
+
+and for each key the solver works out a plan for every room the user could
+be standing in at once: the cheapest of walking to some room and guessing
+there. A room is skipped without being searched when, from every room, the
+walk there plus the least the case could take with free walking is no
+better than the best plan found.
+
+Example:
+    python clue_solver.py --strategy elimination --games 100 --players 6
+"""
+
+import argparse
+import json
+import time
+
+from clue_helpers import *
+from clue_classes import *
+from clue_board import board
+from clue_strategies import make_strategy, strategies
+
+#the kinds a guessed card can have: still possible, or held by the user
+POSSIBLE = "possible"
+OWN = "own"
+
+#what a guess can show: the guest, weapon or room card, that nobody could
+#refute so the possible cards in it are the answer, or that it was right
+GUEST, WEAPON, ROOM, ANSWER, RIGHT = range(5)
+
+
+def refutations(kinds, counts):
+    """
+    This function returns what can come of a guess as a list of (chance,
+    result), where result is GUEST, WEAPON or ROOM for the card shown,
+    ANSWER or RIGHT. kinds is the (guest, weapon, room) kinds of the guessed
+    cards and counts the number of guests, weapons and rooms still possible.
+    It returns None if the guess cannot teach anything.
+    """
+    possible = [part for part in (GUEST, WEAPON, ROOM) if kinds[part] == POSSIBLE]
+    if not possible or (len(possible) < 3 and all(counts[part] == 1 for part in possible)):
+        return None
+    results = []
+    for inside in range(1 << len(possible)):
+        chance = 1.0
+        outside = []
+        for idx, part in enumerate(possible):
+            if (inside >> idx) & 1:
+                chance /= counts[part]
+            else:
+                chance *= (counts[part] - 1) / counts[part]
+                outside.append(part)
+        if chance == 0:
+            continue
+        if not outside:
+            results.append((chance, RIGHT if len(possible) == 3 else ANSWER))
+            continue
+        for part in outside:
+            results.append((chance / len(outside), part))
+    return results
+
+
+class Solver(object):
+    """
+    The Solver class searches the states for one user hand. The hand only
+    matters through whether the user holds a guest, a weapon and which
+    rooms, so one Solver can be reused for every game with the same.
+    """
+
+    def __init__(self, own_guest, own_weapon, own_rooms, board=board):
+        """
+        This method initializes the solver. own_guest and own_weapon say if
+        the user holds a guest or weapon card and own_rooms is the bitmask
+        of the board ids of the room cards they hold.
+        """
+        self.own_guest = own_guest
+        self.own_weapon = own_weapon
+        self.own_rooms = own_rooms
+        self.board = board
+        self.values = {}
+        self.relaxed = {}
+        self.states = 0
+        self.pruned = 0
+
+
+    def guess_outcomes(self, guests_left, weapons_left, room_mask, room, guest_kind, weapon_kind):
+        """
+        This method returns the outcomes of a guess in a room as a list of
+        (chance, next state) where a next state of None means the guess was
+        right. It returns None if the guess cannot teach anything.
+        """
+        if (room_mask >> room) & 1:
+            room_kind = POSSIBLE
+        elif (self.own_rooms >> room) & 1:
+            room_kind = OWN
+        else:
+            return None
+        results = refutations((guest_kind, weapon_kind, room_kind),
+                              (guests_left, weapons_left, room_mask.bit_count()))
+        if results is None:
+            return None
+
+        #the states after each card is shown, and after nobody could refute
+        next_states = ((guests_left - 1, weapons_left, room_mask),
+                       (guests_left, weapons_left - 1, room_mask),
+                       (guests_left, weapons_left, room_mask & ~(1 << room)),
+                       (1 if guest_kind == POSSIBLE else guests_left,
+                        1 if weapon_kind == POSSIBLE else weapons_left,
+                        1 << room if room_kind == POSSIBLE else room_mask),
+                       None)
+        return [(chance, next_states[result]) for chance, result in results]
+
+
+    def relaxed_value(self, guests_left, weapons_left, rooms_left):
+        """
+        This method returns the least expected number of turns to solve the
+        case if walking between rooms took no time at all. Nothing can be
+        done faster on the real map, so it is a lower bound for every room
+        the user could be in.
+        """
+        key = (guests_left, weapons_left, rooms_left)
+        if key in self.relaxed:
+            return self.relaxed[key]
+        best = float("inf")
+        room_kinds = [POSSIBLE] + ([OWN] if self.own_rooms else [])
+        for guest_kind, weapon_kind in self.guess_kinds():
+            for room_kind in room_kinds:
+                results = refutations((guest_kind, weapon_kind, room_kind),
+                                      (guests_left, weapons_left, rooms_left))
+                if results is None:
+                    continue
+                next_states = ((guests_left - 1, weapons_left, rooms_left),
+                               (guests_left, weapons_left - 1, rooms_left),
+                               (guests_left, weapons_left, rooms_left - 1),
+                               (1 if guest_kind == POSSIBLE else guests_left,
+                                1 if weapon_kind == POSSIBLE else weapons_left,
+                                1 if room_kind == POSSIBLE else rooms_left))
+                value = 1.0
+                for chance, result in results:
+                    if result != RIGHT:
+                        value += chance * self.relaxed_value(*next_states[result])
+                best = min(best, value)
+        self.relaxed[key] = best
+        return best
+
+
+    def guess_kinds(self):
+        """
+        Returns the (guest kind, weapon kind) pairs the user can guess
+        """
+        guest_kinds = [POSSIBLE] + ([OWN] if self.own_guest else [])
+        weapon_kinds = [POSSIBLE] + ([OWN] if self.own_weapon else [])
+        return [(guest_kind, weapon_kind) for guest_kind in guest_kinds for weapon_kind in weapon_kinds]
+
+
+    def guess_value(self, guests_left, weapons_left, room_mask, room):
+        """
+        This method returns a tuple of the least expected number of turns to
+        solve the case when the next turn is a guess in the given room, and
+        the (guest kind, weapon kind) of that guess. The value is None if no
+        guess there can teach anything.
+        """
+        best = (None, None)
+        for kinds in self.guess_kinds():
+            outcomes = self.guess_outcomes(guests_left, weapons_left, room_mask, room, *kinds)
+            if outcomes is None:
+                continue
+            value = 1.0
+            for chance, state in outcomes:
+                if state is not None:
+                    value += chance * self.plans(*state)[0][room]
+            if best[0] is None or value < best[0]:
+                best = (value, kinds)
+        return best
+
+
+    def plans(self, guests_left, weapons_left, room_mask):
+        """
+        This method returns the best plans for what the user knows, for
+        every room they could be in, as a tuple of two lists by room id: the
+        least expected number of turns to solve the case, and the (room,
+        guess kinds) of the plan that gets it, walk to room and make a guess
+        of those kinds there.
+
+        The rooms worth guessing in are searched with the possible rooms
+        first. A room is skipped when, from every room, walking there and
+        the least a guess can cost is no better than the best plan found.
+        """
+        key = (guests_left, weapons_left, room_mask)
+        if key in self.values:
+            return self.values[key]
+        self.states += 1
+        size = self.board.size
+        distance = self.board.distance
+        bound = self.relaxed_value(guests_left, weapons_left, room_mask.bit_count())
+        values = [float("inf")] * size
+        choices = [None] * size
+        for room in list(mask_card_ids(room_mask)) + list(mask_card_ids(self.own_rooms)):
+            if all(distance[here][room] is None or distance[here][room] + bound >= values[here]
+                   for here in range(size)):
+                self.pruned += 1
+                continue
+            value, kinds = self.guess_value(guests_left, weapons_left, room_mask, room)
+            if value is None:
+                continue
+            for here in range(size):
+                if distance[here][room] is not None and distance[here][room] + value < values[here]:
+                    values[here] = distance[here][room] + value
+                    choices[here] = (room, kinds)
+        self.values[key] = (values, choices)
+        return values, choices
+
+
+    def value(self, guests_left, weapons_left, room_mask, here):
+        """
+        This method returns the least expected number of turns to solve the
+        case from a state
+        """
+        return self.plans(guests_left, weapons_left, room_mask)[0][here]
+
+
+    def best(self, guests_left, weapons_left, room_mask, here):
+        """
+        This method returns a tuple (expected turns, room, guess kinds) for
+        the best plan from a state: walk to room and make a guess of the
+        given kinds there. The room is here if the best plan is to guess now.
+        """
+        values, choices = self.plans(guests_left, weapons_left, room_mask)
+        return (values[here],) + choices[here]
+
+
+def knowledge(game):
+    """
+    This function returns the state of a Game as the key the Solver uses,
+    and a Solver for the users hand. The user knows their own cards and the
+    cards they have been shown.
+    """
+    hand = game.user_player.hand
+    known = hand | game.shown
+    guests_left = sum(1 for guest in guests if not (known >> card_ids[guest]) & 1)
+    weapons_left = sum(1 for weapon in weapons if not (known >> card_ids[weapon]) & 1)
+    room_mask = 0
+    own_rooms = 0
+    for room in range(board.size):
+        bit = 1 << card_ids[board.names[room]]
+        if not known & bit:
+            room_mask |= 1 << room
+        if hand & bit:
+            own_rooms |= 1 << room
+    solver = Solver(any((hand >> card_ids[guest]) & 1 for guest in guests),
+                    any((hand >> card_ids[weapon]) & 1 for weapon in weapons), own_rooms)
+    return (guests_left, weapons_left, room_mask, game.user_player.get_location().id), solver
+
+
+def card_for(game, kind, names):
+    """
+    Returns the name of a card to guess of the given kind from names, the
+    first one still possible or the first one the user holds
+    """
+    known = game.user_player.hand | game.shown
+    for name in names:
+        held = (game.user_player.hand >> card_ids[name]) & 1
+        if (kind == POSSIBLE and not (known >> card_ids[name]) & 1) or (kind == OWN and held):
+            return name
+    return None
+
+
+def solve(game, solver=None):
+    """
+    This function returns a tuple of the least expected number of turns to
+    solve the case from the state of a Game and the Action that starts the
+    best plan. A solver made for the same hand can be given to reuse what
+    it has already worked out.
+    """
+    state, new_solver = knowledge(game)
+    solver = new_solver if solver is None else solver
+    value, room, kinds = solver.best(*state)
+    here = state[3]
+    if room == here:
+        return value, Action("Make a guess", card_for(game, kinds[0], guests), card_for(game, kinds[1], weapons))
+    return value, Action("Move to a different room", room=board.names[board.first_step[here][room]])
+
+
+def action_value(game, action, solver):
+    """
+    This function returns the expected number of turns to solve the case in
+    the model if the user takes an Action and then plays the best plan
+    """
+    (guests_left, weapons_left, room_mask, here) = knowledge(game)[0]
+    if action.kind == "Move to a different room":
+        return 1.0 + solver.value(guests_left, weapons_left, room_mask, board.ids[action.room])
+    if action.kind != "Make a guess":
+        return 1.0 + solver.value(guests_left, weapons_left, room_mask, here)
+
+    #a guest or weapon that was shown before makes the guess worthless
+    kinds = []
+    for name in (action.guest, action.weapon):
+        if (game.user_player.hand >> card_ids[name]) & 1:
+            kinds.append(OWN)
+        elif (game.shown >> card_ids[name]) & 1:
+            return 1.0 + solver.value(guests_left, weapons_left, room_mask, here)
+        else:
+            kinds.append(POSSIBLE)
+    outcomes = solver.guess_outcomes(guests_left, weapons_left, room_mask, here, *kinds)
+    if outcomes is None:
+        return 1.0 + solver.value(guests_left, weapons_left, room_mask, here)
+    return 1.0 + sum(chance * solver.value(state[0], state[1], state[2], here)
+                     for chance, state in outcomes if state is not None)
+
+
+def grade(strategy_name, num_games, num_players=6, user="Miss Scarlet", seed=0, max_turns=1000):
+    """
+    This function plays num_games seeded games with a strategy and compares
+    every guess and move with the solver. It returns a dictionary with the
+    games won, the mean turns the strategy took, the number of guesses and
+    moves and the share of them that were one of the best actions in the
+    model.
+    """
+    game = Game(user, num_players)
+    totals = {"turns": 0, "won": 0, "decisions": 0, "best": 0}
+    #games with the same kind of hand share a solver and what it worked out
+    solvers = {}
+    start = time.perf_counter()
+    for i in range(num_games):
+        game.reset("%s-%d" % (seed, i))
+        game.setup()
+        solver = knowledge(game)[1]
+        hand = (solver.own_guest, solver.own_weapon, solver.own_rooms)
+        solver = solvers.setdefault(hand, solver)
+        strategy = make_strategy(strategy_name)
+
+        def decide(game):
+            action = strategy(game)
+            if action.kind in ("Make a guess", "Move to a different room"):
+                best = solver.value(*knowledge(game)[0])
+                totals["decisions"] += 1
+                totals["best"] += action_value(game, action, solver) <= best + 1e-9
+            return action
+
+        game.play(decide, max_turns)
+        totals["turns"] += game.turns
+        totals["won"] += game.won
+    return {"strategy": strategy_name, "games": num_games, "won": totals["won"],
+            "turns_mean": totals["turns"] / num_games,
+            "decisions": totals["decisions"],
+            "best_in_model": totals["best"] / max(totals["decisions"], 1),
+            "states": sum(solver.states for solver in solvers.values()),
+            "seconds": time.perf_counter() - start}
+
+
+def main():
+    """
+    Command line entry point for grading strategies with the solver
+    """
+
+    parser = argparse.ArgumentParser(description="Grade strategies against the approximate solver")
+    parser.add_argument("--strategy", action="append", choices=sorted(strategies),
+                        help="strategy to grade, can be given more than once (default all)")
+    parser.add_argument("--games", type=int, default=10, help="games per strategy")
+    parser.add_argument("--players", type=int, default=6, choices=range(2, 7),
+                        help="total number of players including the user seat")
+    parser.add_argument("--user", default="Miss Scarlet", choices=guests,
+                        help="character for the user seat")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the games")
+    args = parser.parse_args()
+
+    for name in args.strategy or sorted(strategies):
+        print(json.dumps(grade(name, args.games, args.players, args.user, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
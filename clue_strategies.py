@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CPU strategies for the user seat. A strategy is a decision callback for
+Game.play, it is given the game and returns the Action for the next turn.
+Strategies that need to remember things between turns are classes with a
+__call__ method, so a fresh one is made for every game with make_strategy.
+"""
+
+import math
+from functools import lru_cache
+
+from clue_helpers import *
+from clue_classes import *
+from clue_deduction import user_deduction, card_slices, all_envelopes
+from clue_board import board
+
+#the card id of the first room, room card ids follow the board ids
+room_card_start = len(guests) + len(weapons)
+
+#the most knowledge states the information strategy remembers scores for
+information_cache_size = 1 << 16
+
+#for every room, the other rooms that can be reached from it, nearest first
+rooms_by_distance = [sorted((room for room in range(board.size)
+                             if room != start and board.distance[start][room] is not None),
+                            key=lambda room: board.distance[start][room])
+                     for start in range(board.size)]
+
+
+def next_step(start, goals, occupied=0):
+    """
+    This function finds the shortest route over the map from the start room
+    to the closest of the goal rooms (given by name) and returns the name of
+    the first room to move to along that route, preferring a room that is
+    not in the occupied bitmask. It returns None if the start room is a goal
+    or no goal can be reached.
+    """
+    step = board.step_towards(board.ids[start], board.room_mask(goals), occupied)
+    if step is None:
+        return None
+    return board.names[step]
+
+
+class RandomStrategy(object):
+    """
+    The RandomStrategy plays completely at random. Each turn it either moves
+    to a random adjoining room or guesses a random guest and weapon in the
+    room it is in. It uses the games random number generator so seeded games
+    play out the same way.
+    """
+
+    def __call__(self, game):
+        """
+        Decide the next Action for the game
+        """
+        location = game.user_player.get_location()
+        if game.rng.random() < 0.5:
+            return Action("Move to a different room",
+                          room=game.rng.choice(location.get_adjoining_locations()))
+        return Action("Make a guess", game.rng.choice(guests), game.rng.choice(weapons))
+
+
+class EliminationStrategy(object):
+    """
+    The EliminationStrategy keeps track of every card it has seen, starting
+    with its own hand. It guesses only guests and weapons that have not been
+    ruled out, and walks towards the nearest room that has not been ruled
+    out before guessing. If that room is occupied it guesses where it is,
+    which still rules out a guest or weapon and makes the CPU players move.
+    """
+
+    def __init__(self):
+        """
+        This method initializes the strategy with an empty set of seen cards
+        """
+        self.seen = None
+
+
+    def __call__(self, game):
+        """
+        Decide the next Action for the game
+        """
+
+        #start with our own cards and then add the card shown on the last guess
+        if self.seen is None:
+            self.seen = set(card.name for card in game.user_player.get_cards())
+        result = game.last_result
+        if result is not None and result.guess_result is not None and result.guess_result.card is not None:
+            self.seen.add(result.guess_result.card.name)
+
+        guest = [name for name in guests if name not in self.seen][0]
+        weapon = [name for name in weapons if name not in self.seen][0]
+        room_options = [room[0] for room in rooms if room[0] not in self.seen]
+
+        #guess if we are in a room that might be the answer, otherwise head
+        #towards the closest one
+        location = game.user_player.get_location()
+        step = next_step(location.get_name(), room_options, game.occupied)
+        if step is None:
+            return Action("Make a guess", guest, weapon)
+        if result is not None and result.move_result is not None and not result.move_result.moved:
+            return Action("Make a guess", guest, weapon)
+        return Action("Move to a different room", room=step)
+
+
+def guess_information(candidates, own, guess_cards):
+    """
+    This function returns the expected information, in bits, that guessing
+    the three card ids in guess_cards gives about the envelope. candidates
+    is the bitmask of envelopes still possible (see clue_deduction), each
+    counted as equally likely, and own is the bitmask of the guessers own
+    cards, which nobody shows them. A guessed card that has already been
+    ruled out is taken to be the card shown, which teaches nothing, and
+    otherwise any of the guessed cards that are not in the envelope is taken
+    to be as likely to be shown as any other.
+    """
+    total = candidates.bit_count()
+    if total <= 1:
+        return 0.0
+
+    #split the envelopes by which of the guessed cards are not in them
+    groups = [(candidates, ())]
+    for card in guess_cards:
+        split = []
+        for mask, outside in groups:
+            split.append((mask & card_slices[card], outside))
+            split.append((mask & ~card_slices[card], outside + (card,)))
+        groups = split
+
+    #add up the chance of being shown each card, a right guess ends the
+    #game with nothing left to learn
+    chances = {}
+    for mask, outside in groups:
+        count = mask.bit_count()
+        if not count or not outside:
+            continue
+        shown = [card for card in outside if not (own >> card) & 1]
+        if not shown or any(not candidates & card_slices[card] for card in shown):
+            chances[None] = chances.get(None, 0.0) + count
+            continue
+        for card in shown:
+            chances[card] = chances.get(card, 0.0) + count / len(shown)
+
+    #the envelopes left after each card is shown
+    remaining_entropy = 0.0
+    for card, chance in chances.items():
+        left = total if card is None else (candidates & ~card_slices[card]).bit_count()
+        remaining_entropy += chance / total * math.log2(left)
+    return math.log2(total) - remaining_entropy
+
+
+@lru_cache(maxsize=information_cache_size)
+def best_guess(candidates, own, room):
+    """
+    This function returns a tuple (information, guest, weapon) for the
+    guest and weapon that give the most information when guessed in the
+    room with the given board id, preferring the guest and weapon in the
+    most remaining envelopes when several are as good. Results are kept in a
+    least recently used cache, so a knowledge state seen before in any game
+    is not worked out again.
+    """
+    best = None
+    room_card = room_card_start + room
+    for guest in guests:
+        for weapon in weapons:
+            guess_cards = (card_ids[guest], card_ids[weapon], room_card)
+            score = (guess_information(candidates, own, guess_cards),
+                     (candidates & card_slices[guess_cards[0]]).bit_count() +
+                     (candidates & card_slices[guess_cards[1]]).bit_count())
+            if best is None or score > best[0]:
+                best = (score, guest, weapon)
+    return best[0][0], best[1], best[2]
+
+
+class InformationStrategy(object):
+    """
+    The InformationStrategy keeps a Deduction of everything it has learnt
+    and guesses the guest and weapon that are expected to tell it the most
+    about the envelope. Each turn it compares the best guess where it is
+    with the best guess in every other room, divided by the turns it takes
+    to get there and guess, and either guesses or takes a step towards the
+    best room. A room where a guess taught it nothing is not guessed in again
+    until it learns something else. Other rooms are looked at nearest first,
+    skipping those, up to the budget of rooms for each decision. The budget is a number of rooms
+    rather than a time so a seeded game plays out the same way on any
+    machine and however busy it is.
+
+    It takes about half a turn more to win than elimination with six
+    players. Every wrong guess shows the user one card whatever is guessed,
+    so choosing the guess well cannot save many turns and walking to the
+    rooms still possible is what counts. It is kept to measure that against,
+    and is only played in tournaments when named.
+    """
+
+    def __init__(self, budget=None):
+        """
+        This method initializes the strategy with the most rooms to look at
+        for each decision besides the one it is in, all of them if None. The
+        deduction is made on the first turn.
+        """
+        self.budget = budget
+        self.deduction = None
+        self.stale = set()
+
+
+    def __call__(self, game):
+        """
+        Decide the next Action for the game
+        """
+        if self.deduction is None:
+            self.deduction = user_deduction(game)
+        result = game.last_result
+        if result is not None and result.guess_result is not None:
+            before = self.deduction.candidates
+            self.deduction.observe_guess(game, result.guess_result)
+            if self.deduction.candidates == before:
+                self.stale.add(game.user_player.get_location().id)
+            else:
+                self.stale = set()
+
+        location = game.user_player.get_location()
+        here = location.id
+        blocked = result is not None and result.move_result is not None and not result.move_result.moved
+
+        #once the answer is known go and guess it
+        solved = self.deduction.solution()
+        if solved is not None:
+            step = board.step_towards(here, board.room_mask([solved[2]]), game.occupied)
+            if step is None or blocked:
+                return Action("Make a guess", solved[0], solved[1])
+            return Action("Move to a different room", room=board.names[step])
+
+        candidates = self.deduction.candidates
+        own = game.user_player.hand
+        information, guest, weapon = best_guess(candidates, own, here)
+        best_score = information if here not in self.stale else 0.0
+        best_room = None
+        distance = board.distance[here]
+        looked = 0
+        for room in rooms_by_distance[here]:
+            if room in self.stale:
+                continue
+            if self.budget is not None and looked == self.budget:
+                break
+            looked += 1
+            score = best_guess(candidates, own, room)[0] / (distance[room] + 1)
+            if score > best_score:
+                best_score = score
+                best_room = room
+
+        #with nothing to learn here or in the rooms looked at, head for the
+        #nearest room that could still be the answer
+        goals = 1 << best_room if best_room is not None else 0
+        if best_room is None and best_score == 0:
+            possible = self.deduction.possible_cards() >> room_card_start
+            goals = possible & ~(1 << here)
+        if not goals or blocked:
+            return Action("Make a guess", guest, weapon)
+        step = board.step_towards(here, goals, game.occupied)
+        if step is None:
+            return Action("Make a guess", guest, weapon)
+        return Action("Move to a different room", room=board.names[step])
+
+
+#the strategies that can be picked by name, each entry makes a new strategy
+strategies = {"random": RandomStrategy,
+              "elimination": EliminationStrategy,
+              "information": InformationStrategy}
+
+#the strategies that take a budget for each decision as their first argument
+budget_strategies = ["information"]
+
+
+def make_strategy(name, budget=None):
+    """
+    This function makes a new strategy for one game from the name it is
+    registered under in the strategies dictionary. budget is the work each
+    decision may do, given to the strategies in budget_strategies and not
+    used by the others. None leaves every strategy at its default.
+    """
+    if name not in strategies:
+        raise ValueError("Unknown strategy " + repr(name) + ", choose from " + ", ".join(sorted(strategies)))
+    if budget is not None and name in budget_strategies:
+        return strategies[name](budget)
+    return strategies[name]()
@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Tournament runner. It plays large batches of complete headless games where
+the user seat is played by a CPU strategy from clue_strategies and the other
+seats are the usual CPU players, and reports win rates, turns to solve and
+confidence intervals for each strategy. Games are split into chunks and
+spread across a pool of worker processes.
+
+The CPU seats can be played by bots instead (see clue_bots) and bots can
+play the user seat as the "bot:" strategies, including bots from modules
+loaded with --load. Every bot decision gets a time budget, so a slow bot
+cannot hold up the batch, and the latency percentiles of every bot are
+reported with the results.
+
+Example:
+    python clue_tournament.py --games 100000 --players 6 elimination random
+    python clue_tournament.py --load my_bots --cpu-bot random bot:my_bot elimination
+"""
+
+import argparse
+import json
+import math
+import random
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from clue_helpers import *
+from clue_classes import *
+from clue_deal import deal_policies
+from clue_events import EventLog
+from clue_planner import movement_policies
+from clue_strategies import strategies, make_strategy, budget_strategies
+from clue_bots import BotStrategy, bot_stats, hooks, load_bots, make_cpu_bots, merge_stats
+import clue_rollout
+
+#strategies only played when named: rollout takes too long over a game and
+#information is slower than elimination and takes more turns to win
+slow_strategies = ["rollout", "information"]
+
+
+def play_chunk(strategy_name, user, num_players, num_games, max_turns, seed, deal_policy="mixed",
+               events_path=None, source=0, movement="first_free", cpu_bots=None, bot_modules=(),
+               bot_budget=0.05, budget=None):
+    """
+    This function plays a chunk of games in a worker process with one Game
+    object that is reset between games. Game number i of the chunk is seeded
+    with the chunk seed followed by "-i", so any single game can be replayed
+    and every strategy is dealt the same games. It returns a tuple of a
+    Counter of turns taken to solve the case, the number of games that were
+    not solved within max_turns and the latency statistics of the bots
+    played, by bot name (see clue_bots). If events_path is given the game
+    events are appended to that event log with source as their source.
+    movement is how the CPU players move (see clue_planner). cpu_bots is a
+    list of bot names for the CPU seats, loaded from the bot_modules, and
+    bot_budget the seconds each bot decision may take. budget is the work
+    each decision of the strategy may do (see make_strategy).
+    """
+
+    for module_name in bot_modules:
+        load_bots(module_name)
+    bot_stats.clear()
+    runners = make_cpu_bots(cpu_bots, num_players - 1, bot_budget) if cpu_bots else None
+    events = EventLog(events_path, source) if events_path is not None else None
+    game = Game(user, num_players, deal_policy=deal_policy, events=events, movement=movement,
+                cpu_bots=runners)
+    turns_to_solve = Counter()
+    unsolved = 0
+    for i in range(num_games):
+        game.reset("%s-%d" % (seed, i))
+        game.setup()
+        if strategy_name.startswith("bot:"):
+            decide = BotStrategy(strategy_name[len("bot:"):], bot_budget)
+        else:
+            decide = make_strategy(strategy_name, budget)
+        game.play(decide, max_turns)
+        if game.won:
+            turns_to_solve[game.turns] += 1
+        else:
+            unsolved += 1
+    if events is not None:
+        events.close()
+    return turns_to_solve, unsolved, dict(bot_stats)
+
+
+def wilson_interval(successes, total, z=1.96):
+    """
+    This function returns the Wilson score confidence interval (low, high)
+    for a proportion. The default z gives a 95% interval.
+    """
+    if total == 0:
+        return 0.0, 0.0
+    p = successes / total
+    denominator = 1 + z * z / total
+    centre = (p + z * z / (2 * total)) / denominator
+    spread = z * math.sqrt(p * (1 - p) / total + z * z / (4 * total * total)) / denominator
+    return max(0.0, centre - spread), min(1.0, centre + spread)
+
+
+def summarize(turns_to_solve, unsolved, z=1.96):
+    """
+    This function turns the Counter of turns to solve and the unsolved count
+    for one strategy into a dictionary of statistics: the win rate with its
+    confidence interval and the mean, confidence interval, standard deviation,
+    percentiles and full distribution of the turns taken to solve the case.
+    """
+
+    wins = sum(turns_to_solve.values())
+    games = wins + unsolved
+    low, high = wilson_interval(wins, games, z)
+    summary = {"games": games, "wins": wins,
+               "win_rate": wins / games if games else 0.0,
+               "win_rate_ci": [low, high]}
+    if wins == 0:
+        return summary
+
+    mean = sum(turns * count for turns, count in turns_to_solve.items()) / wins
+    variance = sum(count * (turns - mean) ** 2 for turns, count in turns_to_solve.items())
+    stdev = math.sqrt(variance / (wins - 1)) if wins > 1 else 0.0
+    margin = z * stdev / math.sqrt(wins)
+
+    #walk the sorted distribution to find the percentiles
+    percentiles = {}
+    wanted = [(name, fraction * wins) for name, fraction in
+              (("p50", 0.5), ("p90", 0.9), ("p99", 0.99))]
+    seen = 0
+    for turns in sorted(turns_to_solve):
+        seen += turns_to_solve[turns]
+        while wanted and seen >= wanted[0][1]:
+            percentiles[wanted.pop(0)[0]] = turns
+
+    summary.update({"turns_mean": mean, "turns_mean_ci": [mean - margin, mean + margin],
+                    "turns_stdev": stdev, "turns_min": min(turns_to_solve),
+                    "turns_max": max(turns_to_solve),
+                    "turns_distribution": dict(sorted(turns_to_solve.items()))})
+    summary.update(percentiles)
+    return summary
+
+
+def run_tournament(strategy_names, num_games, num_players=6, user="Miss Scarlet",
+                   max_turns=1000, chunk_size=500, workers=None, seed=None,
+                   deal_policy="mixed", events_path=None, movement="first_free", cpu_bots=None,
+                   bot_modules=(), bot_budget=0.05, budget=None):
+    """
+    This function plays num_games games for each named strategy across a
+    pool of worker processes, chunk_size games at a time. When a seed is
+    given every chunk gets its own seed made from it, so the results are the
+    same no matter how many workers are used, and each strategy plays the
+    same deals. If events_path is given every game is written to that event
+    log, with the position of its chunk in the job list as the source. The
+    CPU seats are played by the cpu_bots, if given, with bot_budget seconds
+    for each decision. budget is the work each decision of the strategies
+    that take one may do, the rooms scored by information or the deals
+    sampled by rollout, their default if None. It returns a dictionary with
+    a summary for each strategy, with the latency of the bots played under
+    "bots".
+    """
+
+    for module_name in bot_modules:
+        load_bots(module_name)
+    if budget is not None and budget < 1:
+        raise ValueError("the budget for each decision must be at least 1, not " + str(budget))
+    for name in strategy_names:
+        make_strategy(name, budget)
+    if cpu_bots:
+        make_cpu_bots(cpu_bots, num_players - 1, bot_budget)
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    #split every strategy's games into chunks, each with its own seed. Chunk
+    #seeds do not depend on the strategy so all strategies get the same deals
+    jobs = []
+    for name in strategy_names:
+        for chunk, start in enumerate(range(0, num_games, chunk_size)):
+            count = min(chunk_size, num_games - start)
+            jobs.append((name, count, "%d-%d" % (seed, chunk)))
+
+    totals = dict((name, [Counter(), 0, {}]) for name in strategy_names)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [(name, pool.submit(play_chunk, name, user, num_players, count, max_turns,
+                                           chunk_seed, deal_policy, events_path, source, movement,
+                                           cpu_bots, tuple(bot_modules), bot_budget, budget))
+                   for source, (name, count, chunk_seed) in enumerate(jobs)]
+        for name, future in futures:
+            turns_to_solve, unsolved, latency = future.result()
+            totals[name][0].update(turns_to_solve)
+            totals[name][1] += unsolved
+            merge_stats(totals[name][2], latency)
+
+    results = {}
+    for name, (turns_to_solve, unsolved, latency) in totals.items():
+        results[name] = summarize(turns_to_solve, unsolved)
+        if latency:
+            results[name]["bots"] = dict((bot, dict((hook, stats.as_dict())
+                                                    for hook, stats in hook_stats.items() if stats.count))
+                                         for bot, hook_stats in latency.items())
+    return results
+
+
+def main():
+    """
+    Command line entry point for the tournament runner
+    """
+
+    parser = argparse.ArgumentParser(description="Play batches of CPU games and compare strategies")
+    parser.add_argument("strategies", nargs="*",
+                        default=[name for name in sorted(strategies)
+                                 if not name.startswith("bot:") and name not in slow_strategies],
+                        help="strategies to play, from: " + ", ".join(sorted(strategies)))
+    parser.add_argument("--games", type=int, default=10000, help="games per strategy")
+    parser.add_argument("--players", type=int, default=6, choices=range(2, 7),
+                        help="total number of players including the user seat")
+    parser.add_argument("--user", default="Miss Scarlet", choices=guests,
+                        help="character for the user seat")
+    parser.add_argument("--max-turns", type=int, default=1000,
+                        help="a game not solved in this many turns counts as a loss")
+    parser.add_argument("--chunk-size", type=int, default=500, help="games per work unit")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes")
+    parser.add_argument("--seed", type=int, default=None, help="seed for reproducible runs")
+    parser.add_argument("--deal-policy", default="mixed", choices=deal_policies,
+                        help="how the cards are dealt")
+    parser.add_argument("--events", default=None, help="append every game event to this event log")
+    parser.add_argument("--movement", default="first_free", choices=movement_policies,
+                        help="how the CPU players move")
+    parser.add_argument("--cpu-bot", action="append", default=None, metavar="BOT",
+                        help="bot for the CPU seats, once for all of them or once for each")
+    parser.add_argument("--load", action="append", default=[], metavar="MODULE",
+                        help="module to load bots from")
+    parser.add_argument("--bot-budget", type=float, default=0.05,
+                        help="seconds each bot decision may take, 0 for no limit")
+    parser.add_argument("--budget", type=int, default=None,
+                        help="work for each decision of " + " and ".join(budget_strategies) +
+                             ": rooms scored or deals sampled")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    args = parser.parse_args()
+
+    try:
+        results = run_tournament(args.strategies, args.games, args.players, args.user,
+                                 args.max_turns, args.chunk_size, args.workers, args.seed,
+                                 args.deal_policy, args.events, args.movement, args.cpu_bot,
+                                 args.load, args.bot_budget if args.bot_budget > 0 else None,
+                                 args.budget)
+    except ValueError as error:
+        parser.error(str(error))
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    for name, summary in results.items():
+        low, high = summary["win_rate_ci"]
+        print("\n" + name)
+        print("  win rate: {:.4f} (95% CI {:.4f} - {:.4f}) over {} games".format(
+            summary["win_rate"], low, high, summary["games"]))
+        if summary["wins"]:
+            low, high = summary["turns_mean_ci"]
+            print("  turns to solve: mean {:.2f} (95% CI {:.2f} - {:.2f}), stdev {:.2f}".format(
+                summary["turns_mean"], low, high, summary["turns_stdev"]))
+            print("  min {} / p50 {} / p90 {} / p99 {} / max {}".format(
+                summary["turns_min"], summary["p50"], summary["p90"], summary["p99"],
+                summary["turns_max"]))
+        for bot, hook_stats in sorted(summary.get("bots", {}).items()):
+            for hook in hooks:
+                if hook not in hook_stats:
+                    continue
+                latency = hook_stats[hook]
+                print("  {} {}: p50 {:.0f}us / p90 {:.0f}us / p99 {:.0f}us / max {:.0f}us, "
+                      "{} calls, {} over budget, {} errors, {} invalid".format(
+                          bot, hook, latency["p50_us"], latency["p90_us"], latency["p99_us"],
+                          latency["max_us"], latency["calls"], latency["timeouts"],
+                          latency["errors"], latency["invalid"]))
+
+
+if __name__ == "__main__":
+    main()
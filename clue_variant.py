@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Game variants. A Variant is a set of guests, weapons and rooms with the map
+that joins the rooms, compiled once into everything a Game looks up while it
+is played: card names, kinds and ids, the card ids of each kind, the board
+index (see clue_board) and a map renderer (see clue_render). The standard
+game is the variant made from the tables in clue_helpers.
+
+Other variants are read from a JSON file:
+
+    {"name": "Grand Mansion",
+     "guests": ["Professor Plum", "Miss Scarlet", ...],
+     "short_names": {"Professor Plum": " Plum  ", ...},
+     "weapons": ["Candlestick", "Knife", ...],
+     "rooms": [["Library", ["Hall", "Dining Room", "Garage"]], ...],
+     "start": "Garage",
+     "map": ["template line with {0}", ...]}
+
+short_names and map are optional. Short names default to the first 7
+letters of each guest and a map with a box for every room is generated if
+none is given. The CPU players start in the room with the same index as
+their guest and the user in the start room, so there must be more rooms than
+guests and the start room has to come after the first room of every guest.
+Every door must go both ways and every room must be reachable from the start.
+
+Compiling a variant checks all of that and builds the tables. Working out
+the shortest paths between every pair of rooms takes far longer than
+reading them back for a large mansion, so load_variant keeps the distance
+and first step tables in a JSON file next to the variant, in __pycache__,
+named by the hash of the file. A changed file gets a new hash and is
+compiled again. The cache only holds numbers, never anything that is run
+when it is read, and it is checked against the map before it is used, so a
+cache file that was tampered with or is corrupt is ignored and rebuilt.
+
+Example:
+    mansion = load_variant("boards/mansion.json")
+    game = Game("Miss Scarlet", 6, variant=mansion)
+"""
+
+import hashlib
+import json
+import os
+import re
+from collections import Counter
+
+from clue_helpers import *
+from clue_board import Board
+from clue_render import MapRenderer
+
+#changed whenever the cached tables change, so old caches are not used
+COMPILED_VERSION = 2
+
+#the width of the text that shows who is in a room on the map
+CELL_WIDTH = 7
+
+#compiled variants already loaded by this process, by hash
+loaded = {}
+
+
+def map_lines(room_names, columns=4):
+    """
+    This function generates a map template with a box for every room, in
+    rows of up to columns rooms, with the room name and a cell for who is in
+    it
+    """
+    width = max([CELL_WIDTH + 2] + [len(name) + 2 for name in room_names])
+    border = "+" + "+".join(["-" * width] * min(columns, len(room_names))) + "+"
+    lines = [border]
+    for first in range(0, len(room_names), columns):
+        row = range(first, min(first + columns, len(room_names)))
+        lines.append("|" + "|".join(room_names[room].center(width) for room in row) + "|")
+        left = (width - CELL_WIDTH) // 2
+        right = width - CELL_WIDTH - left
+        lines.append("|" + "|".join(" " * left + "{" + str(room) + "}" + " " * right for room in row) + "|")
+        lines.append(border if len(row) == columns else
+                     "+" + "+".join(["-" * width] * len(row)) + "+")
+    return lines
+
+
+class Variant(object):
+    """
+    The Variant class holds the compiled tables for one set of cards and
+    one map. It does not change once built, so one Variant is shared by
+    every game played with it.
+    """
+
+    def __init__(self, name, guest_names, weapon_names, room_table, start, short=None, template=None,
+                 tables=None):
+        """
+        This method checks the definition and compiles it. room_table is a
+        list of [name, [adjoining names]] like rooms in clue_helpers, start
+        the name of the room the user starts in, short a dictionary of the
+        short name shown on the map for each guest, template the map lines
+        and tables the board tables worked out before, if any (see Board).
+        It raises ValueError if the definition cannot be played.
+        """
+        self.name = name
+        self.guests = list(guest_names)
+        self.weapons = list(weapon_names)
+        self.rooms = [[room[0], list(room[1])] for room in room_table]
+        self.room_names = [room[0] for room in self.rooms]
+        self.check_cards()
+
+        #the board index checks that every adjoining room is on the map
+        self.board = Board(self.rooms, tables)
+        if start not in self.board.ids:
+            raise ValueError("start room " + repr(start) + " is not on the map")
+        self.start = self.board.ids[start]
+        self.check_map()
+
+        #card ids, guests first, then weapons, then rooms
+        self.card_names = self.guests + self.weapons + self.room_names
+        self.card_kinds = ["Guest"] * len(self.guests) + ["Weapon"] * len(self.weapons) + \
+                          ["Room"] * len(self.rooms)
+        self.card_ids = dict((card, idx) for idx, card in enumerate(self.card_names))
+        self.num_cards = len(self.card_names)
+        self.kind_ids = [[self.card_ids[card] for card in names]
+                         for names in (self.guests, self.weapons, self.room_names)]
+
+        #the map, with the short name of every guest fitted to a cell
+        short = short if short is not None else {}
+        self.short_names = {}
+        for guest in self.guests:
+            text = short.get(guest, guest[:CELL_WIDTH])
+            if len(text) > CELL_WIDTH:
+                raise ValueError("short name " + repr(text) + " is longer than " + str(CELL_WIDTH))
+            self.short_names[guest] = text.center(CELL_WIDTH)
+        self.template = list(template) if template is not None else map_lines(self.room_names)
+        cells = Counter(re.findall(r"\{(\d+)\}", "\n".join(self.template)))
+        for room in range(len(self.rooms)):
+            if cells[str(room)] != 1:
+                raise ValueError("the map must have one {" + str(room) + "} cell for " + self.room_names[room])
+        try:
+            "".join(self.template).format(*([""] * len(self.rooms)))
+        except (IndexError, KeyError, ValueError):
+            raise ValueError("the map can only have {n} cells for the rooms and no other braces")
+        self.renderer = MapRenderer(self.template, CELL_WIDTH)
+        self.digest = None
+
+
+    def check_cards(self):
+        """
+        Raises ValueError if the guests, weapons and rooms cannot be made
+        into a deck
+        """
+        for kind, names in (("guests", self.guests), ("weapons", self.weapons), ("rooms", self.room_names)):
+            if len(names) < 2:
+                raise ValueError("a variant needs at least 2 " + kind)
+            for card in names:
+                if not isinstance(card, str) or not card.strip():
+                    raise ValueError("card names must be text, not " + repr(card))
+                if "{" in card or "}" in card:
+                    raise ValueError("card names cannot have braces, " + repr(card))
+        seen = set()
+        for card in self.guests + self.weapons + self.room_names:
+            if card in seen:
+                raise ValueError("card name " + repr(card) + " is used more than once")
+            seen.add(card)
+        if len(self.rooms) <= len(self.guests):
+            raise ValueError("there must be more rooms than guests so everyone has a room to start in")
+
+
+    def check_map(self):
+        """
+        Raises ValueError if the doors do not go both ways, a player could
+        not start where they should or a room cannot be reached
+        """
+        board = self.board
+        for room in range(board.size):
+            if (board.adjacency[room] >> room) & 1:
+                raise ValueError(board.names[room] + " adjoins itself")
+            for other in board.neighbours[room]:
+                if not (board.adjacency[other] >> room) & 1:
+                    raise ValueError(board.names[room] + " adjoins " + board.names[other] +
+                                     " but not the other way")
+        if self.start < len(self.guests):
+            raise ValueError("the start room must not be one of the first " + str(len(self.guests)) +
+                             " rooms, where the guests start")
+        for room in range(board.size):
+            if board.distance[self.start][room] is None:
+                raise ValueError(board.names[room] + " cannot be reached from " + board.names[self.start])
+
+
+    def __repr__(self):
+        """
+        Representation method for a variant. Returns its name and size
+        """
+        return "{} ({} guests, {} weapons, {} rooms)".format(self.name, len(self.guests),
+                                                            len(self.weapons), len(self.rooms))
+
+
+def variant_from_data(data, tables=None):
+    """
+    This function compiles a Variant from a dictionary read from a variant
+    file, with the board tables worked out before if given. It raises
+    ValueError if anything is missing or wrong.
+    """
+    if not isinstance(data, dict):
+        raise ValueError("a variant file must hold a JSON object")
+    for key in ("guests", "weapons", "rooms", "start"):
+        if key not in data:
+            raise ValueError("a variant file needs " + repr(key))
+    for room in data["rooms"]:
+        if not isinstance(room, list) or len(room) != 2 or not isinstance(room[1], list):
+            raise ValueError("each room must be [name, [adjoining rooms]], not " + repr(room))
+    return Variant(data.get("name", "Variant"), data["guests"], data["weapons"], data["rooms"],
+                   data["start"], data.get("short_names"), data.get("map"), tables)
+
+
+def load_variant(path, cache_dir=None):
+    """
+    This function returns the compiled Variant for a variant file. The board
+    tables are read from the cache in cache_dir (__pycache__ next to the
+    file if None) when the file has not changed, and worked out and cached
+    otherwise. It raises ValueError if the file is not a valid variant.
+    """
+    with open(path, "rb") as variant_file:
+        data = variant_file.read()
+    digest = hashlib.sha256(data + b"\0" + str(COMPILED_VERSION).encode()).hexdigest()
+    if digest in loaded:
+        return loaded[digest]
+    try:
+        definition = json.loads(data.decode("utf-8"))
+    except (UnicodeDecodeError, ValueError) as error:
+        raise ValueError(path + " is not a JSON file: " + str(error))
+
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), "__pycache__")
+    cache_path = os.path.join(cache_dir, "variant-" + digest[:32] + ".json")
+    tables = None
+    try:
+        with open(cache_path) as cache_file:
+            cache = json.load(cache_file)
+        if isinstance(cache, dict) and cache.get("digest") == digest:
+            tables = (cache.get("distance"), cache.get("first_step"))
+    except (OSError, ValueError):
+        tables = None
+
+    variant = None
+    if tables is not None:
+        try:
+            variant = variant_from_data(definition, tables)
+        except ValueError:
+            #a cache that does not fit the map is worked out again
+            variant = None
+    if variant is None:
+        variant = variant_from_data(definition)
+
+        #the cache is only an optimisation, so failing to write it is fine
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            temp_path = cache_path + "." + str(os.getpid())
+            with open(temp_path, "w") as cache_file:
+                json.dump({"digest": digest, "distance": variant.board.distance,
+                           "first_step": variant.board.first_step}, cache_file)
+            os.replace(temp_path, cache_path)
+        except OSError:
+            pass
+
+    variant.digest = digest
+    loaded[digest] = variant
+    return variant
+
+
+#the standard game, made from the tables in clue_helpers
+standard = Variant("Clue", guests, weapons, rooms, "Garage", short_names, map_template)
+
+#share the renderer clue_helpers draws the standard map with, so there is
+#only one record of what is on the screen
+standard.renderer = map_renderer
@@ -0,0 +1,12 @@
+import pytest
+
+pytest.importorskip("numpy")
+
+from clue_batch import check_against_engine
+
+
+@pytest.mark.parametrize("num_players, user, deal_policy", [(6, "Miss Scarlet", "shuffle"),
+                                                           (3, "Miss Scarlet", "shuffle"),
+                                                           (4, "Professor Plum", "mixed")])
+def test_batch_games_match_the_engine(num_players, user, deal_policy):
+    assert check_against_engine(300, num_players, user, seed=7, deal_policy=deal_policy) == 0
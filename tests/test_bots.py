@@ -0,0 +1,111 @@
+import time
+
+import pytest
+
+from clue_classes import Game, Guess
+from clue_bots import (Bot, BotStrategy, LatencyStats, bot_stats, load_bots, make_cpu_bots,
+                       merge_stats, register_bot, whole_number)
+from clue_strategies import make_strategy
+
+
+@register_bot("test_bad_answers")
+class BadAnswersBot(Bot):
+    def choose_move(self, view):
+        return True
+
+    def choose_guess(self, view):
+        return 0.0, float(view.kinds[1][0])
+
+    def choose_reveal(self, view, cards):
+        return float(cards[0])
+
+
+@register_bot("test_highest")
+class HighestBot(Bot):
+    def choose_reveal(self, view, cards):
+        return max(cards)
+
+
+@register_bot("test_slow")
+class SlowBot(Bot):
+    def choose_move(self, view):
+        time.sleep(0.05)
+        return None
+
+
+def test_whole_number_rejects_bools_and_floats():
+    assert whole_number(3) == 3
+    assert whole_number(True) is None
+    assert whole_number(2.0) is None
+    assert whole_number("2") is None
+
+
+def test_bad_answers_fall_back_instead_of_crashing():
+    for seed in range(20):
+        game = Game("Miss Scarlet", 4, seed=seed, cpu_bots=make_cpu_bots(["test_bad_answers"], 3))
+        game.setup()
+        game.play(BotStrategy("test_bad_answers"), 40)
+    stats = bot_stats["test_bad_answers"]
+    for hook in ("choose_move", "choose_guess", "choose_reveal"):
+        assert stats[hook].count > 0
+        assert stats[hook].invalid == stats[hook].count
+
+
+def test_registered_bots_are_strategies():
+    strategy = make_strategy("bot:test_highest")
+    assert isinstance(strategy, BotStrategy)
+    with pytest.raises(ValueError):
+        make_cpu_bots(["no such bot"], 2)
+    with pytest.raises(ValueError):
+        make_cpu_bots(["random", "random"], 3)
+    with pytest.raises(ValueError):
+        load_bots("no_such_bot_module")
+
+
+def test_bots_pick_the_card_shown():
+    game = Game("Miss Scarlet", 2, seed=1, cpu_bots=make_cpu_bots(["test_highest"], 1))
+    game.setup()
+    variant = game.variant
+    cpu_cards = set(card.id for card in game.cpu_players[0].get_cards())
+    for guest in variant.guests:
+        for weapon in variant.weapons:
+            guess = Guess(guest, weapon, game.user_player.get_location().get_name())
+            held = [variant.card_ids[name] for name in (guest, weapon, guess.room)
+                    if variant.card_ids[name] in cpu_cards]
+            shown_by, card = game.find_card(guess)
+            if held:
+                assert shown_by is game.cpu_players[0] and card.id == max(held)
+            else:
+                assert card is None
+
+
+def test_seeded_bot_games_repeat():
+    def play():
+        game = Game("Miss Scarlet", 5, seed=9, cpu_bots=make_cpu_bots(["random", "wanderer"] * 2, 4))
+        game.setup()
+        return [repr(result) for result in game.play(make_strategy("bot:wanderer"), 200)]
+    assert play() == play()
+
+
+def test_slow_bots_fall_back_within_the_budget():
+    game = Game("Miss Scarlet", 3, seed=2, cpu_bots=make_cpu_bots(["test_slow"], 2, budget=0.005))
+    game.setup()
+    game.play(make_strategy("elimination"), 5)
+    stats = bot_stats["test_slow"]["choose_move"]
+    assert stats.count > 0 and stats.timeouts == stats.count
+    #the hook is interrupted instead of running to the end
+    assert stats.longest < 0.05
+
+
+def test_latency_stats_percentiles_and_merge():
+    stats = LatencyStats()
+    for micros in range(1, 101):
+        stats.add(micros / 1e6)
+    assert stats.percentile(0.5) <= stats.percentile(0.9) <= stats.percentile(0.99) <= stats.longest
+    assert 50e-6 <= stats.percentile(0.5) <= 60e-6
+    assert LatencyStats().percentile(0.5) is None
+    into = merge_stats({}, {"bot": {"choose_move": stats}})
+    merge_stats(into, {"bot": {"choose_move": stats}})
+    merged = into["bot"]["choose_move"]
+    assert merged.count == 200 and merged.longest == stats.longest
+    assert merged.as_dict()["calls"] == 200
@@ -0,0 +1,33 @@
+import pytest
+
+from clue_classes import Game
+from clue_deduction import card_slices
+from clue_deal import ENVELOPE
+from clue_strategies import make_strategy
+
+
+def check_against_deal(game):
+    deduction = game.deduction
+    envelope = [card for card, holder in enumerate(game.holders) if holder == ENVELOPE]
+    assert deduction.candidates & card_slices[envelope[0]] & card_slices[envelope[1]] & \
+           card_slices[envelope[2]]
+    for card, holder in enumerate(deduction.owner):
+        assert holder is None or holder == game.holders[card]
+    for seat, mask in enumerate(deduction.not_owned):
+        assert all(game.holders[card] != seat for card in range(len(game.holders)) if (mask >> card) & 1)
+    assert all(game.holders[card] == ENVELOPE for card in range(len(game.holders))
+               if (deduction.in_envelope >> card) & 1)
+
+
+@pytest.mark.parametrize("strategy", ["elimination", "random"])
+def test_deduction_agrees_with_the_deal(strategy):
+    for seed in range(40):
+        game = Game("Miss Scarlet", 2 + seed % 5, seed=seed, hints=True)
+        game.setup()
+        decide = make_strategy(strategy)
+        check_against_deal(game)
+        while not game.won and game.turns < 150:
+            game.play_turn(decide(game))
+            check_against_deal(game)
+        if game.won:
+            assert game.deduction.remaining() == 1
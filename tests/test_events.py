@@ -0,0 +1,64 @@
+import pytest
+
+import clue_events
+
+from clue_classes import Game
+from clue_events import DEAL, GUESS, REFUTE, WIN, EventLog, iter_events, read_events
+from clue_strategies import make_strategy
+
+
+def play_logged(path, source, seeds):
+    with EventLog(str(path), source) as log:
+        for seed in seeds:
+            game = Game("Miss Scarlet", 6, seed=seed, events=log)
+            game.setup()
+            game.play(make_strategy("elimination"), 200)
+            assert game.won
+
+
+def test_append_and_read_back(tmp_path):
+    path = tmp_path / "games.log"
+    play_logged(path, 0, range(3))
+    play_logged(path, 70000, range(3, 5))
+    events = list(iter_events(str(path)))
+    assert set(event[0] for event in events) == {0, 70000}
+    for source, games in ((0, 3), (70000, 2)):
+        mine = [event for event in events if event[0] == source]
+        assert sorted(set(event[3] for event in mine)) == list(range(games))
+        for game in range(games):
+            kinds = [event[1] for event in mine if event[3] == game]
+            assert kinds.count(DEAL) == 24
+            assert kinds.count(WIN) == 1 and kinds[-1] == WIN
+            #every guess but the winning one is answered by a refutation
+            assert kinds.count(GUESS) == kinds.count(REFUTE) + 1
+
+
+def test_numpy_reader_matches(tmp_path):
+    np = pytest.importorskip("numpy")
+    path = tmp_path / "games.log"
+    play_logged(path, 7, range(2))
+    events = read_events(str(path))
+    fields = ["source", "kind", "seat", "game", "turn", "a", "b", "c", "d"]
+    assert [tuple(int(event[field]) for field in fields) for event in events] == list(iter_events(str(path)))
+    assert set(events["version"].tolist()) == {2}
+    assert len(read_events(str(path), 5, 9)) == 4
+
+
+def test_other_layouts_are_rejected(tmp_path):
+    path = tmp_path / "old.log"
+    path.write_bytes(bytes(32))
+    with pytest.raises(ValueError):
+        list(iter_events(str(path)))
+    with pytest.raises(ValueError):
+        EventLog(str(tmp_path / "new.log"), 1 << 32)
+
+
+def test_short_writes_are_finished(tmp_path, monkeypatch):
+    real_write = clue_events.os.write
+    monkeypatch.setattr(clue_events.os, "write", lambda fd, data: real_write(fd, data[:7]))
+    path = tmp_path / "short.log"
+    play_logged(path, 3, range(2))
+    monkeypatch.undo()
+    events = list(iter_events(str(path)))
+    assert set(event[0] for event in events) == {3}
+    assert [event[1] for event in events].count(WIN) == 2
@@ -0,0 +1,28 @@
+from clue_classes import Action, Game
+from clue_strategies import make_strategy
+
+
+def test_fork_after_a_refuted_guess():
+    game = Game("Miss Scarlet", 6, seed=4)
+    game.setup()
+    result = game.play_turn(Action("Make a guess", "Mrs White", "Rope"))
+    assert result.guess_result.shown_by is game.cpu_players[1]
+    child = game.fork()
+    copied = child.last_result
+    assert copied.guess_result.shown_by is child.cpu_players[1]
+    for move in copied.cpu_moves:
+        assert move.player in child.cpu_players
+        assert move.to_location is child.locations[move.to_location.id]
+    #a strategy starting on the fork reads the last result with its players
+    child.play(make_strategy("information"), 200)
+    assert child.won
+
+
+def test_fork_hands_are_not_shared():
+    game = Game("Miss Scarlet", 4, seed=1)
+    game.setup()
+    hands = [list(player.get_cards()) for player in [game.user_player] + game.cpu_players]
+    child = game.fork()
+    child.cpu_players[0].deal_card(game.deck[0])
+    child.user_player.clear_cards()
+    assert [player.get_cards() for player in [game.user_player] + game.cpu_players] == hands
@@ -0,0 +1,61 @@
+from clue_classes import Game
+from clue_journal import Journal
+from clue_strategies import make_strategy
+
+
+def played_journal(journal, seed=3):
+    game = Game("Miss Scarlet", 6, seed=seed, journal=journal)
+    game.setup()
+    game.play(make_strategy("elimination"), 200)
+    for number in range(30):
+        journal.add_note("note " + str(number))
+    return game
+
+
+def test_records_follow_the_game():
+    journal = Journal()
+    game = played_journal(journal)
+    records = journal.records()
+    assert records[0] == ("cards", tuple(card.id for card in game.user_player.get_cards()))
+    guesses = journal.find("guess")
+    assert len(guesses) == len(journal.cards_seen()) + 1
+    assert set(card for name, card in journal.cards_seen()) == \
+           set(card for card in range(len(game.holders)) if (game.shown >> card) & 1)
+    assert records[-1] == ("note", "note 29")
+    assert str(journal) == game.scratch_pad
+
+
+def test_spilled_records_read_back_like_kept_ones(tmp_path):
+    full = Journal()
+    played_journal(full)
+    spill = tmp_path / "spill.jsonl"
+    limited = Journal(limit=10, spill_path=str(spill))
+    played_journal(limited)
+    assert len(limited.entries) == 10 and len(limited) == len(full)
+    assert limited.records() == full.records()
+    assert limited.records(5, 25) == full.records(5, 25)
+    assert limited.render() == full.render()
+    assert limited.page(1, 7) == full.page(1, 7)
+    limited.clear()
+    assert len(limited) == 0 and spill.read_text() == ""
+
+
+def test_dropped_records_are_counted():
+    full = Journal()
+    played_journal(full)
+    limited = Journal(limit=10)
+    played_journal(limited)
+    assert len(limited) == len(full) and limited.dropped == len(full) - 10
+    assert limited.records() == full.records()[-10:]
+    assert limited.tail(4).startswith("(" + str(len(full) - 4) + " earlier entries)\n")
+
+
+def test_forks_share_records_until_either_adds_one():
+    journal = Journal()
+    journal.add_note("first")
+    other = journal.fork()
+    assert other.entries is journal.entries
+    other.add_note("only in the fork")
+    journal.add_note("only in the game")
+    assert journal.records() == [("note", "first"), ("note", "only in the game")]
+    assert other.records() == [("note", "first"), ("note", "only in the fork")]
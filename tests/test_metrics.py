@@ -0,0 +1,68 @@
+import json
+
+import clue_metrics
+from clue_classes import Game, Guess
+from clue_metrics import Metrics, counters, dump_metrics, get_metrics, phases
+from clue_strategies import make_strategy
+
+
+def test_played_games_are_timed_and_counted():
+    metrics = Metrics()
+    game = Game("Miss Scarlet", 6, seed=3, metrics=metrics)
+    game.setup()
+    results = game.play(make_strategy("elimination"), 300)
+    counts = metrics.counts
+    assert counts["games"] == 1
+    assert counts["turns"] == len(results) == game.turns
+    guesses = sum(result.guess_result is not None for result in results)
+    assert counts["guesses"] == metrics.timings["guess"][0] == guesses
+    #every guess but the winning one asks at least one player
+    assert counts["refuters_asked"] >= guesses - 1
+    for calls, total, longest in metrics.timings.values():
+        assert calls >= 0 and total >= longest >= 0
+
+
+def test_refuters_asked_stop_at_the_first_who_can():
+    metrics = Metrics()
+    game = Game("Miss Scarlet", 6, seed=5, metrics=metrics)
+    game.setup()
+    for guest in game.variant.guests:
+        for weapon in game.variant.weapons:
+            guess = Guess(guest, weapon, game.user_player.get_location().get_name())
+            before = metrics.counts["refuters_asked"]
+            shown_by, card = game.find_card(guess)
+            asked = metrics.counts["refuters_asked"] - before
+            if shown_by is None:
+                assert asked == game.num_players - 1
+            else:
+                assert asked == game.seat(shown_by)
+
+
+def test_as_dict_has_every_counter_and_phase():
+    metrics = Metrics("test")
+    metrics.count("stalls", 2)
+    metrics.time("render", 0.0)
+    data = json.loads(repr(metrics))
+    assert data["name"] == "test"
+    assert sorted(data["counters"]) == sorted(counters)
+    assert data["counters"]["stalls"] == 2
+    assert sorted(data["phases"]) == sorted(phases)
+    assert data["phases"]["render"]["calls"] == 1
+    assert data["phases"]["guess"]["mean_us"] is None
+    metrics.reset()
+    assert metrics.counts["stalls"] == 0 and metrics.timings["render"][0] == 0
+
+
+def test_registry_shares_metrics_by_name_and_dumps_them(tmp_path, monkeypatch):
+    monkeypatch.setattr(clue_metrics, "registry", {})
+    first = get_metrics("tables")
+    assert get_metrics("tables") is first
+    assert get_metrics("other") is not first
+    first.count("games")
+    path = str(tmp_path / "metrics.json")
+    dump_metrics(path, {"uptime": 1})
+    with open(path) as metrics_file:
+        data = json.load(metrics_file)
+    assert sorted(data) == ["other", "tables", "uptime"]
+    assert data["tables"]["counters"]["games"] == 1
+    assert not (tmp_path / "metrics.json.tmp").exists()
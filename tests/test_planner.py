@@ -0,0 +1,48 @@
+import random
+
+from clue_board import board
+from clue_classes import Game
+from clue_planner import pick_goal, plan_moves
+from clue_strategies import make_strategy
+
+
+def play(seed, num_players):
+    game = Game("Miss Scarlet", num_players, seed=seed, movement="planner")
+    game.setup()
+    results = [repr(result) for result in game.play(make_strategy("elimination"), 300)]
+    return results, [player.get_location().id for player in game.cpu_players], list(game.cpu_goals)
+
+
+def test_seeded_planner_games_repeat():
+    for seed in range(10):
+        num_players = 3 + seed % 4
+        first = play(seed, num_players)
+        plan_moves.cache_clear()
+        assert play(seed, num_players) == first
+
+
+def test_goals_are_never_where_the_player_or_user_is():
+    rng = random.Random(1)
+    for i in range(2000):
+        room, user_room = rng.randrange(board.size), rng.randrange(board.size)
+        goal = pick_goal(board, rng, room, user_room)
+        assert 0 <= goal < board.size and goal not in (room, user_room)
+
+
+def test_plans_keep_one_player_per_room():
+    rng = random.Random(2)
+    for i in range(2000):
+        rooms = rng.sample(range(board.size), rng.randrange(2, 7))
+        user_room, positions = rooms[0], tuple(rooms[1:])
+        goals = tuple(pick_goal(board, rng, room, user_room) for room in positions)
+        targets, order = plan_moves(board, user_room, positions, goals)
+        assert (targets, order) == plan_moves.__wrapped__(board, user_room, positions, goals)
+        assert len(set(targets)) == len(targets) and user_room not in targets
+        #replay the moves in order, every one into a free adjoining room
+        occupied = set(rooms)
+        for seat in order:
+            assert targets[seat] in board.neighbours[positions[seat]]
+            assert targets[seat] not in occupied
+            occupied.remove(positions[seat])
+            occupied.add(targets[seat])
+        assert all(targets[seat] == positions[seat] for seat in range(len(positions)) if seat not in order)
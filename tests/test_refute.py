@@ -0,0 +1,37 @@
+import itertools
+
+from clue_classes import Game, Guess
+
+
+def scan(game, guess, seat):
+    #ask every other player in seating order, as the game used to
+    guessed = [guess.guest, guess.weapon, guess.room]
+    for step in range(1, game.num_players):
+        player = game.seat_player((seat + step) % game.num_players)
+        held = [card for card in player.get_cards() if card.name in guessed]
+        if held:
+            return player, min(held, key=lambda card: card.id)
+    return None, None
+
+
+def test_find_card_matches_asking_in_seating_order():
+    for seed in range(6):
+        game = Game("Miss Scarlet", 3 + seed % 4, seed=seed)
+        game.setup()
+        variant = game.variant
+        for guest, weapon, room in itertools.product(variant.guests, variant.weapons, variant.room_names):
+            guess = Guess(guest, weapon, room)
+            for seat in range(game.num_players):
+                player = game.seat_player(seat)
+                assert game.find_card(guess, player if seat else None) == scan(game, guess, seat)
+
+
+def test_nobody_shows_the_envelope_or_the_guessers_own_cards():
+    game = Game("Miss Scarlet", 2, seed=4)
+    game.setup()
+    envelope = game.correct_guess
+    assert game.find_card(envelope) == (None, None)
+    own = set(card.name for card in game.user_player.get_cards())
+    guest = next((name for name in game.variant.guests if name in own), envelope.guest)
+    weapon = next((name for name in game.variant.weapons if name in own), envelope.weapon)
+    assert game.find_card(Guess(guest, weapon, envelope.room)) == (None, None)
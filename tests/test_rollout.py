@@ -0,0 +1,20 @@
+from clue_classes import Game
+from clue_rollout import RolloutStrategy
+from clue_strategies import EliminationStrategy, make_strategy
+
+
+def play(seed):
+    game = Game("Miss Scarlet", 6, seed=seed)
+    game.setup()
+    return [repr(result) for result in game.play(RolloutStrategy(samples=10), 100)]
+
+
+def test_seeded_games_play_out_the_same_way():
+    for seed in range(3):
+        assert play(seed) == play(seed)
+
+
+def test_budget_reaches_the_strategies_that_take_one():
+    assert make_strategy("information", 2).budget == 2
+    assert make_strategy("rollout", 7).samples == 7
+    assert isinstance(make_strategy("elimination", 2), EliminationStrategy)
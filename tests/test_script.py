@@ -0,0 +1,62 @@
+import io
+import json
+
+import pytest
+
+from clue_script import Session, run_script
+
+
+def play(session, record):
+    return session.handle(json.dumps(record) if not isinstance(record, str) else record)
+
+
+def started_session():
+    session = Session()
+    records = play(session, {"character": "Miss Scarlet", "cpu_players": 3, "seed": 7})
+    assert records[0]["event"] == "start"
+    return session
+
+
+@pytest.mark.parametrize("line", [
+    "not json",
+    "[1, 2]",
+    {"action": "Fly away"},
+    {"action": "Make a guess", "guest": "Nobody", "weapon": "Rope"},
+    {"action": "Make a guess", "guest": "Mrs White", "weapon": 3},
+    {"action": "Move to a different room", "room": "Nowhere"},
+    {"action": "Scratch Pad"},
+    {"action": "Scratch Pad", "note": 12},
+    {"action": "Scratch Pad", "note": ["a list"]},
+])
+def test_bad_records_are_errors_and_the_game_goes_on(line):
+    session = started_session()
+    records = play(session, line)
+    assert len(records) == 1 and "error" in records[0] and records[0]["line"] == 2
+    assert session.errors == 1 and session.game.turns == 0
+    records = play(session, {"action": "Scratch Pad", "note": "White was in the Hall"})
+    assert "error" not in records[0] and session.game.turns == 1
+
+
+@pytest.mark.parametrize("record", [
+    {"character": "Nobody", "cpu_players": 3},
+    {"character": "Miss Scarlet", "cpu_players": True},
+    {"character": "Miss Scarlet", "cpu_players": 2.0},
+    {"character": "Miss Scarlet", "cpu_players": 9},
+    {"character": "Miss Scarlet", "cpu_players": 3, "seed": 1.5},
+])
+def test_bad_setup_records_are_rejected(record):
+    session = Session()
+    assert "error" in play(session, record)[0]
+    assert session.game is None
+    assert "error" in play(session, {"action": "See my cards"})[0]
+
+
+def test_run_script_counts_errors():
+    lines = [json.dumps({"character": "Miss Scarlet", "cpu_players": 2, "seed": 1}),
+             json.dumps({"action": "Scratch Pad", "note": None}),
+             json.dumps({"action": "Exit Game"}),
+             json.dumps({"action": "See my cards"})]
+    output, log = io.StringIO(), io.StringIO()
+    assert run_script(lines, output, log) == 2
+    results = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert results[-1]["event"] == "end"
@@ -0,0 +1,64 @@
+import asyncio
+import json
+
+from clue_server import GameServer
+
+
+async def talk(port, lines):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    records = []
+    for line in lines:
+        writer.write((json.dumps(line) if not isinstance(line, str) else line).encode("utf-8") + b"\n")
+        await writer.drain()
+        records.append(json.loads(await reader.readline()))
+    writer.close()
+    await writer.wait_closed()
+    return records
+
+
+def run(game_server, clients):
+    async def main():
+        server = await asyncio.start_server(game_server.handle, "127.0.0.1", 0)
+        port = server.sockets[0].getsockname()[1]
+        async with server:
+            return await asyncio.gather(*(client(port) for client in clients))
+    return asyncio.run(main())
+
+
+def test_tables_play_their_own_games_and_survive_bad_lines():
+    setup = {"character": "Miss Scarlet", "cpu_players": 3, "seed": 7}
+
+    async def client(port):
+        return await talk(port, [setup, "not json", {"action": "See my cards"}])
+
+    game_server = GameServer()
+    first, second = run(game_server, [client, client])
+    assert first == second
+    start, error, cards = first
+    assert start["event"] == "start" and start["user"] == "Miss Scarlet"
+    assert error["line"] == 2 and "error" in error
+    assert cards["cards"] == start["cards"]
+    assert game_server.status() == {"active": 0, "served": 2, "games": 2}
+
+
+def test_quiet_players_are_timed_out_and_their_game_ended():
+    async def client(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        writer.write(b'{"character": "Miss Scarlet", "cpu_players": 2, "seed": 1}\n')
+        await writer.drain()
+        records = [json.loads(line) for line in (await reader.read()).splitlines()]
+        writer.close()
+        return records
+
+    (records,) = run(GameServer(turn_timeout=0.05), [client])
+    assert [record.get("event") for record in records] == ["start", "timeout", "end"]
+
+
+def test_a_full_server_turns_players_away():
+    async def client(port):
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        records = [json.loads(line) for line in (await reader.read()).splitlines()]
+        writer.close()
+        return records
+
+    assert run(GameServer(max_sessions=0), [client]) == [[{"error": "the server is full"}]]
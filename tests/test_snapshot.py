@@ -0,0 +1,68 @@
+import pytest
+
+from clue_classes import Game
+from clue_snapshot import SNAPSHOT_SIZE, load, save
+from clue_strategies import make_strategy
+
+
+def played_game(seed, num_players=6, turns=8, hints=False):
+    game = Game("Miss Scarlet", num_players, seed=seed, hints=hints)
+    game.setup()
+    game.play(make_strategy("elimination"), turns)
+    return game
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_save_load_round_trip(seed):
+    game = played_game(seed, 2 + seed % 5, hints=bool(seed % 2))
+    data = save(game)
+    assert len(data) == SNAPSHOT_SIZE
+    copy = load(data)
+    assert save(copy) == data
+    assert copy.turns == game.turns and copy.shown == game.shown and copy.won == game.won
+    assert list(copy.holders) == list(game.holders)
+    assert copy.correct_guess.mask == game.correct_guess.mask
+    assert [player.get_location().id for player in [copy.user_player] + copy.cpu_players] == \
+           [player.get_location().id for player in [game.user_player] + game.cpu_players]
+
+
+def test_load_into_a_game_and_at_an_offset():
+    first, second = played_game(1), played_game(2)
+    buffer = bytearray(2 * SNAPSHOT_SIZE)
+    save(first, buffer)
+    save(second, buffer, SNAPSHOT_SIZE)
+    game = load(buffer, SNAPSHOT_SIZE, first)
+    assert game is first
+    assert save(game) == save(second)
+
+
+def test_truncated_snapshot_is_rejected():
+    data = save(played_game(3))
+    with pytest.raises(ValueError):
+        load(data[:-1])
+    with pytest.raises(ValueError):
+        load(data + data, SNAPSHOT_SIZE + 1)
+
+
+def test_bad_magic_and_version_are_rejected():
+    data = save(played_game(4))
+    with pytest.raises(ValueError):
+        load(b"XYZ" + data[3:])
+    with pytest.raises(ValueError):
+        load(data[:3] + bytes([data[3] + 1]) + data[4:])
+
+
+@pytest.mark.parametrize("offset, value", [
+    (6, 9),      #more players than seats
+    (7, 6),      #no such guest
+    (16, 5),     #card 0 held by seat 5 of 4
+    (16, -2),    #card 0 held by a seat below the envelope
+    (40, 9),     #the user in a room that is not on the map
+    (41, -1),    #a seated player nowhere
+    (45, 3),     #a room for a seat not in the game
+])
+def test_out_of_range_fields_are_rejected(offset, value):
+    data = bytearray(save(played_game(5, 4)))
+    data[offset] = value & 0xff
+    with pytest.raises(ValueError):
+        load(bytes(data))
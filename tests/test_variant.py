@@ -0,0 +1,101 @@
+import json
+import os
+import shutil
+
+import pytest
+
+import clue_variant
+from clue_variant import load_variant
+
+MANSION = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "boards", "mansion.json")
+
+
+@pytest.fixture
+def mansion(tmp_path, monkeypatch):
+    #every load reads the files again instead of the variants already loaded
+    monkeypatch.setattr(clue_variant, "loaded", {})
+    path = str(tmp_path / "mansion.json")
+    shutil.copy(MANSION, path)
+    return path, str(tmp_path / "cache")
+
+
+def reload(path, cache_dir):
+    clue_variant.loaded.clear()
+    return load_variant(path, cache_dir)
+
+
+def cache_file(cache_dir):
+    names = os.listdir(cache_dir)
+    assert len(names) == 1 and names[0].endswith(".json")
+    return os.path.join(cache_dir, names[0])
+
+
+def test_tables_are_cached_and_read_back(mansion):
+    path, cache_dir = mansion
+    compiled = reload(path, cache_dir)
+    with open(cache_file(cache_dir)) as cache:
+        assert json.load(cache)["digest"] == compiled.digest
+    cached = reload(path, cache_dir)
+    assert cached is not compiled
+    assert cached.board.distance == compiled.board.distance
+    assert cached.board.first_step == compiled.board.first_step
+
+
+@pytest.mark.parametrize("tamper", [
+    lambda cache: cache["first_step"][0].__setitem__(5, 300),
+    lambda cache: cache["first_step"][0].__setitem__(1, 0),
+    lambda cache: cache["distance"][2].__setitem__(3, "far"),
+    lambda cache: cache["distance"].pop(),
+    lambda cache: cache.__setitem__("first_step", {"a": 1}),
+    lambda cache: cache.__setitem__("digest", "0" * 64),
+])
+def test_tampered_caches_are_rebuilt(mansion, tamper):
+    path, cache_dir = mansion
+    compiled = reload(path, cache_dir)
+    with open(cache_file(cache_dir)) as cache:
+        data = json.load(cache)
+    tamper(data)
+    with open(cache_file(cache_dir), "w") as cache:
+        json.dump(data, cache)
+    rebuilt = reload(path, cache_dir)
+    assert rebuilt.board.distance == compiled.board.distance
+    assert rebuilt.board.first_step == compiled.board.first_step
+
+
+def test_garbage_cache_is_rebuilt_and_replaced(mansion):
+    path, cache_dir = mansion
+    compiled = reload(path, cache_dir)
+    with open(cache_file(cache_dir), "wb") as cache:
+        cache.write(b"\x80\x04garbage")
+    assert reload(path, cache_dir).board.first_step == compiled.board.first_step
+    with open(cache_file(cache_dir)) as cache:
+        assert json.load(cache)["first_step"] == compiled.board.first_step
+
+
+def test_changed_variant_is_compiled_again(mansion):
+    path, cache_dir = mansion
+    reload(path, cache_dir)
+    with open(path) as variant_file:
+        data = json.load(variant_file)
+    data["name"] = "Other Mansion"
+    with open(path, "w") as variant_file:
+        json.dump(data, variant_file)
+    assert reload(path, cache_dir).name == "Other Mansion"
+    assert len(os.listdir(cache_dir)) == 2
+
+
+@pytest.mark.parametrize("change", [
+    lambda data: data.pop("start"),
+    lambda data: data.__setitem__("start", "Moon"),
+    lambda data: data["rooms"][0][1].append("Moon"),
+    lambda data: data["rooms"][0][1].remove("Hall"),
+])
+def test_invalid_variants_are_rejected(mansion, change):
+    path, cache_dir = mansion
+    with open(path) as variant_file:
+        data = json.load(variant_file)
+    change(data)
+    with open(path, "w") as variant_file:
+        json.dump(data, variant_file)
+    with pytest.raises(ValueError):
+        reload(path, cache_dir)